@@ -2,7 +2,7 @@
 API module for PDF processing functionality.
 """
 
-from typing import Optional, Dict, Any, Union, List, Literal
+from typing import Optional, Dict, Any, Callable, Union, List, Literal
 from pydantic import BaseModel, Field, ConfigDict
 from loguru import logger
 import json
@@ -11,7 +11,7 @@ from io import StringIO
 import requests
 from pprint import pformat
 
-from .pdf_processor import PDFProcessor
+from .pdf_processor import DocumentContent, PDFProcessor
 
 
 class OutputSchema(BaseModel):
@@ -30,6 +30,9 @@ class ProcessRequest(BaseModel):
     file_path: str
     prompt: Optional[str] = None
     output_schema: Optional[OutputSchema] = None
+    # Ask for the answer and the structured output in a single LLM call;
+    # llm_response is then the formatted payload instead of a free-text answer
+    combine_prompts: bool = False
 
 
 class ProcessResponse(BaseModel):
@@ -49,9 +52,13 @@ class ProcessResponse(BaseModel):
 class APIProcessor:
     """Server-side API processor."""
 
-    def __init__(self):
-        """Initialize the API processor."""
-        self.pdf_processor = PDFProcessor()
+    def __init__(self, pdf_processor: Optional[PDFProcessor] = None):
+        """Initialize the API processor.
+
+        Args:
+            pdf_processor: Processor to share (a new one is created if omitted)
+        """
+        self.pdf_processor = pdf_processor or PDFProcessor()
 
     def _generate_format_prompt(self, format_type: str, schema: Union[str, List[str]]) -> str:
         """Generate a prompt for formatted output."""
@@ -93,12 +100,20 @@ class APIProcessor:
         except Exception:
             return False
 
-    def process_pdf(self, request: ProcessRequest) -> ProcessResponse:
+    def process_pdf(
+        self,
+        request: ProcessRequest,
+        content: Optional[DocumentContent] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> ProcessResponse:
         """
         Process a PDF file based on the API request.
 
         Args:
             request: ProcessRequest containing file path and optional prompt
+            content: Already extracted document content; when given, only the
+                LLM stage runs
+            on_token: Optional callback receiving the LLM response as it streams
 
         Returns:
             ProcessResponse containing the processing results
@@ -116,8 +131,28 @@ class APIProcessor:
                 ),
             )
 
-            # First, extract text from PDF
-            result = self.pdf_processor.process_file(file_path=request.file_path, prompt=request.prompt)
+            # Structured output reuses one extraction for the prompt and the
+            # format instructions, queried separately unless combine_prompts
+            prompt = request.prompt
+            format_prompt = None
+            if request.output_schema:
+                format_prompt = self._generate_format_prompt(request.output_schema.format, request.output_schema.schema_def)
+                if request.combine_prompts:
+                    prompt = f"{prompt}\n\n{format_prompt}" if prompt else format_prompt
+                    format_prompt = None
+                if content is None:
+                    content = self.pdf_processor.extract(request.file_path)
+
+                # Log request data in verbose mode
+                logger.debug(
+                    "API Request:\n%s",
+                    pformat({"prompt": prompt, "format_prompt": format_prompt, "file_path": request.file_path}),
+                )
+
+            if content is not None:
+                result = self.pdf_processor.query(content, prompt, on_token=on_token)
+            else:
+                result = self.pdf_processor.process_file(file_path=request.file_path, prompt=prompt, on_token=on_token)
 
             # Log response in verbose mode
             logger.debug(
@@ -143,41 +178,28 @@ class APIProcessor:
                 llm_response=result.llm_response,
             )
 
-            # Handle structured output if schema provided
-            if request.output_schema:
-                format_prompt = self._generate_format_prompt(request.output_schema.format, request.output_schema.schema_def)
-
-                # Log request data in verbose mode
-                logger.debug(
-                    "API Request:\n%s",
-                    pformat({"prompt": format_prompt, "file_path": request.file_path}),
-                )
-
-                # Get structured output from LLM
-                format_result = self.pdf_processor.process_file(request.file_path, prompt=format_prompt, enforce_pdf=True)
-
-                # Log response in verbose mode
+            # Get structured output from LLM
+            format_result = result
+            if format_prompt is not None:
+                format_result = self.pdf_processor.query(content, format_prompt)
                 logger.debug(
                     "API Response:\n%s",
                     pformat(
                         {
                             "success": format_result.success,
-                            "text": format_result.text,
-                            "metadata": format_result.metadata,
-                            "page_count": format_result.page_count,
                             "error": format_result.error,
                             "llm_response": format_result.llm_response,
                         }
                     ),
                 )
 
-                if format_result.success and format_result.llm_response:
-                    structured_output = format_result.llm_response.strip()
-                    # Validate the output
-                    if self._validate_structured_output(structured_output, request.output_schema):
-                        response.structured_output = structured_output
-                    else:
-                        response.error = "Failed to generate valid structured output"
+            # Validate structured output if schema provided
+            if request.output_schema and format_result.success and format_result.llm_response:
+                structured_output = format_result.llm_response.strip()
+                if self._validate_structured_output(structured_output, request.output_schema):
+                    response.structured_output = structured_output
+                else:
+                    response.error = "Failed to generate valid structured output"
 
             return response
 
@@ -218,6 +240,7 @@ class APIClient:
             request_data = {
                 "file_path": str(request.file_path),
                 "prompt": request.prompt,
+                "combine_prompts": request.combine_prompts,
             }
 
             if request.output_schema:
@@ -0,0 +1,431 @@
+"""
+Latency-aware load balancing across a pool of Ollama endpoints.
+
+A model configured with several ``endpoints`` is served by whichever host is
+expected to answer first. Each endpoint tracks its requests in flight, an
+exponentially weighted moving average (EWMA) of its latency and of its recent
+error rate; a request goes to the endpoint with the lowest
+``(in_flight + 1) * latency * (1 + error penalty)``. After ``eject_after``
+consecutive failures an endpoint is ejected for ``eject_seconds`` (doubling on
+each repeated ejection, up to ``MAX_EJECT_SECONDS``). It is then re-admitted
+on probation: one failure ejects it again, one success restores it fully. If
+every endpoint is ejected, the one re-admitted soonest is used rather than
+failing outright.
+
+Pools are shared per endpoint list, so in-flight counts and latencies reflect
+every processor and thread of the process.
+
+``BalancedOllamaClient.call`` adds retries, a circuit breaker and hedging per
+host: each host has its own ``EndpointGuard``, so one slow or failing host
+neither opens the breaker of the others nor skews their p95 latency. A hedged
+copy goes to the best host other than the one the first copy is waiting on.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import (
+    AbstractSet,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+from loguru import logger
+from .clients import PoolSettings, ollama_client
+from .resilience import (
+    DEFAULT_BREAKER_RESET_SECONDS,
+    DEFAULT_BREAKER_THRESHOLD,
+    DEFAULT_HEDGE_MIN_DELAY,
+    CircuitOpenError,
+    EndpointGuard,
+    RetryPolicy,
+    endpoint_guard,
+    guarded_call,
+    hedged,
+    open_stream,
+    retrying,
+)
+
+DEFAULT_EWMA_ALPHA = 0.3  # Weight of the newest latency/error sample
+DEFAULT_EJECT_AFTER = 3  # Consecutive failures before an endpoint is ejected
+DEFAULT_EJECT_SECONDS = 30.0
+MAX_EJECT_SECONDS = 600.0
+ERROR_PENALTY = 4.0  # Score multiplier added per unit of EWMA error rate
+
+
+@dataclass
+class EndpointStats:
+    """Live routing metrics of one endpoint."""
+
+    url: str
+    in_flight: int = 0
+    latency: Optional[float] = None  # EWMA of successful request seconds
+    error_rate: float = 0.0  # EWMA of failures (0 = healthy, 1 = failing)
+    failures: int = 0  # Consecutive failures
+    ejections: int = 0  # Consecutive ejections, for the backoff
+    ejected_until: float = 0.0  # Monotonic time the endpoint is re-admitted
+    requests: int = 0
+
+    def ejected(self, now: float) -> bool:
+        """Return True while the endpoint is out of rotation."""
+        return now < self.ejected_until
+
+
+class EndpointPool:
+    """Routes requests to the endpoint with the best live metrics."""
+
+    def __init__(
+        self,
+        endpoints: Sequence[str],
+        alpha: float = DEFAULT_EWMA_ALPHA,
+        eject_after: int = DEFAULT_EJECT_AFTER,
+        eject_seconds: float = DEFAULT_EJECT_SECONDS,
+    ):
+        """Initialize the pool.
+
+        Args:
+            endpoints: Endpoint URLs, in order of preference for ties
+            alpha: EWMA weight of the newest sample
+            eject_after: Consecutive failures before ejection
+            eject_seconds: First ejection period in seconds
+        """
+        if not endpoints:
+            raise ValueError("An endpoint pool needs at least one endpoint")
+        self.stats = [EndpointStats(url) for url in endpoints]
+        self.alpha = alpha
+        self.eject_after = max(1, eject_after)
+        self.eject_seconds = eject_seconds
+        self._lock = threading.Lock()
+
+    def _score(self, stats: EndpointStats, default_latency: float) -> float:
+        latency = stats.latency if stats.latency is not None else default_latency
+        return (stats.in_flight + 1) * latency * (1 + ERROR_PENALTY * stats.error_rate)
+
+    def _pick(
+        self, now: float, exclude: AbstractSet[str] = frozenset()
+    ) -> Optional[EndpointStats]:
+        """Choose an endpoint not in ``exclude``; called with the lock held."""
+        candidates = [s for s in self.stats if s.url not in exclude]
+        if not candidates:
+            return None
+        admitted = [s for s in candidates if not s.ejected(now)]
+        if not admitted:
+            return min(candidates, key=lambda s: s.ejected_until)
+        # Endpoints without samples yet are assumed to be average
+        known = [s.latency for s in admitted if s.latency is not None]
+        default_latency = sum(known) / len(known) if known else 1.0
+        return min(admitted, key=lambda s: self._score(s, default_latency))
+
+    def acquire(
+        self, exclude: AbstractSet[str] = frozenset()
+    ) -> Optional[EndpointStats]:
+        """Pick an endpoint and count a request in flight on it.
+
+        Args:
+            exclude: URLs of endpoints not to pick
+
+        Returns:
+            The endpoint, or None if every endpoint is excluded
+        """
+        with self._lock:
+            stats = self._pick(time.monotonic(), exclude)
+            if stats is not None:
+                stats.in_flight += 1
+                stats.requests += 1
+            return stats
+
+    def cancel(self, stats: EndpointStats) -> None:
+        """Undo an acquire() whose request was never sent."""
+        with self._lock:
+            stats.in_flight -= 1
+            stats.requests -= 1
+
+    def release(
+        self, stats: EndpointStats, elapsed: float, error: Optional[Exception] = None
+    ) -> None:
+        """Record the outcome of a request started with acquire().
+
+        Args:
+            stats: Endpoint returned by acquire()
+            elapsed: Request duration in seconds
+            error: Exception the request failed with, if any
+        """
+        with self._lock:
+            stats.in_flight -= 1
+            sample = 1.0 if error else 0.0
+            stats.error_rate += self.alpha * (sample - stats.error_rate)
+            if error is None:
+                if stats.latency is None:
+                    stats.latency = elapsed
+                else:
+                    stats.latency += self.alpha * (elapsed - stats.latency)
+                stats.failures = 0
+                stats.ejections = 0
+                return
+
+            stats.failures += 1
+            if stats.failures >= self.eject_after:
+                period = min(
+                    self.eject_seconds * 2**stats.ejections, MAX_EJECT_SECONDS
+                )
+                stats.ejections += 1
+                # On probation once re-admitted: the next failure ejects again
+                stats.failures = self.eject_after - 1
+                stats.ejected_until = time.monotonic() + period
+                logger.warning(
+                    f"Ejecting endpoint {stats.url} for {period:.0f}s: {error}"
+                )
+
+    @contextmanager
+    def request(self) -> Iterator[EndpointStats]:
+        """Context manager timing one request on the chosen endpoint."""
+        with self.track(self.acquire()) as stats:
+            yield stats
+
+    @contextmanager
+    def track(self, stats: EndpointStats) -> Iterator[EndpointStats]:
+        """Context manager timing a request on an endpoint from acquire()."""
+        start = time.monotonic()
+        error = None
+        try:
+            yield stats
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.release(stats, time.monotonic() - start, error)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Current metrics of every endpoint, for logging and diagnostics."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "url": s.url,
+                    "in_flight": s.in_flight,
+                    "latency": s.latency,
+                    "error_rate": round(s.error_rate, 3),
+                    "ejected": s.ejected(now),
+                    "requests": s.requests,
+                }
+                for s in self.stats
+            ]
+
+
+_lock = threading.Lock()
+_pools: Dict[Tuple, EndpointPool] = {}
+
+
+def endpoint_pool(
+    endpoints: Sequence[str],
+    eject_after: int = DEFAULT_EJECT_AFTER,
+    eject_seconds: float = DEFAULT_EJECT_SECONDS,
+) -> EndpointPool:
+    """Shared pool for an endpoint list, created on first use."""
+    key = (tuple(endpoints), eject_after, eject_seconds)
+    with _lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = EndpointPool(
+                endpoints, eject_after=eject_after, eject_seconds=eject_seconds
+            )
+        return pool
+
+
+class BalancedOllamaClient:
+    """Drop-in for ``ollama.Client`` that spreads requests over an EndpointPool.
+
+    ``chat`` and ``generate`` go to the endpoint chosen by the pool through
+    its shared client; ``call`` adds retries, breakers and hedging per host.
+    A streamed response counts as in flight until the stream is exhausted or
+    closed.
+    """
+
+    def __init__(self, pool: EndpointPool, settings: Optional[PoolSettings] = None):
+        self.pool = pool
+        self.settings = settings
+
+    def _call(self, method: str, kwargs: Dict[str, Any]) -> Any:
+        if kwargs.get("stream"):
+            return self._stream(method, kwargs)
+        with self.pool.request() as stats:
+            client = ollama_client(stats.url, self.settings)
+            return getattr(client, method)(**kwargs)
+
+    def _stream(self, method: str, kwargs: Dict[str, Any]) -> Iterator[Any]:
+        with self.pool.request() as stats:
+            client = ollama_client(stats.url, self.settings)
+            yield from getattr(client, method)(**kwargs)
+
+    def _lease(
+        self,
+        breaker_threshold: int,
+        breaker_reset_seconds: float,
+        exclude: AbstractSet[str] = frozenset(),
+        trial: bool = True,
+    ) -> Optional[Tuple[EndpointStats, EndpointGuard]]:
+        """Acquire the best host whose circuit breaker lets a request through.
+
+        Args:
+            breaker_threshold: Consecutive failures that open a host's breaker
+            breaker_reset_seconds: Seconds a host's breaker stays open
+            exclude: URLs of hosts not to use
+            trial: Allow the trial request of a half-open breaker; hedged
+                copies pass False and only go to admitted hosts whose breaker
+                is closed
+
+        Returns:
+            The host and its guard, or None if no host may be used
+        """
+        skipped = set(exclude)
+        while True:
+            stats = self.pool.acquire(skipped)
+            if stats is None:
+                return None
+            guard = endpoint_guard(stats.url, breaker_threshold, breaker_reset_seconds)
+            if trial:
+                usable = guard.breaker.allow()
+            else:
+                usable = guard.breaker.state == "closed" and not stats.ejected(
+                    time.monotonic()
+                )
+            if usable:
+                return stats, guard
+            self.pool.cancel(stats)
+            skipped.add(stats.url)
+
+    def _send(
+        self,
+        stats: EndpointStats,
+        guard: EndpointGuard,
+        method: str,
+        kwargs: Dict[str, Any],
+    ) -> Any:
+        """Send a request to a leased host, recording it on pool and guard."""
+        client = ollama_client(stats.url, self.settings)
+        with self.pool.track(stats):
+            return guarded_call(lambda: getattr(client, method)(**kwargs), guard)
+
+    def _open(
+        self,
+        stats: EndpointStats,
+        guard: EndpointGuard,
+        method: str,
+        kwargs: Dict[str, Any],
+    ) -> Iterator[Any]:
+        """Open a stream on a leased host, guarded until its first chunk."""
+        client = ollama_client(stats.url, self.settings)
+        start = time.monotonic()
+        try:
+            chunks = guarded_call(
+                lambda: open_stream(lambda: getattr(client, method)(**kwargs)),
+                guard,
+                timed=False,
+            )
+        except Exception as e:
+            self.pool.release(stats, time.monotonic() - start, e)
+            raise
+        return self._drain(stats, start, chunks)
+
+    def _drain(
+        self, stats: EndpointStats, start: float, chunks: Iterator[Any]
+    ) -> Iterator[Any]:
+        error = None
+        try:
+            yield from chunks
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.pool.release(stats, time.monotonic() - start, error)
+
+    def call(
+        self,
+        method: str,
+        kwargs: Dict[str, Any],
+        policy: RetryPolicy,
+        breaker_threshold: int = DEFAULT_BREAKER_THRESHOLD,
+        breaker_reset_seconds: float = DEFAULT_BREAKER_RESET_SECONDS,
+        hedge: bool = False,
+        hedge_min_delay: float = DEFAULT_HEDGE_MIN_DELAY,
+        may_hedge: Optional[Callable[[], bool]] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        acquire: Optional[Callable[[], None]] = None,
+    ) -> Any:
+        """Send a request with retries, breaking and hedging per host.
+
+        Each attempt goes to the best host whose breaker is not open. With
+        ``hedge``, an attempt still running after its host's p95 latency is
+        duplicated to the best other host with a closed breaker; the copy is
+        skipped if there is no such host. A streamed request is only retried
+        until its first chunk arrives and is never hedged.
+
+        Args:
+            method: ``chat`` or ``generate``
+            kwargs: Arguments of the request
+            policy: Retry policy for transient failures
+            breaker_threshold: Consecutive failures that open a host's breaker
+            breaker_reset_seconds: Seconds a host's breaker stays open
+            hedge: Duplicate attempts running longer than the host's p95
+            hedge_min_delay: Shortest delay before a duplicate is sent
+            may_hedge: Asked before a duplicate is sent; False skips it
+            sleep: Function used to wait between attempts
+            acquire: Waits for rate-limit quota before each attempt, before a
+                host is chosen and outside its latency sample
+
+        Returns:
+            The response, or an iterator over its chunks when streamed
+
+        Raises:
+            CircuitOpenError: If every host's circuit is open
+        """
+        stream = bool(kwargs.get("stream"))
+
+        def attempt() -> Any:
+            if acquire is not None:
+                acquire()
+            lease = self._lease(breaker_threshold, breaker_reset_seconds)
+            if lease is None:
+                raise CircuitOpenError("Circuit open on every endpoint of the pool")
+            stats, guard = lease
+            if stream:
+                return self._open(stats, guard, method, kwargs)
+            delay = guard.latencies.percentile(0.95) if hedge else None
+            if delay is None:
+                return self._send(stats, guard, method, kwargs)
+
+            def duplicate() -> Optional[Callable[[], Any]]:
+                other = self._lease(
+                    breaker_threshold,
+                    breaker_reset_seconds,
+                    exclude={stats.url},
+                    trial=False,
+                )
+                if other is None:
+                    return None
+                if may_hedge is not None and not may_hedge():
+                    self.pool.cancel(other[0])
+                    return None
+                return lambda: self._send(*other, method, kwargs)
+
+            return hedged(
+                lambda: self._send(stats, guard, method, kwargs),
+                max(delay, hedge_min_delay),
+                duplicate,
+            )
+
+        return retrying(attempt, policy, sleep)
+
+    def chat(self, **kwargs) -> Any:
+        """Send a chat request to the best endpoint."""
+        return self._call("chat", kwargs)
+
+    def generate(self, **kwargs) -> Any:
+        """Send a generate request to the best endpoint."""
+        return self._call("generate", kwargs)
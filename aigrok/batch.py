@@ -0,0 +1,195 @@
+"""Concurrent processing of many files."""
+
+import multiprocessing.util
+import queue
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
+from functools import partial
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from loguru import logger
+from .config import AigrokConfig, ConfigManager
+from .pdf_processor import DocumentContent, PDFProcessor
+from .types import ProcessingResult
+
+# Processor owned by each extraction worker process
+_worker_processor: Optional[PDFProcessor] = None
+
+
+def _init_worker(
+    config: AigrokConfig, verbose: bool, workers: int, jobs: int = 1
+) -> None:
+    """Build the extraction worker's processor (and its OCR reader) once.
+
+    Workers use the parent's in-memory configuration so command-line
+    overrides such as --no-cache apply to them too. The ``ocr_workers``
+    budget is split between the ``jobs`` extraction workers, and each
+    worker's OCR pool is shut down when the worker exits.
+    """
+    global _worker_processor
+    if config is not None:
+        config.ocr_workers = max(1, getattr(config, "ocr_workers", 1) // jobs)
+    config_manager = ConfigManager()
+    config_manager.config = config
+    _worker_processor = PDFProcessor(
+        config_manager=config_manager, verbose=verbose, workers=workers
+    )
+    multiprocessing.util.Finalize(
+        _worker_processor, _worker_processor.close, exitpriority=10
+    )
+    _worker_processor.preload_ocr()
+
+
+def _extract_in_worker(file_path: str) -> DocumentContent:
+    """Run the extraction stage inside a worker process."""
+    return _worker_processor.extract(file_path)
+
+
+def _failure(file_path: Union[str, Path], error: Exception) -> ProcessingResult:
+    """Build a failed result for a file."""
+    logger.error(f"Failed to process {file_path}: {error}")
+    return ProcessingResult(
+        success=False,
+        error=str(error),
+        filename=str(Path(file_path).name),
+        metadata={"file_name": Path(file_path).name},
+    )
+
+
+def extract_batch(
+    processor: PDFProcessor, files: List[Union[str, Path]], jobs: int = 1
+) -> Iterator[Tuple[Union[str, Path], Union[DocumentContent, Exception]]]:
+    """Extract files in a pool of ``jobs`` processes without querying an LLM.
+
+    Args:
+        processor: Processor whose configuration the workers use
+        files: Files to extract
+        jobs: Number of extraction processes
+
+    Yields:
+        Tuples of (file, content) in completion order, with the exception in
+        place of the content when extraction fails
+    """
+    if jobs <= 1:
+        for file in files:
+            try:
+                yield file, processor.extract(file)
+            except Exception as e:
+                yield file, e
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(
+            processor.config_manager.config,
+            processor.verbose,
+            processor.workers,
+            jobs,
+        ),
+    ) as extract_pool:
+        futures = {
+            extract_pool.submit(_extract_in_worker, str(file)): file for file in files
+        }
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                yield futures[future], e
+
+
+def process_batch(
+    processor: PDFProcessor,
+    files: List[Union[str, Path]],
+    prompt: Optional[str],
+    jobs: int = 1,
+    llm_concurrency: int = 1,
+    keep_order: bool = False,
+) -> Iterator[Tuple[Union[str, Path], ProcessingResult]]:
+    """Process files concurrently, yielding results as they complete.
+
+    Extraction and OCR run in a pool of ``jobs`` processes (MuPDF is not
+    thread-safe and OCR is CPU-bound), or on one thread of this process when
+    ``jobs`` is 1, while at most ``llm_concurrency`` LLM requests are in
+    flight at once on ``processor``. A file moves to the LLM
+    stage as soon as its extraction finishes.
+
+    Args:
+        processor: Processor used for the LLM stage
+        files: Files to process
+        prompt: Processing prompt
+        jobs: Number of extraction processes
+        llm_concurrency: Maximum number of concurrent LLM requests
+        keep_order: Yield results in input order instead of completion order
+
+    Yields:
+        Tuples of (file, result)
+    """
+    if jobs <= 1 and llm_concurrency <= 1:
+        for file in files:
+            yield file, processor.process_file(file, prompt)
+        return
+
+    completed: "queue.Queue[Tuple[int, ProcessingResult]]" = queue.Queue()
+
+    def queried(index: int, future: Future) -> None:
+        try:
+            completed.put((index, future.result()))
+        except Exception as e:
+            completed.put((index, _failure(files[index], e)))
+
+    def extracted(index: int, future: Future) -> None:
+        try:
+            content = future.result()
+        except Exception as e:
+            completed.put((index, _failure(files[index], e)))
+            return
+        try:
+            query = llm_pool.submit(processor.query, content, prompt)
+        except RuntimeError as e:  # Pool shut down because the caller stopped early
+            completed.put((index, _failure(files[index], e)))
+            return
+        query.add_done_callback(partial(queried, index))
+
+    if jobs <= 1:
+        # One extraction at a time needs no worker process; the processor
+        # extracts on a single thread while queries run in the LLM pool
+        extract_pool: Executor = ThreadPoolExecutor(max_workers=1)
+        extract = processor.extract
+    else:
+        extract_pool = ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_worker,
+            initargs=(
+                processor.config_manager.config,
+                processor.verbose,
+                processor.workers,
+                jobs,
+            ),
+        )
+        extract = _extract_in_worker
+
+    with extract_pool, ThreadPoolExecutor(
+        max_workers=max(1, llm_concurrency)
+    ) as llm_pool:
+        for index, file in enumerate(files):
+            extract_pool.submit(extract, str(file)).add_done_callback(
+                partial(extracted, index)
+            )
+
+        pending: Dict[int, ProcessingResult] = {}
+        next_index = 0
+        for _ in range(len(files)):
+            index, result = completed.get()
+            if not keep_order:
+                yield files[index], result
+                continue
+            pending[index] = result
+            while next_index in pending:
+                yield files[next_index], pending.pop(next_index)
+                next_index += 1
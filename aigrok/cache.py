@@ -0,0 +1,286 @@
+"""
+Persistent caches for aigrok.
+
+Both caches live under ``~/.cache/aigrok`` (or ``$AIGROK_CACHE_DIR``):
+
+1. Extraction results, keyed by a hash of the file content and the settings
+   that affect extraction, so re-running a prompt against an unchanged
+   document skips text extraction and OCR.
+2. LLM responses (opt-in), keyed by provider, model, prompt, context and
+   images, so repeating an identical query skips the model entirely.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Union
+from loguru import logger
+from PIL import Image
+from .images import PageImage
+
+DEFAULT_CACHE_DIR = Path(
+    os.getenv("AIGROK_CACHE_DIR", Path.home() / ".cache" / "aigrok")
+)
+DEFAULT_MAX_SIZE_MB = 1024
+DEFAULT_RESPONSE_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MAX_RESPONSES = 10000
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_hash(file_path: Union[str, Path]) -> str:
+    """Compute the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Size-bounded, least-recently-used on-disk cache of extraction results.
+
+    Each entry is a JSON file named after its key. Reading an entry refreshes
+    its modification time, and entries with the oldest modification time are
+    evicted first once the cache grows past ``max_size_bytes``.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Union[str, Path]] = None,
+        max_size_bytes: int = DEFAULT_MAX_SIZE_MB * 1024 * 1024,
+    ):
+        """Initialize the cache.
+
+        Args:
+            cache_dir: Root cache directory (defaults to ~/.cache/aigrok)
+            max_size_bytes: Total size above which old entries are evicted
+        """
+        root = Path(cache_dir).expanduser() if cache_dir else DEFAULT_CACHE_DIR
+        self.directory = root / "extraction"
+        self.max_size_bytes = max_size_bytes
+
+    def key(self, file_path: Union[str, Path], settings: Dict[str, Any]) -> str:
+        """Build a cache key from file content and extraction settings.
+
+        Args:
+            file_path: File whose content is hashed
+            settings: JSON-serializable settings that change extraction output
+
+        Returns:
+            Hex digest identifying the entry
+        """
+        digest = hashlib.sha256(file_hash(file_path).encode())
+        digest.update(json.dumps(settings, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached entry, or None on a miss or unreadable entry."""
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+            os.utime(path)  # Mark as recently used
+            logger.debug(f"Extraction cache hit: {key}")
+            return entry
+        except FileNotFoundError:
+            logger.debug(f"Extraction cache miss: {key}")
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache entry {path}: {e}")
+            return None
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        """Store an entry, then evict old entries if over the size limit."""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so readers never see partial entries
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+        except Exception as e:
+            logger.warning(f"Failed to write extraction cache entry: {e}")
+            return
+        self._evict()
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until under the size limit."""
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+                logger.debug(f"Evicted extraction cache entry: {path.name}")
+            except FileNotFoundError:
+                continue
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        for path in self.directory.glob("*.json"):
+            path.unlink(missing_ok=True)
+
+
+class ResponseCache:
+    """SQLite-backed cache of LLM responses with TTL and size-bounded eviction.
+
+    Entries older than ``ttl_seconds`` are never returned and are purged on
+    write. Once more than ``max_entries`` remain, the least recently used are
+    deleted. Hit and miss counts are kept for the lifetime of the instance.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Union[str, Path]] = None,
+        ttl_seconds: int = DEFAULT_RESPONSE_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_RESPONSES,
+    ):
+        """Initialize the cache, creating the database if needed.
+
+        Args:
+            cache_dir: Root cache directory (defaults to ~/.cache/aigrok)
+            ttl_seconds: Maximum age of a usable entry
+            max_entries: Number of entries kept after eviction
+        """
+        root = Path(cache_dir).expanduser() if cache_dir else DEFAULT_CACHE_DIR
+        root.mkdir(parents=True, exist_ok=True)
+        self.path = root / "responses.sqlite"
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+            )
+
+    @staticmethod
+    def key(
+        provider: str,
+        model: str,
+        prompt: str,
+        context: Optional[str] = None,
+        images: Optional[Iterable[Any]] = None,
+    ) -> str:
+        """Build a cache key for a query.
+
+        The prompt is normalized (case-folded, whitespace collapsed) so trivial
+        rewordings of the same question share an entry. Context and images are
+        reduced to content hashes.
+
+        Args:
+            provider: Provider name
+            model: Model name
+            prompt: User prompt
+            context: Text context sent with the prompt
+            images: Images sent with the prompt, as PageImages, PIL Images or
+                (image, description) tuples
+
+        Returns:
+            Hex digest identifying the query
+        """
+        image_hashes = []
+        for image in images or []:
+            if isinstance(image, tuple):
+                image = image[0]
+            if isinstance(image, PageImage):
+                data = image.data if image.data is not None else image.image.tobytes()
+            elif isinstance(image, Image.Image):
+                data = image.tobytes()
+            else:
+                data = bytes(image)
+            image_hashes.append(hashlib.sha256(data).hexdigest())
+
+        parts = {
+            "provider": provider,
+            "model": model,
+            "prompt": " ".join((prompt or "").split()).casefold(),
+            "context": hashlib.sha256((context or "").encode()).hexdigest(),
+            "images": image_hashes,
+        }
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a fresh cached response, or None on a miss."""
+        now = time.time()
+        try:
+            with self._lock, self._conn:
+                row = self._conn.execute(
+                    "SELECT response FROM responses WHERE key = ? AND created >= ?",
+                    (key, now - self.ttl_seconds),
+                ).fetchone()
+                if row:
+                    self._conn.execute(
+                        "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+                    )
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache lookup failed: {e}")
+            row = None
+
+        if row:
+            self.hits += 1
+            logger.debug(f"Response cache hit: {key}")
+            return json.loads(row[0])
+        self.misses += 1
+        logger.debug(f"Response cache miss: {key}")
+        return None
+
+    def put(self, key: str, response: Any) -> None:
+        """Store a response and evict expired or excess entries."""
+        now = time.time()
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(response), now, now),
+                )
+                self._conn.execute(
+                    "DELETE FROM responses WHERE created < ?",
+                    (now - self.ttl_seconds,),
+                )
+                self._conn.execute(
+                    """DELETE FROM responses WHERE key IN (
+                        SELECT key FROM responses ORDER BY accessed DESC
+                        LIMIT -1 OFFSET ?
+                    )""",
+                    (self.max_entries,),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to write response cache entry: {e}")
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,87 @@
+"""
+Token-aware chunking for documents larger than a model's context budget.
+
+Text is split on page boundaries first, then paragraphs, lines and words, and
+the pieces are packed greedily into chunks that fit the budget. Token counts
+are estimated from character length, which is close enough for budgeting
+without loading a tokenizer for every provider.
+"""
+
+import math
+from typing import List, Sequence
+
+CHARS_PER_TOKEN = 4
+DEFAULT_CHUNK_CONCURRENCY = 4
+
+# Separators tried in order when a piece is still over budget
+SEPARATORS = ("\n\n", "\n", " ")
+
+MAP_PROMPT = """{prompt}
+
+This is part {index} of {count} of the document. Answer using only this part. \
+If it contains nothing relevant, reply "No relevant information."."""
+
+REDUCE_PROMPT = """The context contains answers to the question below, each \
+taken from a different part of one document. Combine them into a single answer, \
+ignoring parts with no relevant information.
+
+Question: {prompt}"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in text."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _pack(pieces: Sequence[str], separator: str, max_tokens: int) -> List[str]:
+    """Greedily join pieces with separator into chunks within max_tokens."""
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for piece in pieces:
+        tokens = estimate_tokens(piece + separator)
+        if current and size + tokens > max_tokens:
+            chunks.append(separator.join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += tokens
+    if current:
+        chunks.append(separator.join(current))
+    return chunks
+
+
+def _split(text: str, max_tokens: int, separators: Sequence[str]) -> List[str]:
+    """Split text into pieces within max_tokens at the coarsest separator."""
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    if not separators:
+        size = max_tokens * CHARS_PER_TOKEN
+        return [text[i : i + size] for i in range(0, len(text), size)]
+
+    separator, finer = separators[0], separators[1:]
+    pieces: List[str] = []
+    for part in text.split(separator):
+        if part.strip():
+            pieces.extend(_split(part, max_tokens, finer))
+    return _pack(pieces, separator, max_tokens)
+
+
+def split_text(pages: Sequence[str], max_tokens: int) -> List[str]:
+    """Split page texts into chunks of at most max_tokens.
+
+    Pages are kept whole and packed together where they fit; a page larger
+    than the budget is split on paragraph, then line, then word boundaries.
+
+    Args:
+        pages: Text of each page, in order
+        max_tokens: Token budget per chunk
+
+    Returns:
+        Chunks in document order
+    """
+    max_tokens = max(1, max_tokens)
+    pieces: List[str] = []
+    for page in pages:
+        if page.strip():
+            pieces.extend(_split(page, max_tokens, SEPARATORS))
+    return _pack(pieces, "\n", max_tokens)
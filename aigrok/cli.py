@@ -6,17 +6,24 @@ Command-line interface for PDF processing.
 import sys
 import argparse
 import json
+from dataclasses import asdict
 from pathlib import Path
-from typing import Union, List
+from typing import List, Optional, TextIO, Union
 from loguru import logger
 from .pdf_processor import PDFProcessor, ProcessingResult
+from .batch import process_batch
+from .corpus import CorpusIndex, default_index_path, query_corpus
+from .daemon import DaemonClient, serve
 from .formats import get_supported_formats
+from .retrieval import DEFAULT_TOP_K
 from .config import ConfigManager
 from . import __version__
 import glob
 from .logging import configure_logging
 from pprint import pformat
 
+DEFAULT_OCR_LANGUAGES = "en"
+
 
 def create_parser() -> argparse.ArgumentParser:
     """Create argument parser."""
@@ -99,7 +106,7 @@ def create_parser() -> argparse.ArgumentParser:
 
     parser.add_argument(
         "--ocr-languages",
-        default="en",
+        default=DEFAULT_OCR_LANGUAGES,
         help="Languages to use for OCR (comma-separated). Example: en,fr,de",
     )
 
@@ -109,6 +116,136 @@ def create_parser() -> argparse.ArgumentParser:
         help="Continue processing if OCR fails (default: False)",
     )
 
+    parser.add_argument(
+        "--ocr-batch-size",
+        type=int,
+        metavar="N",
+        help="Same-size images recognized per EasyOCR batch (default: 8)",
+    )
+
+    parser.add_argument(
+        "--ocr-workers",
+        type=int,
+        metavar="N",
+        help="OCR processes, each with its own EasyOCR reader (default: 1)",
+    )
+
+    parser.add_argument(
+        "--render-pages",
+        choices=["auto", "always", "never"],
+        help="Rasterize whole pages instead of sending embedded images "
+        "(default: auto, for image-heavy pages without text)",
+    )
+
+    parser.add_argument(
+        "--render-dpi",
+        type=int,
+        metavar="DPI",
+        help="Resolution of rendered pages (default: 150)",
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes used to extract pages of large PDFs (default: 1)",
+    )
+
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Number of files to extract and OCR concurrently (default: 1)",
+    )
+
+    parser.add_argument(
+        "--llm-concurrency",
+        type=int,
+        default=1,
+        help="Maximum number of LLM requests in flight (default: 1)",
+    )
+
+    parser.add_argument(
+        "--keep-order",
+        action="store_true",
+        help="Print results in input order when processing files concurrently",
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write the extraction cache",
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory for cached extraction results (default: ~/.cache/aigrok)",
+    )
+
+    parser.add_argument(
+        "--llm-cache",
+        action="store_true",
+        help="Reuse cached LLM responses for identical prompts and documents",
+    )
+
+    parser.add_argument(
+        "--top-k",
+        type=int,
+        metavar="K",
+        help="Send only the K pages most relevant to the prompt",
+    )
+
+    # Corpus index options
+    parser.add_argument(
+        "--index",
+        metavar="DIR",
+        help="Add or update the PDFs under DIR in the corpus index",
+    )
+
+    parser.add_argument(
+        "--query",
+        metavar="PROMPT",
+        help="Answer PROMPT from the best matching chunks of the corpus index",
+    )
+
+    parser.add_argument(
+        "--index-path",
+        type=str,
+        help="Corpus index database (default: ~/.cache/aigrok/corpus.sqlite)",
+    )
+
+    parser.add_argument(
+        "--pages",
+        nargs="+",
+        metavar="FILE",
+        help="Print each page's text and OCR output as a JSON line as soon as "
+        "it is extracted, without querying a model",
+    )
+
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print LLM responses token by token as they arrive (one file at a time)",
+    )
+
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run a daemon that keeps the OCR reader and model clients loaded",
+    )
+
+    parser.add_argument(
+        "--socket",
+        help="Unix socket of the daemon (default: ~/.cache/aigrok/daemon.sock)",
+    )
+
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Process files in this process even if a daemon is running",
+    )
+
     return parser
 
 
@@ -166,12 +303,15 @@ def format_output(results, format_type="text", show_filenames=True):
         raise ValueError(f"Unsupported format type: {format_type}")
 
 
-def process_single_file(file_path: Union[str, Path], prompt: str) -> ProcessingResult:
+def process_single_file(
+    file_path: Union[str, Path], prompt: str, processor: Optional[PDFProcessor] = None
+) -> ProcessingResult:
     """Process a single PDF file.
 
     Args:
         file_path: Path to PDF file
         prompt: Processing prompt
+        processor: Processor to reuse (a new one is created if omitted)
 
     Returns:
         Processing result
@@ -180,7 +320,7 @@ def process_single_file(file_path: Union[str, Path], prompt: str) -> ProcessingR
         Exception: If processing fails
     """
     try:
-        processor = PDFProcessor()
+        processor = processor or PDFProcessor()
         result = processor.process_file(file_path, prompt)
         result.filename = str(Path(file_path).name)  # Store just the filename
         return result
@@ -206,15 +346,213 @@ def process_file(
     if isinstance(files, (str, Path)):
         return process_single_file(files, prompt)
 
-    return [process_single_file(f, prompt) for f in files]
+    # Share one processor so the OCR reader is loaded once
+    processor = PDFProcessor()
+    return [process_single_file(f, prompt, processor) for f in files]
+
+
+class TokenPrinter:
+    """Print a streamed response on one line, prefixed with the file name."""
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self.started = False
+
+    def __call__(self, token: str) -> None:
+        if not self.started:
+            print(f"{self.file_name}:", end="")
+            self.started = True
+        print(token, end="", flush=True)
+
+    def finish(self, result: ProcessingResult) -> None:
+        """End the line, or print the whole response if nothing was streamed."""
+        if self.started:
+            print(flush=True)
+        elif result and result.llm_response:
+            print(f"{self.file_name}:{result.llm_response}", flush=True)
+
+
+def stream_files(
+    processor: PDFProcessor, files: List[Union[str, Path]], prompt: str
+):
+    """Process files one at a time, printing responses as they stream.
+
+    Args:
+        processor: Processor to use
+        files: Files to process
+        prompt: Processing prompt
+
+    Yields:
+        Tuples of (file, result)
+    """
+    for file in files:
+        printer = TokenPrinter(Path(file).name)
+        result = processor.process_file(file, prompt, on_token=printer)
+        printer.finish(result)
+        yield file, result
+
+
+def has_overrides(args) -> bool:
+    """Return True if per-run configuration overrides were given."""
+    return bool(
+        args.no_cache
+        or args.cache_dir
+        or args.llm_cache
+        or args.top_k
+        or args.ocr_batch_size
+        or args.ocr_workers
+        or args.render_pages
+        or args.render_dpi
+        or args.easyocr
+        or args.ocr_fallback
+        or args.ocr_languages != DEFAULT_OCR_LANGUAGES
+        or args.workers != 1
+    )
+
+
+def apply_overrides(config_manager: ConfigManager, args) -> None:
+    """Apply per-run overrides to the loaded configuration.
+
+    Args:
+        config_manager: Configuration to update in memory
+        args: Parsed command-line arguments
+    """
+    if config_manager.config:
+        if args.no_cache:
+            config_manager.config.cache_enabled = False
+        if args.cache_dir:
+            config_manager.config.cache_dir = args.cache_dir
+        if args.llm_cache:
+            config_manager.config.llm_cache_enabled = True
+        if args.top_k:
+            config_manager.config.retrieval_enabled = True
+            config_manager.config.retrieval_top_k = args.top_k
+        if args.ocr_batch_size:
+            config_manager.config.ocr_batch_size = args.ocr_batch_size
+        if args.ocr_workers:
+            config_manager.config.ocr_workers = args.ocr_workers
+        if args.render_pages:
+            config_manager.config.page_render_mode = args.render_pages
+        if args.render_dpi:
+            config_manager.config.page_render_dpi = args.render_dpi
+        if args.easyocr:
+            config_manager.config.ocr_enabled = True
+        if args.easyocr or args.ocr_languages != DEFAULT_OCR_LANGUAGES:
+            config_manager.config.ocr_languages = args.ocr_languages.split(",")
+        if args.easyocr or args.ocr_fallback:
+            config_manager.config.ocr_fallback = args.ocr_fallback
+
+
+def write_pages(
+    processor: PDFProcessor, files: List[Union[str, Path]], out: TextIO
+) -> None:
+    """Write one JSON object per page, flushing each as soon as it is extracted.
+
+    Args:
+        processor: Processor used for extraction and OCR
+        files: Files to extract
+        out: Stream receiving the JSON lines
+    """
+    for file in files:
+        for page in processor.iter_pages(file):
+            record = {"file_name": Path(file).name, **asdict(page)}
+            out.write(json.dumps(record, default=str) + "\n")
+            out.flush()
+
+
+def run_pages(args) -> int:
+    """Stream the pages of the files given with --pages as JSON lines.
+
+    Args:
+        args: Parsed command-line arguments
+
+    Returns:
+        Exit code
+    """
+    config_manager = ConfigManager()
+    apply_overrides(config_manager, args)
+    processor = PDFProcessor(config_manager=config_manager, verbose=args.verbose)
+    files = []
+    for pattern in args.pages:
+        matched_files = glob.glob(pattern)
+        if not matched_files:
+            print(f"Error: File not found: {pattern}")
+            return 1
+        files.extend(matched_files)
+
+    try:
+        if args.output:
+            with open(args.output, "w") as out:
+                write_pages(processor, files, out)
+        else:
+            write_pages(processor, files, sys.stdout)
+    finally:
+        processor.close()
+    return 0
+
+
+def run_corpus(args) -> int:
+    """Update the corpus index and/or answer a prompt from it.
+
+    Args:
+        args: Parsed command-line arguments
+
+    Returns:
+        Exit code
+    """
+    config_manager = ConfigManager()
+    apply_overrides(config_manager, args)
+    processor = PDFProcessor(
+        config_manager=config_manager, verbose=args.verbose, workers=args.workers
+    )
+    index = CorpusIndex(
+        args.index_path
+        or default_index_path(getattr(config_manager.config, "cache_dir", None))
+    )
+    try:
+        if args.index:
+            stats = index.update(args.index, processor, jobs=args.jobs)
+            print(
+                f"Indexed {args.index}: "
+                + ", ".join(f"{count} {status}" for status, count in stats.items())
+            )
+        if args.query:
+            result = query_corpus(
+                processor, index, args.query, top_k=args.top_k or DEFAULT_TOP_K
+            )
+            if not result.success:
+                print(f"Error: {result.error}")
+                return 1
+            output = format_output(result, args.format, show_filenames=False)
+            print(output)
+            if args.output:
+                Path(args.output).write_text(output)
+    finally:
+        index.close()
+        processor.close()
+    return 0
 
 
 def process_files(args):
     """Process files based on the provided arguments."""
-    config_manager = ConfigManager()
+    # A running daemon already has its configuration and warm models loaded.
+    # Per-run overrides need a fresh processor and the daemon does not
+    # stream, so both bypass it.
+    daemon = None
+    if not (args.no_daemon or args.stream or has_overrides(args)):
+        client = DaemonClient(args.socket)
+        if client.is_running():
+            logger.info(f"Dispatching to aigrok daemon on {client.socket_path}")
+            daemon = client
+
+    if daemon is None:
+        config_manager = ConfigManager()
+        apply_overrides(config_manager, args)
 
-    # Initialize processor with verbose setting
-    processor = PDFProcessor(config_manager=config_manager, verbose=args.verbose)
+        # Initialize processor with verbose setting
+        processor = PDFProcessor(
+            config_manager=config_manager, verbose=args.verbose, workers=args.workers
+        )
 
     # Expand glob patterns in file arguments
     files = []
@@ -225,29 +563,48 @@ def process_files(args):
             sys.exit(1)
         files.extend(matched_files)
 
-    # Process files and format output
-    results = []
-    for file in files:
-        logger.info(f"Processing file: {file}")
+    if args.verbose and daemon is None:
+        logger.debug(
+            "Processing Configuration:\n%s",
+            pformat(
+                {
+                    "text_model": config_manager.config.text_model.model_dump(),
+                    "vision_model": config_manager.config.vision_model.model_dump(),
+                    "audio_model": config_manager.config.audio_model.model_dump()
+                    if config_manager.config.audio_model
+                    else None,
+                    "ocr_enabled": config_manager.config.ocr_enabled,
+                    "ocr_languages": config_manager.config.ocr_languages,
+                    "format": args.format,
+                    "jobs": args.jobs,
+                    "llm_concurrency": args.llm_concurrency,
+                }
+            ),
+        )
 
-        if args.verbose:
-            logger.debug(
-                "Processing Configuration:\n%s",
-                pformat(
-                    {
-                        "text_model": config_manager.config.text_model.model_dump(),
-                        "vision_model": config_manager.config.vision_model.model_dump(),
-                        "audio_model": config_manager.config.audio_model.model_dump()
-                        if config_manager.config.audio_model
-                        else None,
-                        "ocr_enabled": config_manager.config.ocr_enabled,
-                        "ocr_languages": config_manager.config.ocr_languages,
-                        "format": args.format,
-                    }
-                ),
-            )
+    # Process files and format output
+    if args.stream:
+        batch = stream_files(processor, files, args.prompt)
+    elif daemon is not None:
+        batch = daemon.process_many(
+            files,
+            args.prompt,
+            concurrency=max(args.jobs, args.llm_concurrency),
+            keep_order=args.keep_order,
+        )
+    else:
+        batch = process_batch(
+            processor,
+            files,
+            args.prompt,
+            jobs=args.jobs,
+            llm_concurrency=args.llm_concurrency,
+            keep_order=args.keep_order,
+        )
 
-        result = processor.process_file(file, args.prompt)
+    results = []
+    for file, result in batch:
+        logger.info(f"Processed file: {file}")
 
         if args.verbose:
             logger.debug(
@@ -267,6 +624,8 @@ def process_files(args):
 
         if result and result.llm_response:
             results.append(result)
+            if args.stream:
+                continue  # Already printed while streaming
             # Print each result immediately
             line = ""
             if result.metadata.get("file_name"):
@@ -285,6 +644,9 @@ def process_files(args):
     if args.output:
         Path(args.output).write_text(output)
 
+    if daemon is None:
+        processor.close()
+
 
 def main():
     """Main entry point."""
@@ -309,6 +671,35 @@ def main():
         config_manager.configure()
         sys.exit(0)
 
+    # Run the daemon in the foreground
+    if args.serve:
+        config_manager = ConfigManager()
+        apply_overrides(config_manager, args)
+        try:
+            serve(
+                config_manager,
+                socket_path=args.socket,
+                verbose=args.verbose,
+                workers=args.workers,
+            )
+        except Exception as e:
+            logger.error(f"Failed to start daemon: {e}")
+            print(f"Error: {e}")
+            sys.exit(1)
+        sys.exit(0)
+
+    # Stream page-by-page extraction
+    if args.pages:
+        sys.exit(run_pages(args))
+
+    # Build or search the corpus index
+    if args.index or args.query:
+        try:
+            sys.exit(run_corpus(args))
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
     # Check for required arguments
     if not args.prompt and not args.files and not args.configure:
         parser.print_help()
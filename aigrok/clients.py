@@ -0,0 +1,157 @@
+"""
+Shared HTTP connection pools for model providers.
+
+Every ``PDFProcessor`` used to build its own ``ollama.Client``, and litellm
+opened connections through its module-level defaults, so concurrent batches
+paid TCP (and TLS) setup for each processor and often each request. Clients
+here are created once per endpoint and pool settings and shared by all
+processors and threads of the process: connections are kept alive between
+requests, and HTTP/2 is negotiated over TLS when the ``h2`` package is
+installed (``pip install 'aigrok[http2]'``). The daemon and the HTTP server
+close the pools with ``close_clients()`` when they shut down.
+"""
+
+import importlib.util
+import sys
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+from loguru import logger
+
+DEFAULT_TIMEOUT_SECONDS = 90.0  # Total operation timeout
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 10.0  # Connection timeout
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_KEEPALIVE_EXPIRY_SECONDS = 30.0
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    """Timeouts and connection pool limits of a shared client.
+
+    Attributes:
+        timeout: Total timeout of a request in seconds
+        connect_timeout: Timeout for establishing a connection in seconds
+        max_connections: Maximum open connections per client
+        max_keepalive_connections: Idle connections kept open for reuse
+        keepalive_expiry: Seconds an idle connection is kept open
+        http2: Negotiate HTTP/2 with servers that support it
+    """
+
+    timeout: float = DEFAULT_TIMEOUT_SECONDS
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT_SECONDS
+    max_connections: int = DEFAULT_MAX_CONNECTIONS
+    max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS
+    keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY_SECONDS
+    http2: bool = True
+
+    @classmethod
+    def from_config(cls, config: Any) -> "PoolSettings":
+        """Read pool settings from an AigrokConfig, using defaults when absent."""
+        return cls(
+            timeout=getattr(config, "http_timeout", DEFAULT_TIMEOUT_SECONDS),
+            connect_timeout=getattr(
+                config, "http_connect_timeout", DEFAULT_CONNECT_TIMEOUT_SECONDS
+            ),
+            max_connections=getattr(
+                config, "http_max_connections", DEFAULT_MAX_CONNECTIONS
+            ),
+            max_keepalive_connections=getattr(
+                config,
+                "http_max_keepalive_connections",
+                DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            keepalive_expiry=getattr(
+                config, "http_keepalive_expiry", DEFAULT_KEEPALIVE_EXPIRY_SECONDS
+            ),
+            http2=getattr(config, "http2", True),
+        )
+
+
+_lock = threading.Lock()
+_clients: Dict[Tuple[str, str, PoolSettings], Any] = {}
+
+
+def http2_available() -> bool:
+    """Return True if the ``h2`` package needed for HTTP/2 is installed."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def _client_kwargs(settings: PoolSettings) -> Dict[str, Any]:
+    """httpx client arguments for the given settings."""
+    import httpx
+
+    return {
+        "timeout": httpx.Timeout(settings.timeout, connect=settings.connect_timeout),
+        "limits": httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+            keepalive_expiry=settings.keepalive_expiry,
+        ),
+        "http2": settings.http2 and http2_available(),
+    }
+
+
+def _build(kind: str, endpoint: str, settings: PoolSettings) -> Any:
+    """Create a client of the given kind."""
+    kwargs = _client_kwargs(settings)
+    if kind == "ollama":
+        import ollama
+
+        return ollama.Client(host=endpoint, **kwargs)
+
+    import httpx
+
+    if endpoint:
+        kwargs["base_url"] = endpoint
+    return httpx.Client(**kwargs)
+
+
+def _shared(kind: str, endpoint: Optional[str], settings: PoolSettings) -> Any:
+    """Return the client for a key, creating it on first use."""
+    key = (kind, endpoint or "", settings)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = _build(kind, endpoint or "", settings)
+            logger.debug(f"Opened {kind} connection pool for {endpoint or 'any host'}")
+        return client
+
+
+def ollama_client(endpoint: str, settings: Optional[PoolSettings] = None) -> Any:
+    """Shared ``ollama.Client`` for an endpoint."""
+    return _shared("ollama", endpoint, settings or PoolSettings())
+
+
+def http_client(
+    endpoint: Optional[str] = None, settings: Optional[PoolSettings] = None
+) -> Any:
+    """Shared ``httpx.Client``; without an endpoint it pools any host."""
+    return _shared("http", endpoint, settings or PoolSettings())
+
+
+def configure_litellm(settings: Optional[PoolSettings] = None) -> None:
+    """Route litellm's OpenAI-compatible requests through the shared pool.
+
+    litellm passes ``client_session`` to the provider SDKs it builds.
+    """
+    import litellm
+
+    litellm.client_session = http_client(settings=settings or PoolSettings())
+
+
+def close_clients() -> None:
+    """Close the shared clients; later calls open new ones."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    litellm = sys.modules.get("litellm")
+    if litellm is not None and getattr(litellm, "client_session", None) in clients:
+        litellm.client_session = None  # Let litellm open its own again
+    for client in clients:
+        close = getattr(getattr(client, "_client", client), "close", None)
+        try:
+            if close:
+                close()
+        except Exception as e:
+            logger.debug(f"Failed to close HTTP client: {e}")
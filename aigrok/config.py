@@ -8,13 +8,24 @@ This module handles:
 4. Configuration persistence
 """
 
+import importlib
 import os
+import sys
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Literal, Optional, Any
 import yaml
 from pydantic import BaseModel, Field
 from loguru import logger
-import ollama
+
+# ollama is imported on first use so that `aigrok --help` stays fast
+_LAZY_MODULES = {"ollama": "ollama"}
+
+
+def __getattr__(name: str) -> Any:
+    """Resolve lazily imported modules accessed as attributes of this module."""
+    if name in _LAZY_MODULES:
+        return importlib.import_module(_LAZY_MODULES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class ModelConfig(BaseModel):
@@ -23,6 +34,8 @@ class ModelConfig(BaseModel):
     provider: str
     model_name: str
     endpoint: Optional[str] = None
+    endpoints: Optional[List[str]] = None  # Ollama hosts to balance requests over
+    max_context_tokens: Optional[int] = None  # Overrides AigrokConfig default
 
     model_config = {"protected_namespaces": (), "extra": "allow"}
 
@@ -34,6 +47,14 @@ class ModelConfig(BaseModel):
         return data
 
 
+class RateLimitConfig(BaseModel):
+    """Client-side rate limits of a provider or model."""
+
+    rpm: Optional[int] = Field(default=None, ge=1)  # Requests per minute
+    tpm: Optional[int] = Field(default=None, ge=1)  # Tokens per minute
+    output_tokens: int = Field(default=500, ge=0)  # Reserved per response
+
+
 class OCRConfig(BaseModel):
     """Configuration for OCR."""
 
@@ -52,6 +73,51 @@ class AigrokConfig(BaseModel):
     ocr_languages: List[str] = Field(default_factory=lambda: ["en"])
     ocr_fallback: bool = Field(default=False)
     ocr_confidence_threshold: float = Field(default=0.5, ge=0.0, le=1.0)
+    ocr_batch_size: int = Field(default=8, ge=1)
+    ocr_workers: int = Field(default=1, ge=1)
+    ocr_page_mode: Literal["auto", "always"] = "auto"
+    ocr_min_text_chars: int = Field(default=50, ge=0)
+    ocr_max_image_coverage: float = Field(default=0.5, ge=0.0, le=1.0)
+    ocr_min_image_px: int = Field(default=32, ge=0)
+    page_render_mode: Literal["auto", "always", "never"] = "auto"
+    page_render_dpi: int = Field(default=150, ge=36, le=600)
+    page_render_max_images: int = Field(default=3, ge=0)
+    page_render_min_image_px: int = Field(default=256, ge=0)
+    vision_max_image_px: int = Field(default=1568, ge=64)
+    vision_image_format: Literal["jpeg", "webp", "png"] = "jpeg"
+    vision_image_quality: int = Field(default=85, ge=1, le=100)
+    vision_grayscale: bool = False
+    cache_enabled: bool = Field(default=True)
+    cache_dir: Optional[str] = Field(default=None)
+    cache_max_size_mb: int = Field(default=1024, ge=1)
+    llm_cache_enabled: bool = Field(default=False)
+    llm_cache_ttl_seconds: int = Field(default=24 * 60 * 60, ge=0)
+    llm_cache_max_entries: int = Field(default=10000, ge=1)
+    # Map-reduce over chunks of this many tokens; None sends documents whole
+    max_context_tokens: Optional[int] = Field(default=None, ge=1)
+    chunk_concurrency: int = Field(default=4, ge=1)
+    retrieval_enabled: bool = False
+    retrieval_top_k: int = Field(default=5, ge=1)
+    http_timeout: float = Field(default=90.0, gt=0)
+    http_connect_timeout: float = Field(default=10.0, gt=0)
+    http_max_connections: int = Field(default=100, ge=1)
+    http_max_keepalive_connections: int = Field(default=20, ge=0)
+    http_keepalive_expiry: float = Field(default=30.0, ge=0)
+    http2: bool = True
+    endpoint_eject_after: int = Field(default=3, ge=1)
+    endpoint_eject_seconds: float = Field(default=30.0, ge=0)
+    llm_retries: int = Field(default=2, ge=0)
+    llm_retry_base_delay: float = Field(default=0.5, ge=0)
+    llm_retry_max_delay: float = Field(default=8.0, ge=0)
+    llm_breaker_threshold: int = Field(default=5, ge=1)
+    llm_breaker_reset_seconds: float = Field(default=30.0, ge=0)
+    llm_hedge: bool = False
+    llm_hedge_min_delay: float = Field(default=0.5, ge=0)
+    # Hedge single endpoints by resending to the same endpoint (pools use
+    # another host regardless)
+    llm_hedge_same_endpoint: bool = False
+    # Keyed by "provider/model", or by "provider" for each of its models
+    rate_limits: Dict[str, RateLimitConfig] = Field(default_factory=dict)
 
     class Config:
         extra = "allow"
@@ -472,6 +538,9 @@ class ConfigManager:
     def _get_ollama_models(self) -> Dict[str, List[str]]:
         """Get available Ollama models."""
         try:
+            # Through the module so aigrok.config.ollama can be patched
+            ollama = sys.modules[__name__].ollama
+
             # Try to connect to Ollama server
             client = ollama.Client(
                 host=self.SUPPORTED_PROVIDERS["ollama"]["default_endpoint"]
@@ -0,0 +1,312 @@
+"""
+Search index over a corpus of processed documents.
+
+``CorpusIndex`` keeps an inverted index of page chunks from every PDF under one
+or more directories in a SQLite database (``~/.cache/aigrok/corpus.sqlite`` by
+default). Re-indexing a directory only extracts files whose size, modification
+time and content hash changed, and drops files that were deleted. A prompt is
+then answered from the best matching chunks across the whole corpus instead of
+sending every document to the model.
+"""
+
+import json
+import os
+import sqlite3
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+from loguru import logger
+from .batch import extract_batch
+from .cache import DEFAULT_CACHE_DIR, file_hash
+from .chunking import split_text
+from .pdf_processor import DocumentContent, PDFProcessor
+from .retrieval import DEFAULT_TOP_K, idf, term_score, tokenize
+from .types import ProcessingResult
+
+DEFAULT_CHUNK_TOKENS = 500
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS documents (
+        path TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mtime REAL NOT NULL,
+        hash TEXT NOT NULL,
+        page_count INTEGER NOT NULL,
+        metadata TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS chunks (
+        id INTEGER PRIMARY KEY,
+        path TEXT NOT NULL,
+        page INTEGER NOT NULL,
+        offset INTEGER NOT NULL,
+        length INTEGER NOT NULL,
+        text TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS chunks_path ON chunks (path)",
+    """CREATE TABLE IF NOT EXISTS postings (
+        term TEXT NOT NULL,
+        chunk_id INTEGER NOT NULL,
+        tf INTEGER NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS postings_term ON postings (term)",
+    "CREATE INDEX IF NOT EXISTS postings_chunk ON postings (chunk_id)",
+)
+
+
+def default_index_path(cache_dir: Optional[Union[str, Path]] = None) -> Path:
+    """Return the corpus database path inside the cache directory."""
+    root = Path(cache_dir).expanduser() if cache_dir else DEFAULT_CACHE_DIR
+    return root / "corpus.sqlite"
+
+
+@dataclass
+class ChunkHit:
+    """A chunk matching a search, with its location in the corpus."""
+
+    path: str
+    page: int  # 1-based; pages past the document's page count are OCR'd images
+    offset: int  # Character offset of the chunk in the page text
+    text: str
+    score: float
+
+
+class CorpusIndex:
+    """Persistent inverted index over page chunks of many documents."""
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    ):
+        """Open the index, creating the database if needed.
+
+        Args:
+            path: Database file (defaults to ~/.cache/aigrok/corpus.sqlite)
+            chunk_tokens: Token budget of each indexed chunk
+        """
+        self.path = Path(path).expanduser() if path else default_index_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.chunk_tokens = chunk_tokens
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        with self._conn:
+            for statement in SCHEMA:
+                self._conn.execute(statement)
+
+    def update(
+        self,
+        directory: Union[str, Path],
+        processor: PDFProcessor,
+        jobs: int = 1,
+    ) -> Dict[str, int]:
+        """Bring the index up to date with the PDFs under a directory.
+
+        Files whose size and modification time are unchanged are skipped
+        without reading them; files that were only touched are recognized by
+        their content hash. New and changed files are extracted with
+        ``processor`` in ``jobs`` processes.
+
+        Args:
+            directory: Directory searched recursively for PDFs
+            processor: Processor used for extraction
+            jobs: Number of extraction processes
+
+        Returns:
+            Counts of added, updated, unchanged, removed and failed files
+        """
+        directory = Path(directory).expanduser().resolve()
+        if not directory.is_dir():
+            raise ValueError(f"Not a directory: {directory}")
+
+        stats = dict.fromkeys(
+            ("added", "updated", "unchanged", "removed", "failed"), 0
+        )
+        prefix = f"{directory}{os.sep}"
+        known = {
+            row[0]: row[1:]
+            for row in self._conn.execute(
+                "SELECT path, size, mtime, hash FROM documents "
+                "WHERE substr(path, 1, ?) = ?",
+                (len(prefix), prefix),
+            )
+        }
+        files = sorted(
+            p
+            for p in directory.rglob("*")
+            if p.suffix.lower() == ".pdf" and p.is_file()
+        )
+
+        changed: Dict[str, Dict[str, Any]] = {}
+        for file in files:
+            stat = file.stat()
+            record = {"size": stat.st_size, "mtime": stat.st_mtime}
+            previous = known.pop(str(file), None)
+            if previous and tuple(previous[:2]) == (record["size"], record["mtime"]):
+                stats["unchanged"] += 1
+                continue
+            record["hash"] = file_hash(file)
+            if previous and previous[2] == record["hash"]:
+                with self._conn:
+                    self._conn.execute(
+                        "UPDATE documents SET size = ?, mtime = ? WHERE path = ?",
+                        (record["size"], record["mtime"], str(file)),
+                    )
+                stats["unchanged"] += 1
+                continue
+            record["status"] = "updated" if previous else "added"
+            changed[str(file)] = record
+
+        for path in known:
+            with self._conn:
+                self._remove(path)
+            stats["removed"] += 1
+
+        for path, content in extract_batch(processor, list(changed), jobs=jobs):
+            record = changed[path]
+            if isinstance(content, Exception):
+                logger.error(f"Failed to index {path}: {content}")
+                with self._conn:
+                    self._remove(path)
+                stats["failed"] += 1
+                continue
+            self._add(path, record, content)
+            stats[record["status"]] += 1
+            logger.info(f"Indexed {path}")
+
+        return stats
+
+    def _add(self, path: str, record: Dict[str, Any], content: DocumentContent) -> None:
+        """Replace a document's chunks and postings."""
+        with self._conn:
+            self._remove(path)
+            self._conn.execute(
+                "INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    path,
+                    record["size"],
+                    record["mtime"],
+                    record["hash"],
+                    content.page_count,
+                    json.dumps(content.metadata, default=str),
+                ),
+            )
+            for page_num, page in enumerate(content.pages or [content.text], 1):
+                offset = 0
+                for chunk in split_text([page], self.chunk_tokens):
+                    chunk = chunk.strip()
+                    found = page.find(chunk[:64], offset)
+                    offset = found if found >= 0 else offset
+                    terms = Counter(tokenize(chunk))
+                    cursor = self._conn.execute(
+                        "INSERT INTO chunks (path, page, offset, length, text) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (path, page_num, offset, sum(terms.values()), chunk),
+                    )
+                    self._conn.executemany(
+                        "INSERT INTO postings VALUES (?, ?, ?)",
+                        [(term, cursor.lastrowid, tf) for term, tf in terms.items()],
+                    )
+
+    def _remove(self, path: str) -> None:
+        """Delete a document and its chunks (within the caller's transaction)."""
+        self._conn.execute(
+            "DELETE FROM postings WHERE chunk_id IN "
+            "(SELECT id FROM chunks WHERE path = ?)",
+            (path,),
+        )
+        self._conn.execute("DELETE FROM chunks WHERE path = ?", (path,))
+        self._conn.execute("DELETE FROM documents WHERE path = ?", (path,))
+
+    def search(self, query: str, k: int = DEFAULT_TOP_K) -> List[ChunkHit]:
+        """Rank indexed chunks against a query with BM25.
+
+        Args:
+            query: Free-text query, usually the user prompt
+            k: Maximum number of chunks to return
+
+        Returns:
+            Chunks matching at least one query term, best first
+        """
+        count, avg_length = self._conn.execute(
+            "SELECT COUNT(*), AVG(length) FROM chunks"
+        ).fetchone()
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._conn.execute(
+                "SELECT p.chunk_id, p.tf, c.length FROM postings p "
+                "JOIN chunks c ON c.id = p.chunk_id WHERE p.term = ?",
+                (term,),
+            ).fetchall()
+            term_idf = idf(count, len(postings))
+            for chunk_id, tf, length in postings:
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + term_score(
+                    tf, length, avg_length, term_idf
+                )
+
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        hits = []
+        for chunk_id, score in best:
+            path, page, offset, text = self._conn.execute(
+                "SELECT path, page, offset, text FROM chunks WHERE id = ?", (chunk_id,)
+            ).fetchone()
+            hits.append(ChunkHit(path, page, offset, text, score))
+        return hits
+
+    def documents(self) -> List[Dict[str, Any]]:
+        """Return the path, page count and metadata of every indexed document."""
+        return [
+            {"path": path, "page_count": page_count, "metadata": json.loads(metadata)}
+            for path, page_count, metadata in self._conn.execute(
+                "SELECT path, page_count, metadata FROM documents ORDER BY path"
+            )
+        ]
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._conn.close()
+
+
+def query_corpus(
+    processor: PDFProcessor,
+    index: CorpusIndex,
+    prompt: str,
+    top_k: int = DEFAULT_TOP_K,
+) -> ProcessingResult:
+    """Answer a prompt from the best matching chunks of an indexed corpus.
+
+    Args:
+        processor: Processor used for the LLM query
+        index: Corpus to search
+        prompt: User prompt
+        top_k: Number of chunks sent to the model
+
+    Returns:
+        Processing result whose metadata lists the chunks used as ``sources``
+    """
+    hits = index.search(prompt, top_k)
+    if not hits:
+        return ProcessingResult(
+            success=False, error="No indexed document matches the prompt"
+        )
+
+    sources = [
+        {
+            "file_name": Path(hit.path).name,
+            "path": hit.path,
+            "page": hit.page,
+            "offset": hit.offset,
+            "score": round(hit.score, 3),
+        }
+        for hit in hits
+    ]
+    pages = [
+        f"[{source['file_name']}, page {source['page']}]\n{hit.text}"
+        for source, hit in zip(sources, hits)
+    ]
+    content = DocumentContent(
+        text="\n\n".join(pages),
+        page_count=len(pages),
+        metadata={"sources": sources},
+        pages=pages,
+    )
+    return processor.query(content, prompt)
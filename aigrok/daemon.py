@@ -0,0 +1,239 @@
+"""
+Long-lived local worker that keeps the OCR reader and model clients warm.
+
+``aigrok --serve`` loads the configuration, builds one ``PDFProcessor`` (and
+with it the EasyOCR reader) and answers requests on a Unix socket. The CLI
+checks for a live socket before processing and, when one answers, sends each
+file there instead of paying the model load cost again.
+
+Requests and responses are single lines of JSON:
+
+    {"op": "ping"}                          -> {"ok": true, "pid": ..., "version": ...}
+    {"op": "process", "file": ..., "prompt": ...} -> ProcessingResult fields
+"""
+
+import json
+import os
+import signal
+import socket
+import socketserver
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from loguru import logger
+from . import __version__, cache
+from .batch import _failure
+from .clients import close_clients
+from .config import ConfigManager
+from .pdf_processor import PDFProcessor
+from .types import ProcessingResult
+
+CONNECT_TIMEOUT_SECONDS = 0.5
+
+
+def default_socket_path() -> Path:
+    """Return the daemon socket path ($AIGROK_SOCKET or inside the cache dir)."""
+    env_path = os.getenv("AIGROK_SOCKET")
+    if env_path:
+        return Path(env_path).expanduser()
+    return cache.DEFAULT_CACHE_DIR / "daemon.sock"
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Answer newline-delimited JSON requests on one connection."""
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                response = self.server.dispatch(json.loads(line))
+            except Exception as e:
+                logger.error(f"Daemon request failed: {e}")
+                response = {"success": False, "error": str(e)}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class DaemonServer(socketserver.ThreadingUnixStreamServer):
+    """Unix socket server sharing one warm processor across requests.
+
+    Each connection gets its own thread. Extraction is serialized because
+    MuPDF and the OCR reader are not thread-safe; LLM queries run
+    concurrently.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: Union[str, Path], processor: PDFProcessor):
+        """Bind the socket, replacing a stale one left by a dead daemon.
+
+        Args:
+            socket_path: Path of the Unix socket
+            processor: Warm processor used for every request
+
+        Raises:
+            RuntimeError: If another daemon is already listening on the socket
+        """
+        self.socket_path = Path(socket_path)
+        if self.socket_path.exists():
+            if DaemonClient(self.socket_path).is_running():
+                raise RuntimeError(f"aigrok daemon already running on {socket_path}")
+            self.socket_path.unlink()
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self.processor = processor
+        self._extract_lock = threading.Lock()
+        super().__init__(str(self.socket_path), _RequestHandler)
+        os.chmod(self.socket_path, 0o600)
+
+    def dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle one decoded request and return the response payload."""
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid(), "version": __version__}
+        if op == "process":
+            return self.process(request["file"], request.get("prompt")).model_dump(
+                mode="json"
+            )
+        raise ValueError(f"Unknown daemon operation: {op}")
+
+    def process(self, file_path: str, prompt: Optional[str]) -> ProcessingResult:
+        """Extract a file under the extraction lock, then query the LLM."""
+        logger.info(f"Daemon processing {file_path}")
+        try:
+            with self._extract_lock:
+                content = self.processor.extract(file_path)
+        except Exception as e:
+            return _failure(file_path, e)
+        return self.processor.query(content, prompt)
+
+    def server_close(self) -> None:
+        """Close the socket and remove its file."""
+        super().server_close()
+        self.socket_path.unlink(missing_ok=True)
+
+
+class DaemonClient:
+    """Client for a running daemon; mirrors ``PDFProcessor.process_file``."""
+
+    def __init__(self, socket_path: Optional[Union[str, Path]] = None):
+        """Initialize the client.
+
+        Args:
+            socket_path: Daemon socket (defaults to default_socket_path())
+        """
+        self.socket_path = Path(socket_path) if socket_path else default_socket_path()
+
+    def _request(self, payload: Dict[str, Any], timeout: Optional[float]) -> Any:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(CONNECT_TIMEOUT_SECONDS)
+            sock.connect(str(self.socket_path))
+            sock.settimeout(timeout)
+            sock.sendall(json.dumps(payload).encode() + b"\n")
+            with sock.makefile("rb") as f:
+                line = f.readline()
+        if not line:
+            raise ConnectionError("aigrok daemon closed the connection")
+        return json.loads(line)
+
+    def is_running(self) -> bool:
+        """Return True if a daemon answers on the socket."""
+        if not self.socket_path.exists():
+            return False
+        try:
+            return bool(
+                self._request({"op": "ping"}, CONNECT_TIMEOUT_SECONDS).get("ok")
+            )
+        except (OSError, ValueError):
+            return False
+
+    def process_file(
+        self, file_path: Union[str, Path], prompt: Optional[str] = None
+    ) -> ProcessingResult:
+        """Process a file in the daemon.
+
+        Args:
+            file_path: File to process; sent as an absolute path
+            prompt: Processing prompt
+
+        Returns:
+            Processing result; a failed result if the daemon is unreachable
+        """
+        try:
+            response = self._request(
+                {
+                    "op": "process",
+                    "file": str(Path(file_path).resolve()),
+                    "prompt": prompt,
+                },
+                timeout=None,
+            )
+            return ProcessingResult(**response)
+        except Exception as e:
+            return _failure(file_path, e)
+
+    def process_many(
+        self,
+        files: List[Union[str, Path]],
+        prompt: Optional[str],
+        concurrency: int = 1,
+        keep_order: bool = False,
+    ) -> Iterator[Tuple[Union[str, Path], ProcessingResult]]:
+        """Send files to the daemon over up to ``concurrency`` connections.
+
+        Args:
+            files: Files to process
+            prompt: Processing prompt
+            concurrency: Number of requests in flight
+            keep_order: Yield results in input order instead of completion order
+
+        Yields:
+            Tuples of (file, result)
+        """
+        if concurrency <= 1:
+            for file in files:
+                yield file, self.process_file(file, prompt)
+            return
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = {pool.submit(self.process_file, f, prompt): f for f in files}
+            if keep_order:
+                for future, file in futures.items():
+                    yield file, future.result()
+                return
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+
+def serve(
+    config_manager: ConfigManager,
+    socket_path: Optional[Union[str, Path]] = None,
+    verbose: bool = False,
+    workers: int = 1,
+) -> None:
+    """Run the daemon in the foreground until interrupted.
+
+    Args:
+        config_manager: Configuration used for the warm processor
+        socket_path: Socket to listen on (defaults to default_socket_path())
+        verbose: Enable verbose processor logging
+        workers: Number of processes used to extract pages of large PDFs
+    """
+    socket_path = Path(socket_path) if socket_path else default_socket_path()
+    processor = PDFProcessor(
+        config_manager=config_manager, verbose=verbose, workers=workers
+    )
+    processor.preload_ocr()
+    # Exit cleanly on SIGTERM so the socket file is removed
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    with DaemonServer(socket_path, processor) as server:
+        logger.info(f"aigrok daemon listening on {socket_path}")
+        print(f"aigrok daemon listening on {socket_path}", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("aigrok daemon stopped")
+        finally:
+            processor.close()
+            close_clients()
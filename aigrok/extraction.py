@@ -0,0 +1,395 @@
+"""Single-pass content extraction for PDF documents."""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Collection, Dict, List, Optional, Tuple, Union
+from loguru import logger
+import fitz  # PyMuPDF
+from PIL import Image
+from .images import PageImage
+
+# Bump when extraction output changes so cached results are invalidated
+EXTRACTION_VERSION = 3
+
+RENDER_MODES = ("auto", "always", "never")
+DEFAULT_RENDER_DPI = 150
+DEFAULT_RENDER_MAX_IMAGES = 3  # More embedded images than this: render the page
+DEFAULT_RENDER_MIN_IMAGE_PX = 256  # Pages whose images are all smaller: render
+
+OCR_PAGE_MODES = ("auto", "always")
+DEFAULT_OCR_MIN_TEXT_CHARS = 50  # Text layers with fewer characters are sparse
+DEFAULT_OCR_MAX_IMAGE_COVERAGE = 0.5  # Images covering more of a page: OCR
+DEFAULT_OCR_MIN_IMAGE_PX = 32  # Images smaller than this hold no legible text
+
+
+@dataclass
+class ImageInfo:
+    """Metadata for an image embedded in a PDF.
+
+    Attributes mirror the tuple returned by ``page.get_images(full=True)``.
+    ``pages`` lists every (zero-based) page that references the image, so a
+    logo repeated on every page is still a single entry. ``data`` holds the
+    encoded image stream when it was already pulled out by a worker process.
+    """
+
+    xref: int
+    width: int = 0
+    height: int = 0
+    bpc: int = 0
+    colorspace: str = ""
+    name: str = ""
+    pages: List[int] = field(default_factory=list)
+    data: Optional[bytes] = None
+
+    @property
+    def first_page(self) -> int:
+        """Zero-based number of the first page referencing the image."""
+        return self.pages[0] if self.pages else 0
+
+
+@dataclass
+class PageRecord:
+    """Text and image references extracted from a single page."""
+
+    page_num: int
+    text: str = ""
+    image_xrefs: List[int] = field(default_factory=list)
+
+
+@dataclass
+class DocumentExtraction:
+    """Page-indexed extraction of a whole document."""
+
+    pages: List[PageRecord] = field(default_factory=list)
+    images: Dict[int, ImageInfo] = field(default_factory=dict)
+
+    @property
+    def page_count(self) -> int:
+        """Number of pages walked."""
+        return len(self.pages)
+
+    @property
+    def text_pages(self) -> List[str]:
+        """Text of every page that has a non-blank text layer."""
+        return [page.text for page in self.pages if page.text.strip()]
+
+
+def _image_info(img: tuple) -> ImageInfo:
+    """Build ImageInfo from a ``get_images(full=True)`` entry."""
+
+    def _field(index, default):
+        return img[index] if len(img) > index and img[index] is not None else default
+
+    return ImageInfo(
+        xref=img[0],
+        width=_field(2, 0),
+        height=_field(3, 0),
+        bpc=_field(4, 0),
+        colorspace=_field(5, ""),
+        name=_field(7, ""),
+    )
+
+
+def _walk_pages(pages, extraction: DocumentExtraction, start: int = 0) -> None:
+    """Append a PageRecord per page to ``extraction``, indexing images by xref."""
+    for page_num, page in enumerate(pages, start):
+        record = PageRecord(page_num=page_num, text=page.get_text() or "")
+        for img in page.get_images(full=True):
+            xref = img[0]
+            info = extraction.images.get(xref)
+            if info is None:
+                info = extraction.images[xref] = _image_info(img)
+            if page_num not in info.pages:
+                info.pages.append(page_num)
+            if xref not in record.image_xrefs:
+                record.image_xrefs.append(xref)
+        extraction.pages.append(record)
+
+
+def extract_document(doc: fitz.Document) -> DocumentExtraction:
+    """Walk a document exactly once, recording text and image references.
+
+    Args:
+        doc: PyMuPDF document object
+
+    Returns:
+        DocumentExtraction with one PageRecord per page and one ImageInfo per
+        unique image xref (in order of first appearance)
+    """
+    extraction = DocumentExtraction()
+    _walk_pages(doc, extraction)
+
+    logger.debug(
+        f"Extracted {extraction.page_count} pages with "
+        f"{len(extraction.images)} unique images"
+    )
+    return extraction
+
+
+def extract_page(doc: fitz.Document, page_num: int) -> DocumentExtraction:
+    """Extract a single page, for consumers that walk a document page by page.
+
+    Args:
+        doc: PyMuPDF document object
+        page_num: Zero-based page number
+
+    Returns:
+        DocumentExtraction holding one PageRecord and the page's images
+    """
+    extraction = DocumentExtraction()
+    _walk_pages([doc[page_num]], extraction, page_num)
+    return extraction
+
+
+def page_ranges(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """Split ``page_count`` pages into at most ``workers`` contiguous ranges.
+
+    Returns:
+        List of (start, stop) tuples covering every page in order
+    """
+    workers = max(1, min(workers, page_count))
+    size, remainder = divmod(page_count, workers)
+    ranges = []
+    start = 0
+    for index in range(workers):
+        stop = start + size + (1 if index < remainder else 0)
+        if stop > start:
+            ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> DocumentExtraction:
+    """Extract pages ``start``..``stop`` in a worker process.
+
+    Each worker opens its own document, since fitz.Document objects cannot be
+    shared across processes. Image streams first referenced in the range are
+    extracted here too so the MuPDF work happens off the main process.
+    """
+    extraction = DocumentExtraction()
+    with fitz.open(file_path) as doc:
+        _walk_pages((doc[n] for n in range(start, stop)), extraction, start)
+        for xref, info in extraction.images.items():
+            try:
+                info.data = doc.extract_image(xref)["image"]
+            except Exception as e:
+                logger.warning(f"Failed to extract image {xref}: {e}")
+    return extraction
+
+
+def extract_document_parallel(
+    file_path: Union[str, Path], page_count: int, workers: int
+) -> DocumentExtraction:
+    """Extract a document by splitting its pages across a process pool.
+
+    Args:
+        file_path: Path to the PDF; every worker opens it independently
+        page_count: Number of pages in the document
+        workers: Maximum number of worker processes
+
+    Returns:
+        DocumentExtraction equivalent to extract_document, merged in page order
+    """
+    ranges = page_ranges(page_count, workers)
+    extraction = DocumentExtraction()
+    with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+        parts = pool.map(
+            _extract_page_range,
+            [str(file_path)] * len(ranges),
+            [start for start, _ in ranges],
+            [stop for _, stop in ranges],
+        )
+        for part in parts:
+            extraction.pages.extend(part.pages)
+            for xref, info in part.images.items():
+                merged = extraction.images.get(xref)
+                if merged is None:
+                    extraction.images[xref] = info
+                else:
+                    merged.pages.extend(info.pages)
+
+    logger.debug(
+        f"Extracted {extraction.page_count} pages with "
+        f"{len(extraction.images)} unique images using {len(ranges)} workers"
+    )
+    return extraction
+
+
+def pages_to_render(
+    doc: fitz.Document,
+    extraction: DocumentExtraction,
+    mode: str = "auto",
+    max_images: int = DEFAULT_RENDER_MAX_IMAGES,
+    min_image_px: int = DEFAULT_RENDER_MIN_IMAGE_PX,
+) -> List[int]:
+    """Choose the pages to send as one rendered raster instead of their images.
+
+    In ``auto`` mode only pages without a text layer are considered, since the
+    text of other pages already reaches the model. Such a page is rendered
+    when it has more than ``max_images`` embedded images, when all of its
+    images are smaller than ``min_image_px`` on their longer side, or when it
+    has no images but has vector drawings (diagrams, forms, text as paths).
+
+    Args:
+        doc: PyMuPDF document the extraction was produced from
+        extraction: Result of extract_document
+        mode: ``auto``, ``always`` (render every page) or ``never``
+        max_images: Embedded image count above which a page is rendered
+        min_image_px: Image size below which images are not worth sending alone
+
+    Returns:
+        Zero-based numbers of the pages to render
+    """
+    if mode not in RENDER_MODES:
+        raise ValueError(f"Unknown page render mode: {mode}")
+    if mode == "never":
+        return []
+    if mode == "always":
+        return [page.page_num for page in extraction.pages]
+
+    render = []
+    for page in extraction.pages:
+        if page.text.strip():
+            continue
+        sizes = [
+            max(extraction.images[xref].width, extraction.images[xref].height)
+            for xref in page.image_xrefs
+        ]
+        if sizes:
+            if len(sizes) > max_images or max(sizes) < min_image_px:
+                render.append(page.page_num)
+        elif doc[page.page_num].get_drawings():
+            render.append(page.page_num)
+    return render
+
+
+def image_coverage(page: fitz.Page, xrefs: Collection[int]) -> float:
+    """Fraction of a page's area covered by the given images (capped at 1)."""
+    area = abs(page.rect)
+    if not area:
+        return 0.0
+    covered = sum(
+        abs(fitz.Rect(info["bbox"]) & page.rect)
+        for info in page.get_image_info(xrefs=True)
+        if info.get("xref") in xrefs
+    )
+    return min(1.0, covered / area)
+
+
+def pages_to_ocr(
+    doc: fitz.Document,
+    extraction: DocumentExtraction,
+    rendered_pages: Collection[int] = (),
+    mode: str = "auto",
+    min_text_chars: int = DEFAULT_OCR_MIN_TEXT_CHARS,
+    max_image_coverage: float = DEFAULT_OCR_MAX_IMAGE_COVERAGE,
+    min_image_px: int = DEFAULT_OCR_MIN_IMAGE_PX,
+) -> List[int]:
+    """Choose the pages whose images need OCR.
+
+    In ``auto`` mode a page is OCR'd when it has an image of at least
+    ``min_image_px`` on its longer side (or was rendered whole) and either its
+    text layer has fewer than ``min_text_chars`` non-whitespace characters or
+    its images cover at least ``max_image_coverage`` of the page. Pages whose
+    text layer already carries the content, with logos and decorations
+    beside it, are skipped.
+
+    Args:
+        doc: PyMuPDF document the extraction was produced from
+        extraction: Result of extract_document
+        rendered_pages: Zero-based pages sent as one rendered raster
+        mode: ``auto`` or ``always`` (OCR every page with images)
+        min_text_chars: Text layer size below which a page is OCR'd
+        max_image_coverage: Image area fraction above which a page is OCR'd
+        min_image_px: Image size below which images are not OCR'd
+
+    Returns:
+        Zero-based numbers of the pages to OCR
+    """
+    if mode not in OCR_PAGE_MODES:
+        raise ValueError(f"Unknown OCR page mode: {mode}")
+    rendered_pages = set(rendered_pages)
+    if mode == "always":
+        return [
+            page.page_num
+            for page in extraction.pages
+            if page.image_xrefs or page.page_num in rendered_pages
+        ]
+
+    ocr = []
+    for page in extraction.pages:
+        sparse = len("".join(page.text.split())) < min_text_chars
+        if page.page_num in rendered_pages:
+            if sparse:
+                ocr.append(page.page_num)
+            continue
+        large = {
+            xref
+            for xref in page.image_xrefs
+            if max(extraction.images[xref].width, extraction.images[xref].height)
+            >= min_image_px
+        }
+        if large and (
+            sparse
+            or image_coverage(doc[page.page_num], large) >= max_image_coverage
+        ):
+            ocr.append(page.page_num)
+    return ocr
+
+
+def render_page(
+    doc: fitz.Document, page_num: int, dpi: int = DEFAULT_RENDER_DPI
+) -> Image.Image:
+    """Rasterize one page to an RGB image at ``dpi``."""
+    pix = doc[page_num].get_pixmap(dpi=dpi, alpha=False)
+    return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+
+def load_images(
+    doc: fitz.Document,
+    extraction: DocumentExtraction,
+    rendered_pages: Collection[int] = (),
+    dpi: int = DEFAULT_RENDER_DPI,
+) -> List[Tuple[PageImage, int]]:
+    """Load each unique image of an extraction once, rendering chosen pages.
+
+    Args:
+        doc: PyMuPDF document the extraction was produced from
+        extraction: Result of extract_document
+        rendered_pages: Zero-based pages to rasterize whole; images referenced
+            only by these pages are not decoded separately
+        dpi: Resolution of rendered pages
+
+    Returns:
+        List of tuples containing (PageImage, page number) in page order, where
+        the page number of an embedded image is the first page referencing it.
+        Embedded images keep their encoded stream and are only decoded when
+        used.
+    """
+    rendered_pages = set(rendered_pages)
+    images = []
+    for page_num in sorted(rendered_pages):
+        try:
+            images.append((PageImage(image=render_page(doc, page_num, dpi)), page_num))
+        except Exception as e:
+            logger.warning(f"Failed to render page {page_num}: {e}")
+
+    for xref, info in extraction.images.items():
+        if rendered_pages and rendered_pages.issuperset(info.pages):
+            continue
+        try:
+            data = info.data
+            if data is None:
+                data = doc.extract_image(xref)["image"]
+            images.append((PageImage(data), info.first_page))
+        except Exception as e:
+            logger.warning(
+                f"Failed to process image {xref} on page {info.first_page}: {e}"
+            )
+            continue
+
+    if rendered_pages:
+        logger.debug(f"Rendered {len(rendered_pages)} pages at {dpi} DPI")
+        images.sort(key=lambda item: item[1])
+    return images
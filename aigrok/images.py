@@ -0,0 +1,177 @@
+"""
+Extracted images and their encoding for vision model uploads.
+
+``PageImage`` keeps the encoded stream an image was extracted with and decodes
+pixels only when a consumer needs them. Consumers in one process share the
+decoded buffer, and the last one releases it, so a document with hundreds of
+images holds little more than their compressed bytes. Pixels never cross
+process boundaries: OCR workers and extraction workers decode their own copy.
+
+Full-resolution PNGs of high-DPI scans are several megabytes each, which
+dominates upload time and the model's prefill. ``encode_image`` fits an image
+into an ``ImageBudget`` (maximum dimensions, output format and quality,
+optional grayscale) and forwards the original RGB or grayscale JPEG stream
+untouched when it already fits, avoiding a decode/encode round-trip.
+"""
+
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Any, Dict, Optional, Tuple, Union
+from PIL import Image
+
+DEFAULT_MAX_IMAGE_PX = 1568
+DEFAULT_IMAGE_FORMAT = "jpeg"
+DEFAULT_IMAGE_QUALITY = 85
+
+MIME_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp", "png": "image/png"}
+
+
+@dataclass
+class ImageBudget:
+    """Limits applied to images before they are sent to a vision model.
+
+    Attributes:
+        max_px: Maximum width and height; larger images are downscaled
+        format: Output format for re-encoded images (jpeg, webp or png)
+        quality: JPEG/WebP quality (1-100)
+        grayscale: Convert color images to grayscale
+    """
+
+    max_px: int = DEFAULT_MAX_IMAGE_PX
+    format: str = DEFAULT_IMAGE_FORMAT
+    quality: int = DEFAULT_IMAGE_QUALITY
+    grayscale: bool = False
+
+
+class PageImage:
+    """An extracted image: its encoded bytes plus lazily decoded pixels.
+
+    Opening the encoded stream only parses its header, so ``size``, ``mode``
+    and ``format`` are available without decoding. ``pixels`` decodes once
+    and keeps a single array (``np.asarray(page_image)`` returns it without a
+    copy); ``release()`` drops decoded data again. Images with no encoded
+    form, such as rendered pages, keep their PIL Image instead.
+    """
+
+    def __init__(
+        self, data: Optional[bytes] = None, image: Optional[Image.Image] = None
+    ):
+        """Wrap an encoded stream or an already decoded image.
+
+        Args:
+            data: Encoded image stream, e.g. from ``doc.extract_image``
+            image: Decoded image, used when there is no encoded stream
+
+        Raises:
+            ValueError: If neither is given
+        """
+        if data is None and image is None:
+            raise ValueError("PageImage needs encoded data or an image")
+        self.data = data
+        self._image = image
+        self._pixels = None
+        header = self.image
+        self.format: Optional[str] = header.format
+        self.size: Tuple[int, int] = header.size
+        self.mode: str = header.mode
+
+    @property
+    def width(self) -> int:
+        return self.size[0]
+
+    @property
+    def height(self) -> int:
+        return self.size[1]
+
+    @property
+    def image(self) -> Image.Image:
+        """PIL view of the image, decoded lazily from ``data``."""
+        if self._image is None:
+            if self._pixels is not None:
+                self._image = Image.fromarray(self._pixels)
+            else:
+                self._image = Image.open(BytesIO(self.data))
+        return self._image
+
+    @property
+    def pixels(self) -> Any:
+        """Decoded pixels as a read-only numpy array, shared by all consumers.
+
+        Images in other modes than L, RGB and RGBA are converted to RGB (or L
+        for grayscale modes), so the array still means the same colours when
+        ``image`` is rebuilt from it.
+        """
+        if self._pixels is None:
+            import numpy as np
+
+            image = self.image
+            if image.mode not in ("L", "RGB", "RGBA"):
+                # fromarray() cannot restore CMYK, palette or bilevel images
+                grayscale = image.mode in ("1", "I", "I;16", "F")
+                image = image.convert("L" if grayscale else "RGB")
+            self._pixels = np.asarray(image)
+            if self.data is not None:
+                self._image = None  # The array now holds the only decoded copy
+        return self._pixels
+
+    def __array__(self, dtype=None, copy=None):
+        pixels = self.pixels
+        return pixels if dtype is None else pixels.astype(dtype)
+
+    def release(self) -> None:
+        """Drop decoded pixels; they are decoded again from ``data`` if needed."""
+        if self.data is not None:
+            self._image = None
+            self._pixels = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Only the encoded stream crosses process boundaries
+        state = dict(self.__dict__, _pixels=None)
+        if self.data is not None:
+            state["_image"] = None
+        return state
+
+
+def encode_image(
+    image: Union[PageImage, Image.Image], budget: ImageBudget
+) -> Tuple[bytes, str]:
+    """Encode an image within a budget.
+
+    Args:
+        image: Image to send
+        budget: Size, format and color limits
+
+    Returns:
+        Tuple of (encoded bytes, MIME type); a ``PageImage`` is released after
+        re-encoding
+    """
+    fits = max(image.size) <= budget.max_px
+    if isinstance(image, PageImage):
+        if (
+            image.data is not None
+            and image.format == "JPEG"
+            and fits
+            # CMYK and other JPEG modes are converted for vision providers
+            and (image.mode == "L" or (image.mode == "RGB" and not budget.grayscale))
+        ):
+            return image.data, MIME_TYPES["jpeg"]
+        try:
+            return encode_image(image.image, budget)
+        finally:
+            image.release()
+
+    if budget.grayscale or image.mode in ("1", "L"):
+        image = image.convert("L")
+    elif image.mode != "RGB" and (budget.format == "jpeg" or image.mode != "RGBA"):
+        image = image.convert("RGB")
+    if not fits:
+        scale = budget.max_px / max(image.size)
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.LANCZOS)
+
+    buffered = BytesIO()
+    if budget.format == "png":
+        image.save(buffered, format="PNG", optimize=True)
+    else:
+        image.save(buffered, format=budget.format.upper(), quality=budget.quality)
+    return buffered.getvalue(), MIME_TYPES[budget.format]
@@ -0,0 +1,106 @@
+"""
+Provider-specific chat payloads for text and vision queries.
+
+Images travel the way each API expects them instead of inside the prompt text:
+Ollama takes raw image bytes in the message's ``images`` field (the client
+base64-encodes each one once while serializing), and OpenAI-compatible APIs
+take one ``image_url`` content part per image. Prompts stay a few hundred
+characters however many images are attached, and nothing is built by repeated
+string concatenation.
+"""
+
+import base64
+from typing import Any, Dict, List, Sequence, Tuple
+
+TEXT_SYSTEM_PROMPT = "You are a helpful assistant processing document content."
+VISION_SYSTEM_PROMPT = "You are a helpful assistant analyzing documents."
+
+OLLAMA_TEXT_TEMPLATE = """Based on the following document:
+
+Context:
+{context}
+
+Question: {prompt}
+
+Please answer the question using only information from the document above."""
+
+OLLAMA_VISION_TEMPLATE = """Please analyze these document images and answer the following question:
+
+Question: {prompt}
+
+Please be concise and only include information that directly answers the question."""
+
+OPENAI_VISION_TEMPLATE = (
+    "Please analyze these document images and answer the following question: "
+    "{prompt}"
+)
+
+# Encoded image bytes and their MIME type, as returned by encode_image()
+EncodedImage = Tuple[bytes, str]
+
+
+def data_url(data: bytes, mime: str) -> str:
+    """Encode image bytes as a base64 data URL."""
+    return f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+def text_messages(provider: str, prompt: str, context: str) -> List[Dict[str, Any]]:
+    """Build the messages of a text-only query.
+
+    Args:
+        provider: ``ollama`` or an OpenAI-compatible provider
+        prompt: User prompt
+        context: Document text
+
+    Returns:
+        Chat messages for the provider
+    """
+    if provider == "ollama":
+        return [
+            {
+                "role": "user",
+                "content": OLLAMA_TEXT_TEMPLATE.format(context=context, prompt=prompt),
+            }
+        ]
+    return [
+        {"role": "system", "content": TEXT_SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": f"Document content:\n\n{context}\n\nPrompt: {prompt}",
+        },
+    ]
+
+
+def vision_messages(
+    provider: str, prompt: str, images: Sequence[EncodedImage]
+) -> List[Dict[str, Any]]:
+    """Build the messages of a vision query.
+
+    Args:
+        provider: ``ollama`` or an OpenAI-compatible provider
+        prompt: User prompt
+        images: Encoded images to attach
+
+    Returns:
+        Chat messages for the provider: raw bytes in ``images`` for Ollama,
+        ``image_url`` content parts for OpenAI
+    """
+    if provider == "ollama":
+        return [
+            {
+                "role": "user",
+                "content": OLLAMA_VISION_TEMPLATE.format(prompt=prompt),
+                "images": [data for data, _ in images],
+            }
+        ]
+    parts: List[Dict[str, Any]] = [
+        {"type": "text", "text": OPENAI_VISION_TEMPLATE.format(prompt=prompt)}
+    ]
+    parts.extend(
+        {"type": "image_url", "image_url": {"url": data_url(data, mime)}}
+        for data, mime in images
+    )
+    return [
+        {"role": "system", "content": VISION_SYSTEM_PROMPT},
+        {"role": "user", "content": parts},
+    ]
@@ -0,0 +1,139 @@
+"""
+EasyOCR helpers and a pool of OCR worker processes.
+
+OCR is CPU-bound inside torch and EasyOCR readers are not safe to share
+between threads, so scanning throughput scales by giving each worker process
+its own ``easyocr.Reader``. Images are grouped into batches of the same size
+(EasyOCR's ``readtext_batched`` only stacks identical dimensions) and each
+batch is one job for the pool.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from loguru import logger
+from PIL import Image
+from .images import PageImage
+
+AnyImage = Union[PageImage, Image.Image]
+
+DEFAULT_OCR_BATCH_SIZE = 8  # Same-size images OCR'd per EasyOCR call
+
+# Reader owned by each OCR worker process
+_worker_reader: Optional[Any] = None
+
+
+def summarize(results: List[Tuple[Any, str, float]]) -> Tuple[str, float]:
+    """Join EasyOCR regions into text with their average confidence."""
+    if not results:
+        return "", 0.0
+    texts = [text for _, text, _ in results]
+    confidence = sum(conf for _, _, conf in results) / len(results)
+    return " ".join(texts), confidence
+
+
+def read_image(reader: Any, image: AnyImage) -> Tuple[str, float]:
+    """OCR one image, returning empty text and 0.0 confidence on failure."""
+    import numpy as np
+
+    try:
+        return summarize(reader.readtext(np.asarray(image)))
+    except Exception as e:
+        logger.error(f"OCR processing failed: {e}")
+        return "", 0.0
+
+
+def read_batch(
+    reader: Any, images: Sequence[AnyImage], release: bool = True
+) -> List[Tuple[str, float]]:
+    """OCR images of identical size and mode in one batched call.
+
+    The caller decides how many images form a batch (see ``size_batches``);
+    EasyOCR's own ``batch_size`` sizes its recognizer batches of text regions
+    and is left at its default. Single images and readers without
+    ``readtext_batched`` use ``readtext``; a failed batch is retried one image
+    at a time. Decoded pixels of ``PageImage`` inputs are released afterwards
+    unless ``release`` is False, e.g. because the vision model reads them next.
+
+    Returns:
+        (text, confidence) per image, in input order
+    """
+    import numpy as np
+
+    try:
+        if len(images) == 1 or not hasattr(reader, "readtext_batched"):
+            return [read_image(reader, image) for image in images]
+        try:
+            batched = reader.readtext_batched([np.asarray(image) for image in images])
+        except Exception as e:
+            logger.warning(f"Batched OCR failed: {e}. Retrying one by one.")
+            return [read_image(reader, image) for image in images]
+        return [summarize(regions) for regions in batched]
+    finally:
+        # Keep only the encoded bytes once the batch is done
+        for image in images:
+            if release and isinstance(image, PageImage):
+                image.release()
+
+
+def size_batches(images: Sequence[AnyImage], batch_size: int) -> List[List[int]]:
+    """Group image indexes by size and mode into batches of at most batch_size."""
+    groups: Dict[Tuple[Any, ...], List[int]] = {}
+    for i, image in enumerate(images):
+        groups.setdefault((image.size, image.mode), []).append(i)
+    return [
+        indexes[start : start + batch_size]
+        for indexes in groups.values()
+        for start in range(0, len(indexes), batch_size)
+    ]
+
+
+def _init_worker(languages: List[str], threads: int) -> None:
+    """Load the OCR worker's reader once and share the cores between workers."""
+    global _worker_reader
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    import easyocr
+
+    _worker_reader = easyocr.Reader(languages)
+
+
+def _read_in_worker(images: List[AnyImage]) -> List[Tuple[str, float]]:
+    """Run one OCR batch inside a worker process."""
+    return read_batch(_worker_reader, images)
+
+
+class OCRPool:
+    """Pool of processes, each holding its own ``easyocr.Reader``."""
+
+    def __init__(self, languages: List[str], workers: int):
+        """Start the worker processes.
+
+        Workers are spawned rather than forked so they do not inherit torch's
+        thread pools from a parent that already ran OCR.
+
+        Args:
+            languages: EasyOCR language codes
+            workers: Number of worker processes
+        """
+        self.workers = workers
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(list(languages), threads),
+        )
+
+    def map(self, batches: List[List[AnyImage]]) -> List[List[Tuple[str, float]]]:
+        """OCR batches concurrently, returning their results in input order."""
+        return list(self._executor.map(_read_in_worker, batches))
+
+    def close(self) -> None:
+        """Shut down the worker processes."""
+        self._executor.shutdown(cancel_futures=True)
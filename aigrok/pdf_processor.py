@@ -1,26 +1,117 @@
 """PDF processing module for aigrok."""
 
 import os
-import base64
-from io import BytesIO
+import importlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
 from pathlib import Path
-from typing import Optional, Any, Union, List, Tuple
+from typing import (
+    Optional,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Set,
+    Union,
+    List,
+    Tuple,
+)
 from pydantic import Field
 from loguru import logger
 import fitz  # PyMuPDF
-from PIL import Image
-import ollama
-import litellm
-import easyocr
-import numpy as np
-import httpx
+from .balancer import (
+    DEFAULT_EJECT_AFTER,
+    DEFAULT_EJECT_SECONDS,
+    BalancedOllamaClient,
+    endpoint_pool,
+)
+from .cache import DEFAULT_MAX_SIZE_MB, ExtractionCache, ResponseCache
+from .clients import PoolSettings, configure_litellm, ollama_client
+from .chunking import (
+    DEFAULT_CHUNK_CONCURRENCY,
+    MAP_PROMPT,
+    REDUCE_PROMPT,
+    estimate_tokens,
+    split_text,
+)
 from .config import ConfigManager
+from .extraction import (
+    DEFAULT_OCR_MAX_IMAGE_COVERAGE,
+    DEFAULT_OCR_MIN_IMAGE_PX,
+    DEFAULT_OCR_MIN_TEXT_CHARS,
+    DEFAULT_RENDER_DPI,
+    DEFAULT_RENDER_MAX_IMAGES,
+    DEFAULT_RENDER_MIN_IMAGE_PX,
+    EXTRACTION_VERSION,
+    DocumentExtraction,
+    extract_document,
+    extract_page,
+    extract_document_parallel,
+    load_images,
+    pages_to_ocr,
+    pages_to_render,
+)
+from .images import (
+    DEFAULT_IMAGE_FORMAT,
+    DEFAULT_IMAGE_QUALITY,
+    DEFAULT_MAX_IMAGE_PX,
+    ImageBudget,
+    PageImage,
+    encode_image,
+)
+from .messages import text_messages, vision_messages
+from .ocr import (
+    DEFAULT_OCR_BATCH_SIZE,
+    AnyImage,
+    OCRPool,
+    read_batch,
+    read_image,
+    size_batches,
+)
+from .resilience import (
+    DEFAULT_BREAKER_RESET_SECONDS,
+    DEFAULT_BREAKER_THRESHOLD,
+    DEFAULT_HEDGE_MIN_DELAY,
+    DEFAULT_RETRIES,
+    DEFAULT_RETRY_BASE_DELAY,
+    DEFAULT_RETRY_MAX_DELAY,
+    RetryPolicy,
+    call_with_resilience,
+    endpoint_guard,
+)
+from .ratelimit import (
+    DEFAULT_OUTPUT_TOKENS,
+    IMAGE_TOKENS,
+    RateLimiter,
+    rate_limiter,
+    response_tokens,
+)
+from .retrieval import DEFAULT_TOP_K, BM25Index
 from .types import ProcessingResult
 from pprint import pformat
 
 # Constants
-CONNECT_TIMEOUT_SECONDS = 10.0  # Connection timeout
-TOTAL_TIMEOUT_SECONDS = 90.0  # Total operation timeout
+MIN_PAGES_PER_WORKER = 25  # Smallest page range worth a worker process
+
+# Heavy dependencies are imported on first use so that `aigrok --help`,
+# `--version` and text-only runs do not pay for torch, litellm or ollama.
+_LAZY_MODULES = {
+    "easyocr": "easyocr",
+    "httpx": "httpx",
+    "litellm": "litellm",
+    "np": "numpy",
+    "ollama": "ollama",
+}
+
+
+def __getattr__(name: str) -> Any:
+    """Resolve lazily imported modules accessed as attributes of this module."""
+    if name in _LAZY_MODULES:
+        return importlib.import_module(_LAZY_MODULES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class PDFProcessingResult(ProcessingResult):
@@ -31,14 +122,52 @@ class PDFProcessingResult(ProcessingResult):
     ocr_confidence: Optional[float] = Field(default=None, ge=0.0, le=1.0)
 
 
+@dataclass
+class DocumentContent:
+    """Content extracted from a document, ready to be queried."""
+
+    text: str
+    page_count: int
+    metadata: Dict[str, Any]
+    content_type: str = "text_only"
+    images: List[Tuple[PageImage, int]] = field(default_factory=list)
+    ocr_text: Optional[str] = None
+    ocr_confidence: float = 0.0
+    # Text of every page (then each OCR'd image), used to chunk and retrieve
+    pages: List[str] = field(default_factory=list)
+    index: Optional[BM25Index] = None
+
+
+@dataclass
+class PageContent:
+    """Text and OCR output of a single page, as yielded by iter_pages()."""
+
+    page: int  # 1-based
+    page_count: int
+    text: str
+    ocr_text: Optional[str] = None
+    ocr_confidence: float = 0.0
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
 class PDFProcessor:
     """Processor for PDF documents."""
 
     def __init__(
-        self, config_manager: Optional[ConfigManager] = None, verbose: bool = False
+        self,
+        config_manager: Optional[ConfigManager] = None,
+        verbose: bool = False,
+        workers: int = 1,
     ):
-        """Initialize PDF processor with optional configuration."""
+        """Initialize PDF processor with optional configuration.
+
+        Args:
+            config_manager: Configuration to use (loaded from disk if omitted)
+            verbose: Enable verbose logging
+            workers: Number of processes used to extract pages of large PDFs
+        """
         self.verbose = verbose
+        self.workers = max(1, workers)
         logger.debug("Initializing PDF processor")
         self.config_manager = config_manager or ConfigManager()
 
@@ -47,66 +176,146 @@ class PDFProcessor:
                 "PDF processor not properly initialized. Please run with --configure first."
             )
 
-        # Initialize OCR if enabled
-        if self.config_manager.config.ocr_enabled:
-            if self.verbose:
-                logger.info(
-                    f"Initializing EasyOCR with languages: {self.config_manager.config.ocr_languages}"
-                )
+        # OCR reader of this process, loaded on first use: a processor whose
+        # extraction runs in worker processes or an OCR pool never needs it
+        self.ocr_enabled = bool(self.config_manager.config.ocr_enabled)
+        self._reader: Optional[Any] = None
+        self._reader_loaded = not self.ocr_enabled
+
+        # Initialize extraction cache
+        config = self.config_manager.config
+        self.cache = None
+        if getattr(config, "cache_enabled", True):
+            self.cache = ExtractionCache(
+                getattr(config, "cache_dir", None),
+                getattr(config, "cache_max_size_mb", DEFAULT_MAX_SIZE_MB) * 1024 * 1024,
+            )
+
+        # Long documents are split into chunks of this many tokens; chunking
+        # is opt-in, since it turns one LLM call into several
+        self.max_context_tokens: Optional[int] = getattr(
+            getattr(config, "text_model", None), "max_context_tokens", None
+        ) or getattr(config, "max_context_tokens", None)
+        self.chunk_concurrency = max(
+            1, getattr(config, "chunk_concurrency", DEFAULT_CHUNK_CONCURRENCY)
+        )
+
+        # Images OCR'd per EasyOCR batch, and processes sharing the batches
+        self.ocr_batch_size = max(
+            1, getattr(config, "ocr_batch_size", DEFAULT_OCR_BATCH_SIZE)
+        )
+        self.ocr_workers = max(1, getattr(config, "ocr_workers", 1))
+        self._ocr_pool: Optional[OCRPool] = None
+
+        # Per-page OCR decision: skip pages whose text layer carries the content
+        self.ocr_page_mode = getattr(config, "ocr_page_mode", "auto")
+        self.ocr_min_text_chars = getattr(
+            config, "ocr_min_text_chars", DEFAULT_OCR_MIN_TEXT_CHARS
+        )
+        self.ocr_max_image_coverage = getattr(
+            config, "ocr_max_image_coverage", DEFAULT_OCR_MAX_IMAGE_COVERAGE
+        )
+        self.ocr_min_image_px = getattr(
+            config, "ocr_min_image_px", DEFAULT_OCR_MIN_IMAGE_PX
+        )
+
+        # Pages rasterized whole instead of sending their embedded images
+        self.page_render_mode = getattr(config, "page_render_mode", "auto")
+        self.page_render_dpi = getattr(config, "page_render_dpi", DEFAULT_RENDER_DPI)
+        self.page_render_max_images = getattr(
+            config, "page_render_max_images", DEFAULT_RENDER_MAX_IMAGES
+        )
+        self.page_render_min_image_px = getattr(
+            config, "page_render_min_image_px", DEFAULT_RENDER_MIN_IMAGE_PX
+        )
+
+        # Size and encoding limits for images sent to the vision model
+        self.image_budget = ImageBudget(
+            max_px=getattr(config, "vision_max_image_px", DEFAULT_MAX_IMAGE_PX),
+            format=getattr(config, "vision_image_format", DEFAULT_IMAGE_FORMAT),
+            quality=getattr(config, "vision_image_quality", DEFAULT_IMAGE_QUALITY),
+            grayscale=getattr(config, "vision_grayscale", False),
+        )
+
+        # Send only the most relevant pages of long documents (opt-in)
+        self.retrieval_top_k = 0
+        if getattr(config, "retrieval_enabled", False):
+            self.retrieval_top_k = max(
+                1, getattr(config, "retrieval_top_k", DEFAULT_TOP_K)
+            )
+
+        # Initialize LLM response cache (opt-in)
+        self.response_cache = None
+        if getattr(config, "llm_cache_enabled", False):
             try:
-                self.reader = easyocr.Reader(self.config_manager.config.ocr_languages)
+                self.response_cache = ResponseCache(
+                    getattr(config, "cache_dir", None),
+                    config.llm_cache_ttl_seconds,
+                    config.llm_cache_max_entries,
+                )
             except Exception as e:
-                if self.config_manager.config.ocr_fallback:
-                    if self.verbose:
-                        logger.warning(
-                            f"Failed to initialize OCR: {e}. Continuing without OCR due to fallback setting."
-                        )
-                    self.reader = None
-                else:
-                    raise RuntimeError(f"Failed to initialize OCR: {e}")
-        else:
-            self.reader = None
+                logger.warning(f"Failed to open LLM response cache: {e}")
+
+        # Connection pools shared with every processor using the same endpoint
+        self.pool_settings = PoolSettings.from_config(config)
+
+        # Retries of transient failures, per-endpoint breakers and hedging
+        self.retry_policy = RetryPolicy(
+            retries=max(0, getattr(config, "llm_retries", DEFAULT_RETRIES)),
+            base_delay=getattr(
+                config, "llm_retry_base_delay", DEFAULT_RETRY_BASE_DELAY
+            ),
+            max_delay=getattr(config, "llm_retry_max_delay", DEFAULT_RETRY_MAX_DELAY),
+        )
+        self.breaker_threshold = getattr(
+            config, "llm_breaker_threshold", DEFAULT_BREAKER_THRESHOLD
+        )
+        self.breaker_reset_seconds = getattr(
+            config, "llm_breaker_reset_seconds", DEFAULT_BREAKER_RESET_SECONDS
+        )
+        self.hedge = getattr(config, "llm_hedge", False)
+        self.hedge_min_delay = getattr(
+            config, "llm_hedge_min_delay", DEFAULT_HEDGE_MIN_DELAY
+        )
+        self.hedge_same_endpoint = getattr(config, "llm_hedge_same_endpoint", False)
 
         # Initialize models
         try:
             # Initialize text model
             self.text_provider = None
             self.text_model = None
+            self.text_endpoint = None
             if self.config_manager.config.text_model:
                 text_model = self.config_manager.config.text_model
                 self.text_provider = text_model.provider
                 self.text_model = text_model.model_name
+                self.text_endpoint = text_model.endpoint
                 if text_model.provider == "ollama":
-                    self.llm = ollama.Client(
-                        host=text_model.endpoint,
-                        timeout=httpx.Timeout(
-                            TOTAL_TIMEOUT_SECONDS, connect=CONNECT_TIMEOUT_SECONDS
-                        ),  # 30s total timeout, 10s connect timeout
-                    )
+                    self.llm = self._ollama_client(text_model)
                 else:
+                    import litellm
+
                     litellm.set_verbose = True
+                    configure_litellm(self.pool_settings)
                     self.llm = litellm
 
-            # Initialize vision model
+            # Initialize vision model, with its own client and endpoints
             self.vision_provider = None
             self.vision_model = None
             self.vision_endpoint = None
+            self.vision_llm = None
             if self.config_manager.config.vision_model:
                 vision_model = self.config_manager.config.vision_model
                 self.vision_provider = vision_model.provider
                 self.vision_model = vision_model.model_name
                 self.vision_endpoint = vision_model.endpoint
                 if vision_model.provider == "ollama":
-                    if not hasattr(self, "llm"):
-                        self.llm = ollama.Client(
-                            host=vision_model.endpoint,
-                            timeout=httpx.Timeout(
-                                TOTAL_TIMEOUT_SECONDS, connect=CONNECT_TIMEOUT_SECONDS
-                            ),  # 300s total timeout, 10s connect timeout
-                        )
+                    self.vision_llm = self._ollama_client(vision_model)
                 elif vision_model.provider == "openai":
-                    if not hasattr(self, "llm"):
-                        self.llm = litellm
+                    import litellm
+
+                    configure_litellm(self.pool_settings)
+                    self.vision_llm = litellm
                 else:
                     # Other providers not yet supported
                     logger.warning(
@@ -140,36 +349,155 @@ class PDFProcessor:
             ),
         )
 
-    def _extract_images(self, doc: fitz.Document) -> List[Tuple[Image.Image, int]]:
+    def _ollama_client(self, model: Any) -> Any:
+        """Client for an Ollama model, balanced when it lists several endpoints.
+
+        Args:
+            model: Model configuration with ``endpoint`` or ``endpoints``
+
+        Returns:
+            Shared ``ollama.Client``, or a BalancedOllamaClient over the pool
+        """
+        endpoints = getattr(model, "endpoints", None) or [model.endpoint]
+        if len(endpoints) < 2:
+            return ollama_client(endpoints[0], self.pool_settings)
+        config = self.config_manager.config
+        pool = endpoint_pool(
+            endpoints,
+            eject_after=getattr(config, "endpoint_eject_after", DEFAULT_EJECT_AFTER),
+            eject_seconds=getattr(
+                config, "endpoint_eject_seconds", DEFAULT_EJECT_SECONDS
+            ),
+        )
+        logger.debug(f"Balancing {model.model_name} over {len(endpoints)} endpoints")
+        return BalancedOllamaClient(pool, self.pool_settings)
+
+    def _renders_pages(self, for_vision: bool = True) -> bool:
+        """Return True if rendered pages would be OCR'd or sent to vision."""
+        return self.ocr_active or (for_vision and bool(self.vision_model))
+
+    def _pages_to_render(
+        self,
+        doc: fitz.Document,
+        extraction: DocumentExtraction,
+        for_vision: bool = True,
+    ) -> List[int]:
+        """Zero-based pages rasterized whole, per ``page_render_mode``.
+
+        No page is rendered when nothing would consume the raster: OCR is off
+        and there is no vision model, or the caller never queries vision.
+        """
+        if not self._renders_pages(for_vision):
+            return []
+        return pages_to_render(
+            doc,
+            extraction,
+            self.page_render_mode,
+            self.page_render_max_images,
+            self.page_render_min_image_px,
+        )
+
+    def _extract_images(
+        self,
+        doc: fitz.Document,
+        extraction: Optional[DocumentExtraction] = None,
+        rendered: Optional[List[int]] = None,
+    ) -> List[Tuple[PageImage, int]]:
         """Extract images from PDF document.
 
         Args:
             doc: PyMuPDF document object
+            extraction: Optional single-pass extraction of ``doc``; computed
+                when not supplied
+            rendered: Pages to rasterize whole; chosen when not supplied
 
         Returns:
-            List of tuples containing (PIL Image, page number)
+            List of tuples containing (PageImage, page number)
 
         Note:
-            Images are extracted in their original format and converted to PIL Images
-            for OCR processing. Page numbers are zero-based.
+            Images keep their original encoded bytes and are decoded only when
+            OCR or the vision model needs their pixels. Page numbers are
+            zero-based. An image shared by several pages is loaded once and
+            reported on its first page. Pages chosen by ``page_render_mode``
+            are rendered as a single image instead.
         """
-        images = []
-        for page_num, page in enumerate(doc):
-            image_list = page.get_images(full=True)
-            for img_index, img in enumerate(image_list):
-                xref = img[0]
-                try:
-                    base_image = doc.extract_image(xref)
-                    image_bytes = base_image["image"]
-                    image = Image.open(BytesIO(image_bytes))
-                    images.append((image, page_num))
-                except Exception as e:
-                    logger.warning(
-                        f"Failed to process image {img_index} on page {page_num}: {e}"
-                    )
-                    continue
+        if extraction is None:
+            extraction = extract_document(doc)
+        if rendered is None:
+            rendered = self._pages_to_render(doc, extraction)
+        return load_images(doc, extraction, rendered, self.page_render_dpi)
 
-        return images
+    def _select_ocr_images(
+        self,
+        doc: fitz.Document,
+        extraction: DocumentExtraction,
+        rendered: List[int],
+        images: List[Tuple[PageImage, int]],
+    ) -> Tuple[List[Tuple[PageImage, int]], Dict[str, int]]:
+        """Pick the images worth OCR'ing, page by page.
+
+        Args:
+            doc: PyMuPDF document object
+            extraction: Single-pass extraction of ``doc``
+            rendered: Pages rasterized whole
+            images: Images loaded from ``doc``, with their page numbers
+
+        Returns:
+            Tuple of (images to OCR, counts of processed and skipped pages
+            among the pages that have images)
+        """
+        ocr_pages = set(
+            pages_to_ocr(
+                doc,
+                extraction,
+                rendered,
+                self.ocr_page_mode,
+                self.ocr_min_text_chars,
+                self.ocr_max_image_coverage,
+                self.ocr_min_image_px,
+            )
+        )
+        selected = [
+            (image, page_num)
+            for image, page_num in images
+            if page_num in ocr_pages
+            and (
+                self.ocr_page_mode == "always"
+                or max(image.size) >= self.ocr_min_image_px
+            )
+        ]
+        candidates = {
+            page.page_num
+            for page in extraction.pages
+            if page.image_xrefs or page.page_num in rendered
+        }
+        counts = {
+            "ocr_pages_processed": len(ocr_pages),
+            "ocr_pages_skipped": len(candidates - ocr_pages),
+        }
+        return selected, counts
+
+    def _extract_document(
+        self, doc: fitz.Document, file_path: Union[str, Path]
+    ) -> DocumentExtraction:
+        """Extract a document, splitting pages across processes when worthwhile.
+
+        Args:
+            doc: PyMuPDF document opened from ``file_path``
+            file_path: Path to the PDF, reopened by each worker process
+
+        Returns:
+            Page-indexed extraction of the document
+        """
+        workers = min(self.workers, len(doc) // MIN_PAGES_PER_WORKER)
+        if workers > 1:
+            try:
+                return extract_document_parallel(file_path, len(doc), workers)
+            except Exception as e:
+                logger.warning(
+                    f"Parallel extraction failed: {e}. Falling back to a single process."
+                )
+        return extract_document(doc)
 
     def _process_ocr_results(
         self, results: List[Tuple[List[List[int]], str, float]], page_num: int
@@ -188,11 +516,69 @@ class PDFProcessor:
         combined_text = f"[Page {page_num + 1}] {' '.join(texts)}"
         return combined_text, avg_confidence
 
-    def _process_image_ocr(self, image: Image.Image) -> Tuple[str, float]:
+    @property
+    def reader(self) -> Optional[Any]:
+        """EasyOCR reader of this process, or None if OCR is off."""
+        if not self._reader_loaded:
+            self._load_reader()
+        return self._reader
+
+    @reader.setter
+    def reader(self, reader: Optional[Any]) -> None:
+        self._reader = reader
+        self._reader_loaded = True
+
+    @property
+    def ocr_active(self) -> bool:
+        """Return True if OCR runs, without loading the reader to find out."""
+        return self._reader is not None if self._reader_loaded else self.ocr_enabled
+
+    def preload_ocr(self) -> None:
+        """Load the OCR reader now if this process will OCR in-process.
+
+        Used by long-lived workers so the first document does not pay for
+        loading the EasyOCR models.
+        """
+        if self.ocr_workers == 1 and not self._reader_loaded:
+            self._load_reader()
+
+    def _load_reader(self) -> Optional[Any]:
+        """Load the EasyOCR reader, honoring ``ocr_fallback`` on failure."""
+        self._reader_loaded = True
+        config = self.config_manager.config
+        if self.verbose:
+            logger.info(f"Initializing EasyOCR with languages: {config.ocr_languages}")
+        try:
+            import easyocr
+
+            self._reader = easyocr.Reader(config.ocr_languages)
+        except Exception as e:
+            if not config.ocr_fallback:
+                raise RuntimeError(f"Failed to initialize OCR: {e}")
+            if self.verbose:
+                logger.warning(
+                    f"Failed to initialize OCR: {e}. Continuing without OCR due to fallback setting."
+                )
+            self._reader = None
+        return self._reader
+
+    def close(self) -> None:
+        """Shut down the OCR worker pool, if one was started."""
+        pool, self._ocr_pool = self._ocr_pool, None
+        if pool is not None:
+            pool.close()
+
+    def __enter__(self) -> "PDFProcessor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _process_image_ocr(self, image: AnyImage) -> Tuple[str, float]:
         """Process image with EasyOCR.
 
         Args:
-            image: PIL Image object to process
+            image: PageImage or PIL Image to process
 
         Returns:
             Tuple of (extracted text, confidence score)
@@ -203,29 +589,60 @@ class PDFProcessor:
         """
         if not self.reader:
             return "", 0.0
+        return read_image(self.reader, image)
 
-        # Convert PIL Image to numpy array
-        img_array = np.array(image)
+    def _process_images_ocr(
+        self, images: List[AnyImage], release: bool = True
+    ) -> List[Tuple[str, float]]:
+        """OCR many images, batching images of the same size.
 
-        try:
-            results = self.reader.readtext(img_array)
-
-            # Combine all text with their confidence scores
-            texts = []
-            total_confidence = 0.0
+        EasyOCR's ``readtext_batched`` runs detection and recognition for a
+        whole batch at once, but only for images of identical dimensions, so
+        images are grouped by size and mode and each group is split into
+        batches of ``ocr_batch_size``. With ``ocr_workers`` above one, the
+        batches are spread over a pool of processes with their own readers,
+        and this process only loads a reader if the pool fails.
 
-            for bbox, text, confidence in results:
-                texts.append(text)
-                total_confidence += confidence
-
-            combined_text = " ".join(texts)
-            avg_confidence = total_confidence / len(results) if results else 0.0
+        Args:
+            images: PageImages or PIL Images to process
+            release: Release decoded pixels after OCR; pass False when the
+                vision model reads the same images next (in-process only,
+                pool workers decode their own copies)
 
-            return combined_text, avg_confidence
+        Returns:
+            (text, confidence) per image, in input order
+        """
+        if not self.ocr_active:
+            return [("", 0.0)] * len(images)
 
-        except Exception as e:
-            logger.error(f"OCR processing failed: {e}")
-            return "", 0.0
+        batches = size_batches(images, self.ocr_batch_size)
+        batch_results = None
+        if self.ocr_workers > 1:
+            try:
+                if self._ocr_pool is None:
+                    self._ocr_pool = OCRPool(
+                        self.config_manager.config.ocr_languages, self.ocr_workers
+                    )
+                batch_results = self._ocr_pool.map(
+                    [[images[i] for i in batch] for batch in batches]
+                )
+            except Exception as e:
+                logger.warning(f"OCR worker pool failed: {e}. Running OCR in-process.")
+                self.close()
+        if batch_results is None:
+            if not self.reader:
+                return [("", 0.0)] * len(images)
+            batch_results = [
+                read_batch(self.reader, [images[i] for i in batch], release)
+                for batch in batches
+            ]
+
+        results: List[Tuple[str, float]] = [("", 0.0)] * len(images)
+        for batch, batch_result in zip(batches, batch_results):
+            for i, result in zip(batch, batch_result):
+                results[i] = result
+        logger.debug(f"OCR'd {len(images)} images in {len(batches)} batches")
+        return results
 
     def _combine_text(self, pdf_text: str, ocr_text: str) -> str:
         """Combine extracted PDF text with OCR text."""
@@ -244,12 +661,175 @@ class PDFProcessor:
 
         return "\n".join(combined)
 
+    def _collect_stream(
+        self, chunks: Iterable[Any], on_token: Callable[[str], None]
+    ) -> str:
+        """Pass streamed response chunks to on_token and return the full text.
+
+        Handles both Ollama chat chunks (``chunk.message.content``) and
+        litellm/OpenAI deltas (``chunk.choices[0].delta.content``).
+        """
+        parts = []
+        for chunk in chunks:
+            if hasattr(chunk, "choices"):
+                piece = chunk.choices[0].delta.content if chunk.choices else None
+            else:
+                piece = chunk.message.content
+            if piece:
+                on_token(piece)
+                parts.append(piece)
+        response = "".join(parts)
+        logger.debug("LLM Response:\n%s", pformat({"response": response}))
+        return response
+
     def _query_llm(
         self,
         prompt: str,
         context: str,
         provider: str,
-        images: Optional[List[Tuple[Image.Image, str]]] = None,
+        images: Optional[List[Tuple[AnyImage, Any]]] = None,
+        cache_stats: Optional[Dict[str, int]] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+    ):
+        """Query the LLM, serving repeated queries from the response cache.
+
+        Args:
+            prompt: User prompt
+            context: Text context
+            provider: Provider to use
+            images: Optional list of tuples containing (image, description)
+            cache_stats: Optional counters incremented with
+                ``llm_cache_hits`` / ``llm_cache_misses``
+            on_token: Optional callback receiving response text as it streams
+        """
+        if self.response_cache is None:
+            return self._call_llm(prompt, context, provider, images, on_token)
+
+        model = self.vision_model if images else self.text_model
+        key = ResponseCache.key(provider, model, prompt, context, images)
+        response = self.response_cache.get(key)
+        if cache_stats is not None:
+            counter = "llm_cache_hits" if response is not None else "llm_cache_misses"
+            cache_stats[counter] = cache_stats.get(counter, 0) + 1
+        if response is not None:
+            if on_token is not None:
+                on_token(response)
+            return response
+
+        response = self._call_llm(prompt, context, provider, images, on_token)
+        # Errors are reported as strings; never replay them from the cache
+        if isinstance(response, str) and not response.startswith("Error"):
+            self.response_cache.put(key, response)
+        return response
+
+    @staticmethod
+    def _endpoint_key(endpoint: Optional[str], model: str) -> str:
+        """Key of the endpoint guard: the endpoint URL, else the model name."""
+        return endpoint or model
+
+    def _rate_limit(
+        self, model: str, tokens: int
+    ) -> Tuple[Optional[RateLimiter], int]:
+        """Find the model's configured RPM/TPM limiter.
+
+        Limits are looked up under ``provider/model``, then ``provider``.
+
+        Args:
+            model: Model as ``provider/model``
+            tokens: Estimated tokens of the request, without the response
+
+        Returns:
+            The limiter, or None when no limit applies, and the tokens to
+            reserve for the request and its response
+        """
+        limits = getattr(self.config_manager.config, "rate_limits", None)
+        if not isinstance(limits, dict):
+            return None, tokens
+        limit = limits.get(model) or limits.get(model.split("/", 1)[0])
+        limiter = rate_limiter(
+            model, getattr(limit, "rpm", None), getattr(limit, "tpm", None)
+        )
+        if limiter is None:
+            return None, tokens
+        return limiter, tokens + getattr(limit, "output_tokens", DEFAULT_OUTPUT_TOKENS)
+
+    def _provider_call(
+        self,
+        endpoint: str,
+        client: Any,
+        method: str,
+        kwargs: Dict[str, Any],
+        model: Optional[str] = None,
+        tokens: int = 0,
+    ) -> Any:
+        """Run a provider call with rate limits, retries, breaking and hedging.
+
+        Every attempt, retries included, waits for its own quota before it is
+        timed; a hedged duplicate is only sent if quota is free for it.
+        Behind an endpoint pool the breaker and latencies are kept per host.
+
+        Args:
+            endpoint: Key of the endpoint the call goes to
+            client: Ollama client, endpoint pool client or the litellm module
+            method: Name of the client's method to call
+            kwargs: Arguments of the call; ``stream=True`` streams the answer,
+                which is only retried until its first chunk arrives
+            model: Model as ``provider/model``, for its rate limits
+            tokens: Estimated tokens of the request
+
+        Returns:
+            The provider response, or an iterator over its chunks
+        """
+        limiter, tokens = (
+            self._rate_limit(model, tokens) if model is not None else (None, 0)
+        )
+        acquire = None
+        if limiter is not None:
+            acquire = partial(limiter.acquire, tokens)
+
+        def may_hedge() -> bool:
+            # A hedged copy is skipped rather than left waiting for quota
+            return limiter is None or limiter.try_reserve(tokens)
+
+        if isinstance(client, BalancedOllamaClient):
+            result = client.call(
+                method,
+                kwargs,
+                self.retry_policy,
+                self.breaker_threshold,
+                self.breaker_reset_seconds,
+                self.hedge,
+                self.hedge_min_delay,
+                may_hedge,
+                acquire=acquire,
+            )
+        else:
+            guard = endpoint_guard(
+                endpoint, self.breaker_threshold, self.breaker_reset_seconds
+            )
+            result = call_with_resilience(
+                lambda: getattr(client, method)(**kwargs),
+                guard,
+                self.retry_policy,
+                self.hedge,
+                self.hedge_min_delay,
+                may_hedge=may_hedge,
+                hedge_same_endpoint=self.hedge_same_endpoint,
+                stream=bool(kwargs.get("stream")),
+                acquire=acquire,
+            )
+        used = response_tokens(result) if limiter is not None else None
+        if used is not None:
+            limiter.settle(tokens, used)
+        return result
+
+    def _call_llm(
+        self,
+        prompt: str,
+        context: str,
+        provider: str,
+        images: Optional[List[Tuple[AnyImage, Any]]] = None,
+        on_token: Optional[Callable[[str], None]] = None,
     ):
         """Query the LLM with prompt and context.
 
@@ -258,7 +838,17 @@ class PDFProcessor:
             context: Text context
             provider: Provider to use
             images: Optional list of tuples containing (image, description)
+            on_token: Optional callback; when given the response is streamed
+                and each piece of text is passed to it as it arrives
         """
+        import httpx
+
+        stream = on_token is not None
+        # Estimated once per query for the rate limiter
+        tokens = estimate_tokens(prompt) + estimate_tokens(context or "")
+        if images:
+            tokens += IMAGE_TOKENS * len(images)
+
         try:
             logger.debug(f"Processing {len(images) if images else 0} images")
 
@@ -267,22 +857,20 @@ class PDFProcessor:
                 response = None
                 if provider == "ollama":
                     try:
-                        response = self.llm.chat(
-                            model=self.text_model,
-                            messages=[
-                                {
-                                    "role": "user",
-                                    "content": f"""Based on the following document:
-
-Context:
-{context}
-
-Question: {prompt}
-
-Please answer the question using only information from the document above.""",
-                                }
-                            ],
+                        response = self._provider_call(
+                            self._endpoint_key(self.text_endpoint, self.text_model),
+                            self.llm,
+                            "chat",
+                            dict(
+                                model=self.text_model,
+                                messages=text_messages(provider, prompt, context),
+                                stream=stream,
+                            ),
+                            f"{provider}/{self.text_model}",
+                            tokens,
                         )
+                        if stream:
+                            return self._collect_stream(response, on_token)
                         logger.debug(
                             "LLM Request:\n%s",
                             pformat(
@@ -306,20 +894,20 @@ Please answer the question using only information from the document above.""",
                         logger.error(f"Error querying text LLM: {e}")
                         return f"Error querying LLM: {e}"
                 else:
-                    messages = [
-                        {
-                            "role": "system",
-                            "content": "You are a helpful assistant processing document content.",
-                        },
-                        {
-                            "role": "user",
-                            "content": f"Document content:\n\n{context}\n\nPrompt: {prompt}",
-                        },
-                    ]
-                    response = litellm.completion(
-                        model=f"{self.text_provider}/{self.text_model}",
-                        messages=messages,
+                    messages = text_messages(provider, prompt, context)
+                    import litellm
+
+                    model = f"{self.text_provider}/{self.text_model}"
+                    response = self._provider_call(
+                        self._endpoint_key(self.text_endpoint, model),
+                        litellm,
+                        "completion",
+                        dict(model=model, messages=messages, stream=stream),
+                        model,
+                        tokens,
                     )
+                    if stream:
+                        return self._collect_stream(response, on_token)
                     logger.debug(
                         "LLM Request:\n%s",
                         pformat(
@@ -359,35 +947,34 @@ Please answer the question using only information from the document above.""",
                 if not images:
                     return "No images found to analyze"
 
-                # Prepare images for vision model
-                base64_images = []
-                for img, _ in images:
-                    # Convert to base64
-                    buffered = BytesIO()
-                    img.save(buffered, format="PNG")
-                    img_str = base64.b64encode(buffered.getvalue()).decode()
-                    base64_images.append(img_str)
+                # Fit images to the upload budget
+                encoded = [encode_image(img, self.image_budget) for img, _ in images]
+                logger.debug(
+                    f"Encoded {len(encoded)} images in "
+                    f"{sum(len(data) for data, _ in encoded)} bytes"
+                )
 
                 # Query vision model
                 if provider == "ollama":
-                    # Prepare prompt with images
-                    prompt_text = f"""Please analyze these document images and answer the following question:
-
-Question: {prompt}
-
-Please be concise and only include information that directly answers the question."""
-
-                    # Add images to prompt
-                    for img_str in base64_images:
-                        prompt_text += (
-                            f"\n<image>data:image/png;base64,{img_str}</image>"
-                        )
+                    # Images go in the message's images field, not the prompt
+                    messages = vision_messages(provider, prompt, encoded)
+                    prompt_text = messages[0]["content"]
 
                     try:
-                        response = self.llm.chat(
-                            model=self.vision_model,
-                            messages=[{"role": "user", "content": prompt_text}],
+                        response = self._provider_call(
+                            self._endpoint_key(self.vision_endpoint, self.vision_model),
+                            self.vision_llm,
+                            "chat",
+                            dict(
+                                model=self.vision_model,
+                                messages=messages,
+                                stream=stream,
+                            ),
+                            f"{provider}/{self.vision_model}",
+                            tokens,
                         )
+                        if stream:
+                            return self._collect_stream(response, on_token)
 
                         logger.debug(
                             "LLM Request:\n%s",
@@ -418,40 +1005,28 @@ Please be concise and only include information that directly answers the questio
                         logger.error(f"Error querying Ollama vision: {e}")
                         return f"Error querying vision LLM: {e}"
                 elif provider == "openai":
-                    # OpenAI vision handling (existing code)
-                    messages = [
-                        {
-                            "role": "system",
-                            "content": "You are a helpful assistant analyzing documents.",
-                        },
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": f"Please analyze these document images and answer the following question: {prompt}",
-                                }
-                            ],
-                        },
-                    ]
-
-                    # Add images to messages
-                    for img_str in base64_images:
-                        messages[1]["content"].append(
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/png;base64,{img_str}"
-                                },
-                            }
-                        )
+                    # One image_url content part per image
+                    messages = vision_messages(provider, prompt, encoded)
 
                     try:
-                        response = litellm.completion(
-                            model=f"{self.vision_provider}/{self.vision_model}",
-                            messages=messages,
-                            max_tokens=1000,
+                        import litellm
+
+                        model = f"{self.vision_provider}/{self.vision_model}"
+                        response = self._provider_call(
+                            self._endpoint_key(self.vision_endpoint, model),
+                            litellm,
+                            "completion",
+                            dict(
+                                model=model,
+                                messages=messages,
+                                max_tokens=1000,
+                                stream=stream,
+                            ),
+                            model,
+                            tokens,
                         )
+                        if stream:
+                            return self._collect_stream(response, on_token)
 
                         logger.debug(
                             "LLM Request:\n%s",
@@ -498,150 +1073,503 @@ Please be concise and only include information that directly answers the questio
             logger.error(error_msg)
             return error_msg
 
-    def process_file(
-        self, file_path: Union[str, Path], prompt: str = None, **kwargs
-    ) -> PDFProcessingResult:
-        """Process a PDF file."""
-        if not self._initialized:
-            return PDFProcessingResult(
-                success=False,
-                error="PDF processor not properly initialized. Please run with --configure first.",
+    def extract(self, file_path: Union[str, Path]) -> DocumentContent:
+        """Extract text, images and OCR output from a PDF file.
+
+        This is the CPU-bound half of process_file; query() performs the LLM
+        half, so callers can run the two stages with separate concurrency.
+
+        Args:
+            file_path: Path to PDF file
+
+        Returns:
+            DocumentContent ready to be passed to query()
+
+        Raises:
+            ValueError: If the file does not exist
+        """
+        logger.debug(f"Processing file: {file_path}")
+
+        # Validate request
+        logger.debug("Validating request")
+        if not os.path.exists(file_path):
+            raise ValueError(f"File not found: {file_path}")
+        logger.debug(f"Validated file path: {file_path}")
+
+        # Reuse a previous extraction of identical content and settings
+        cache_key = None
+        if self.cache:
+            cache_key = self.cache.key(file_path, self._extraction_settings())
+            cached = self.cache.get(cache_key)
+            if cached:
+                return self._content_from_cache(file_path, cached, cache_key)
+
+        # Open PDF
+        doc = fitz.open(file_path)
+        logger.debug(f"PDF has {len(doc)} pages")
+
+        # Extract metadata
+        metadata = {
+            "format": "PDF",
+            "page_count": len(doc),
+            "file_size": os.path.getsize(file_path),
+            "file_name": os.path.basename(file_path),
+        }
+
+        # Add PDF metadata if available
+        if doc.metadata:
+            metadata.update(
+                {
+                    "title": doc.metadata.get("title", ""),
+                    "author": doc.metadata.get("author", ""),
+                    "subject": doc.metadata.get("subject", ""),
+                    "keywords": doc.metadata.get("keywords", ""),
+                    "creator": doc.metadata.get("creator", ""),
+                    "producer": doc.metadata.get("producer", ""),
+                    "creation_date": doc.metadata.get("creationDate", ""),
+                    "modification_date": doc.metadata.get("modDate", ""),
+                }
+            )
+        logger.debug(f"Extracted metadata: {metadata}")
+
+        # Extract text and images in a single pass over the document
+        extraction = self._extract_document(doc, file_path)
+        extracted_text = extraction.text_pages
+        rendered = self._pages_to_render(doc, extraction)
+        images = self._extract_images(doc, extraction, rendered)
+        metadata["image_count"] = len(extraction.images)
+
+        # Determine content type
+        content_type = "text_only"
+        if len(extracted_text) == 0 and len(images) > 0:
+            content_type = "images_only"
+            logger.debug(f"PDF content type: {content_type}")
+        elif len(images) > 0:
+            content_type = "mixed"
+            logger.debug(f"PDF content type: {content_type}")
+
+        logger.debug(f"Extracted text: {extracted_text}")
+        logger.debug(f"Extracted {len(images)} total images")
+
+        # Process with OCR if needed
+        ocr_text = []
+        ocr_confidence = 0.0
+        if content_type in ["images_only", "mixed"] and self.ocr_active:
+            logger.debug("Processing images with OCR")
+            total_confidence = 0
+            total_regions = 0
+
+            ocr_images, ocr_counts = self._select_ocr_images(
+                doc, extraction, rendered, images
+            )
+            metadata.update(ocr_counts)
+            logger.debug(
+                f"OCR'ing {ocr_counts['ocr_pages_processed']} pages, skipping "
+                f"{ocr_counts['ocr_pages_skipped']} with a text layer"
+            )
+            # Image-only documents go to the vision model next; keep their
+            # pixels so they are not decoded twice
+            ocr_results = self._process_images_ocr(
+                [img for img, _ in ocr_images],
+                release=not (content_type == "images_only" and self.vision_model),
+            )
+            page_confidences: Dict[int, List[float]] = {}
+            # Reassemble in page order; the sort is stable within a page
+            ordered = sorted(
+                zip((page_num for _, page_num in ocr_images), ocr_results),
+                key=lambda item: item[0],
             )
+            for page_num, (text, confidence) in ordered:
+                if text:
+                    ocr_text.append(text)
+                    page_confidences.setdefault(page_num, []).append(confidence)
+                    total_confidence += confidence
+                    total_regions += 1
+
+            if total_regions > 0:
+                ocr_confidence = total_confidence / total_regions
+                logger.debug(f"OCR confidence: {ocr_confidence:.2%}")
+                metadata["ocr_pages"] = [
+                    {"page": page_num + 1, "confidence": round(sum(c) / len(c), 4)}
+                    for page_num, c in page_confidences.items()
+                ]
+
+        content = DocumentContent(
+            text=self._combine_text(
+                "\n".join(extracted_text), "\n".join(ocr_text) if ocr_text else None
+            ),
+            page_count=len(doc),
+            metadata=metadata,
+            content_type=content_type,
+            images=images,
+            ocr_text="\n".join(ocr_text) if ocr_text else None,
+            ocr_confidence=ocr_confidence,
+            pages=[page.text for page in extraction.pages] + ocr_text,
+        )
+        if self.retrieval_top_k:
+            content.index = BM25Index.build(content.pages)
+        if cache_key:
+            self.cache.put(
+                cache_key,
+                {
+                    "text": content.text,
+                    "page_count": content.page_count,
+                    "metadata": content.metadata,
+                    "content_type": content.content_type,
+                    "ocr_text": content.ocr_text,
+                    "ocr_confidence": content.ocr_confidence,
+                    "pages": content.pages,
+                    "retrieval_index": content.index.to_dict()
+                    if content.index
+                    else None,
+                },
+            )
+        return content
 
-        try:
-            logger.debug(f"Processing file: {file_path}")
-            logger.debug(f"Prompt: {prompt}")
-            logger.debug(f"Additional args: {kwargs}")
+    def iter_pages(self, file_path: Union[str, Path]) -> Iterator[PageContent]:
+        """Extract a PDF page by page, yielding each page as soon as it is done.
 
-            # Validate request
-            logger.debug("Validating request")
-            if not os.path.exists(file_path):
-                raise ValueError(f"File not found: {file_path}")
-            logger.debug(f"Validated file path: {file_path}")
+        Unlike extract(), nothing is accumulated: each page's images are
+        loaded, OCR'd and released before the next page is read, so memory
+        stays bounded by the largest page rather than the document. An image
+        shared by several pages is OCR'd on its first page only, and pages
+        whose text layer already carries the content are not OCR'd. The
+        extraction cache is not used.
 
-            # Open PDF
-            doc = fitz.open(file_path)
-            logger.debug(f"PDF has {len(doc)} pages")
-
-            # Extract metadata
-            metadata = {
-                "format": "PDF",
-                "page_count": len(doc),
-                "file_size": os.path.getsize(file_path),
-                "file_name": os.path.basename(file_path),
-            }
-
-            # Add PDF metadata if available
-            if doc.metadata:
-                metadata.update(
+        Args:
+            file_path: Path to PDF file
+
+        Yields:
+            PageContent for every page, in page order
+
+        Raises:
+            ValueError: If the file does not exist
+        """
+        if not os.path.exists(file_path):
+            raise ValueError(f"File not found: {file_path}")
+
+        seen: Set[int] = set()
+        with fitz.open(file_path) as doc:
+            page_count = len(doc)
+            for page_num in range(page_count):
+                extraction = extract_page(doc, page_num)
+                # Pages are only streamed, so only OCR would use a raster
+                rendered = self._pages_to_render(doc, extraction, for_vision=False)
+                # Load only the images not already loaded on an earlier page
+                unseen = DocumentExtraction(
+                    extraction.pages,
                     {
-                        "title": doc.metadata.get("title", ""),
-                        "author": doc.metadata.get("author", ""),
-                        "subject": doc.metadata.get("subject", ""),
-                        "keywords": doc.metadata.get("keywords", ""),
-                        "creator": doc.metadata.get("creator", ""),
-                        "producer": doc.metadata.get("producer", ""),
-                        "creation_date": doc.metadata.get("creationDate", ""),
-                        "modification_date": doc.metadata.get("modDate", ""),
-                    }
+                        xref: info
+                        for xref, info in extraction.images.items()
+                        if xref not in seen
+                    },
                 )
-            logger.debug(f"Extracted metadata: {metadata}")
-
-            # Extract text and images
-            extracted_text = []
-            images = []
-            for page_num, page in enumerate(doc):
-                # Extract text
-                page_text = page.get_text()
-                if page_text.strip():
-                    extracted_text.append(page_text)
-
-                # Extract images
-                page_images = self._extract_images(doc)
-                if page_images:
-                    images.extend(page_images)
-
-            # Determine content type
-            content_type = "text_only"
-            if len(extracted_text) == 0 and len(images) > 0:
-                content_type = "images_only"
-                logger.debug(f"PDF content type: {content_type}")
-            elif len(images) > 0:
-                content_type = "mixed"
-                logger.debug(f"PDF content type: {content_type}")
-
-            logger.debug(f"Extracted text: {extracted_text}")
-            logger.debug(f"Extracted {len(images)} total images")
-
-            # Process with OCR if needed
-            ocr_text = []
-            ocr_confidence = 0.0
-            if content_type in ["images_only", "mixed"] and self.reader:
-                logger.debug("Processing images with OCR")
-                total_confidence = 0
-                total_regions = 0
-
-                for img, _ in images:
-                    text, confidence = self._process_image_ocr(img)
-                    if text:
-                        ocr_text.append(text)
-                        total_confidence += confidence
-                        total_regions += 1
-
-                if total_regions > 0:
-                    ocr_confidence = total_confidence / total_regions
-                    logger.debug(f"OCR confidence: {ocr_confidence:.2%}")
-
-            # Use vision model for image-only PDFs, otherwise use text model
-            if content_type == "images_only" and self.vision_model:
-                logger.debug("Using vision model for image analysis")
-                result = self._query_llm(prompt, "", self.vision_provider, images)
+                if not rendered:
+                    seen.update(unseen.images)
+                images = load_images(doc, unseen, rendered, self.page_render_dpi)
+
+                page = PageContent(
+                    page=page_num + 1,
+                    page_count=page_count,
+                    text=extraction.pages[0].text,
+                    metadata={"image_count": len(images), "rendered": bool(rendered)},
+                )
+                if images and self.ocr_active:
+                    images, ocr_counts = self._select_ocr_images(
+                        doc, extraction, rendered, images
+                    )
+                    page.metadata["ocr_skipped"] = bool(ocr_counts["ocr_pages_skipped"])
+                    results = self._process_images_ocr([img for img, _ in images])
+                    found = [(text, conf) for text, conf in results if text]
+                    if found:
+                        page.ocr_text = "\n".join(text for text, _ in found)
+                        page.ocr_confidence = sum(c for _, c in found) / len(found)
+                del images
+                yield page
+
+    def _extraction_settings(self) -> Dict[str, Any]:
+        """Settings that change extract() output, used in cache keys."""
+        config = self.config_manager.config
+        return {
+            "engine_version": EXTRACTION_VERSION,
+            "mupdf_version": fitz.VersionBind,
+            "ocr_enabled": self.ocr_active,
+            "ocr_languages": list(config.ocr_languages) if self.ocr_active else [],
+            "page_render": [
+                self.page_render_mode,
+                self.page_render_dpi,
+                self.page_render_max_images,
+                self.page_render_min_image_px,
+            ]
+            if self._renders_pages()
+            else None,
+            "ocr_pages": [
+                self.ocr_page_mode,
+                self.ocr_min_text_chars,
+                self.ocr_max_image_coverage,
+                self.ocr_min_image_px,
+            ]
+            if self.ocr_active
+            else None,
+        }
+
+    def _content_from_cache(
+        self, file_path: Union[str, Path], entry: Dict[str, Any], cache_key: str
+    ) -> DocumentContent:
+        """Rebuild DocumentContent from a cache entry.
+
+        Images are not cached; they are re-extracted (without OCR) only when the
+        vision model will need them. A retrieval index missing from the entry is
+        built and stored with it.
+        """
+        metadata = dict(entry["metadata"])
+        metadata["file_size"] = os.path.getsize(file_path)
+        metadata["file_name"] = os.path.basename(file_path)
+
+        images = []
+        if entry["content_type"] == "images_only" and self.vision_model:
+            doc = fitz.open(file_path)
+            images = self._extract_images(doc, self._extract_document(doc, file_path))
+
+        content = DocumentContent(
+            text=entry["text"],
+            page_count=entry["page_count"],
+            metadata=metadata,
+            content_type=entry["content_type"],
+            images=images,
+            ocr_text=entry.get("ocr_text"),
+            ocr_confidence=entry.get("ocr_confidence", 0.0),
+            pages=entry.get("pages", []),
+        )
+        if self.retrieval_top_k:
+            if entry.get("retrieval_index"):
+                content.index = BM25Index.from_dict(entry["retrieval_index"])
             else:
-                logger.debug(
-                    f"Using text model with OCR results (confidence: {ocr_confidence:.2%})"
+                content.index = BM25Index.build(content.pages)
+                self.cache.put(
+                    cache_key, {**entry, "retrieval_index": content.index.to_dict()}
                 )
+        return content
+
+    def _retrieve(self, content: DocumentContent, prompt: str) -> List[int]:
+        """Pick the pages most relevant to a prompt.
+
+        Args:
+            content: Extracted content
+            prompt: User prompt used as the search query
+
+        Returns:
+            Indexes into ``content.pages`` in document order, or an empty list
+            if no page matches the prompt
+        """
+        if content.index is None:
+            content.index = BM25Index.build(content.pages)
+        hits = content.index.search(prompt, self.retrieval_top_k)
+        logger.debug(f"Retrieved pages (index, score): {hits}")
+        return sorted(index for index, _ in hits)
+
+    @staticmethod
+    def _page_label(content: DocumentContent, index: int) -> str:
+        """Label a retrieved entry of ``content.pages`` for the LLM context."""
+        if index < content.page_count:
+            return f"[Page {index + 1}]"
+        return f"[Image text {index - content.page_count + 1}]"
+
+    def _map_reduce(
+        self,
+        prompt: str,
+        pages: List[str],
+        cache_stats: Dict[str, int],
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Answer a prompt about a document larger than the context budget.
+
+        The text is split into chunks that fit ``max_context_tokens``, each chunk
+        is queried concurrently (map), and the partial answers are combined by
+        further queries until a single answer remains (reduce).
+
+        Args:
+            prompt: User prompt
+            pages: Text of each page to answer from
+            cache_stats: Response cache counters to update
+            on_token: Optional callback receiving the final answer as it streams
+
+        Returns:
+            Tuple of (answer, metadata with chunk count and per-chunk latency)
+        """
+        chunks = split_text(pages, self.max_context_tokens)
+        logger.debug(
+            f"Document exceeds {self.max_context_tokens} tokens; "
+            f"querying {len(chunks)} chunks"
+        )
+
+        def timed_query(query_prompt: str, context: str) -> Tuple[Any, float, Dict]:
+            """Query one chunk, returning (answer, seconds, cache counters)."""
+            stats: Dict[str, int] = {}
+            start = time.perf_counter()
+            answer = self._query_llm(
+                query_prompt, context, self.text_provider, None, stats
+            )
+            return answer, time.perf_counter() - start, stats
+
+        map_prompts = [
+            MAP_PROMPT.format(prompt=prompt, index=i + 1, count=len(chunks))
+            for i in range(len(chunks))
+        ]
+        with ThreadPoolExecutor(max_workers=self.chunk_concurrency) as pool:
+            mapped = list(pool.map(timed_query, map_prompts, chunks))
+
+        def usable(answers: List[Any]) -> List[str]:
+            # Errors are reported as strings; leave failed chunks out of the reduce
+            return [
+                a
+                for a in answers
+                if isinstance(a, str) and a and not a.startswith("Error")
+            ]
+
+        for _, _, stats in mapped:
+            for counter, value in stats.items():
+                cache_stats[counter] = cache_stats.get(counter, 0) + value
+        answers = usable([answer for answer, _, _ in mapped])
+        metadata = {
+            "chunk_count": len(chunks),
+            "chunk_latencies": [round(latency, 3) for _, latency, _ in mapped],
+            "chunk_failures": len(chunks) - len(answers),
+        }
+        if not answers:
+            return mapped[0][0], metadata
+        if len(answers) == 1:
+            if on_token is not None:
+                on_token(answers[0])
+            return answers[0], metadata
+
+        # Reduce in rounds until the partial answers fit in one request
+        reduce_prompt = REDUCE_PROMPT.format(prompt=prompt)
+        start = time.perf_counter()
+        while True:
+            parts = [f"Part {i + 1}:\n{answer}" for i, answer in enumerate(answers)]
+            context = "\n\n".join(parts)
+            if estimate_tokens(context) <= self.max_context_tokens:
+                break
+            groups = split_text(parts, self.max_context_tokens)
+            if len(groups) >= len(answers):
+                break  # Answers too long to combine further; send them as they are
+            with ThreadPoolExecutor(max_workers=self.chunk_concurrency) as pool:
+                reduced = pool.map(timed_query, [reduce_prompt] * len(groups), groups)
+                reduced = usable([answer for answer, _, _ in reduced])
+            if not reduced:
+                break
+            answers = reduced
+        result = self._query_llm(
+            reduce_prompt, context, self.text_provider, None, cache_stats, on_token
+        )
+        metadata["reduce_latency"] = round(time.perf_counter() - start, 3)
+        return result, metadata
+
+    def query(
+        self,
+        content: DocumentContent,
+        prompt: Optional[str] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> ProcessingResult:
+        """Answer a prompt about previously extracted content.
+
+        Args:
+            content: Result of extract()
+            prompt: Processing prompt; when omitted only the text is returned
+            on_token: Optional callback receiving the response as it streams
+
+        Returns:
+            Processing result
+        """
+        if not prompt:
+            # Return text only if no prompt
+            return ProcessingResult(
+                success=True,
+                text=content.text,
+                page_count=content.page_count,
+                metadata=content.metadata,
+            )
+
+        logger.debug(f"Prompt: {prompt}")
+        cache_stats = {"llm_cache_hits": 0, "llm_cache_misses": 0}
+        chunk_metadata: Dict[str, Any] = {}
+
+        # Use vision model for image-only PDFs, otherwise use text model
+        if content.content_type == "images_only" and self.vision_model:
+            logger.debug("Using vision model for image analysis")
+            result = self._query_llm(
+                prompt, "", self.vision_provider, content.images, cache_stats, on_token
+            )
+        else:
+            logger.debug(
+                f"Using text model with OCR results (confidence: {content.ocr_confidence:.2%})"
+            )
+            pages = content.pages or [content.text]
+            text = content.text
+            if self.retrieval_top_k and len(content.pages) > self.retrieval_top_k:
+                selected = self._retrieve(content, prompt)
+                if selected:
+                    pages = [content.pages[i] for i in selected]
+                    text = "\n\n".join(
+                        self._page_label(content, i) + "\n" + content.pages[i]
+                        for i in selected
+                    )
+                    chunk_metadata["retrieved_pages"] = [i + 1 for i in selected]
+            if (
+                self.max_context_tokens
+                and estimate_tokens(text) > self.max_context_tokens
+            ):
+                result, map_metadata = self._map_reduce(
+                    prompt, pages, cache_stats, on_token
+                )
+                chunk_metadata.update(map_metadata)
+            else:
                 result = self._query_llm(
                     prompt,
-                    self._combine_text(
-                        "\n".join(extracted_text),
-                        "\n".join(ocr_text) if ocr_text else None,
-                    ),
+                    text,
                     self.text_provider,
+                    cache_stats=cache_stats,
+                    on_token=on_token,
                 )
 
-            if prompt:
-                try:
-                    return ProcessingResult(
-                        success=True,
-                        text=self._combine_text(
-                            "\n".join(extracted_text),
-                            "\n".join(ocr_text) if ocr_text else None,
-                        ),
-                        page_count=len(doc),
-                        llm_response=result,
-                        metadata=metadata,
-                    )
-                except Exception as e:
-                    logger.error(f"Error querying LLM: {e}")
-                    return ProcessingResult(
-                        success=False,
-                        text=None,
-                        page_count=None,
-                        llm_response=None,
-                        error=f"Error querying LLM: {e}",
-                        metadata=metadata,
-                    )
+        metadata = dict(content.metadata)
+        metadata.update(chunk_metadata)
+        if self.response_cache is not None:
+            metadata.update(cache_stats)
+
+        return ProcessingResult(
+            success=True,
+            text=content.text,
+            page_count=content.page_count,
+            llm_response=result,
+            metadata=metadata,
+        )
 
-            # Return text only if no prompt
-            return ProcessingResult(
-                success=True,
-                text=self._combine_text(
-                    "\n".join(extracted_text), "\n".join(ocr_text) if ocr_text else None
-                ),
-                page_count=len(doc),
-                metadata=metadata,
+    def process_file(
+        self,
+        file_path: Union[str, Path],
+        prompt: str = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        **kwargs,
+    ) -> PDFProcessingResult:
+        """Process a PDF file.
+
+        Args:
+            file_path: Path to PDF file
+            prompt: Processing prompt
+            on_token: Optional callback receiving the response as it streams
+        """
+        if not self._initialized:
+            return PDFProcessingResult(
+                success=False,
+                error="PDF processor not properly initialized. Please run with --configure first.",
             )
 
+        try:
+            logger.debug(f"Additional args: {kwargs}")
+            return self.query(self.extract(file_path), prompt, on_token)
+
         except Exception as e:
             logger.error(f"Failed to process file: {e}")
             return ProcessingResult(success=False, error=str(e))
@@ -652,31 +1580,29 @@ Please be concise and only include information that directly answers the questio
         """Process a PDF document."""
         try:
             doc = fitz.open(file_path)
-            text_content = []
+            extraction = self._extract_document(doc, file_path)
+            text_content = [page.text for page in extraction.pages]
             ocr_results = []
             ocr_confidences = []
 
-            for page_num, page in enumerate(doc):
-                # Extract text
-                text_content.append(page.get_text())
-
-                # Handle OCR if enabled
-                if self.reader is not None:
-                    images = self._extract_images(page)
-                    for image, _ in images:
-                        try:
-                            results = self.reader.readtext(np.array(image))
-                            if results:
-                                ocr_text, ocr_conf = self._process_ocr_results(
-                                    results, page_num
-                                )
-                                ocr_results.append(ocr_text)
-                                ocr_confidences.append(ocr_conf)
-                        except Exception as e:
-                            if self.verbose:
-                                logger.warning(f"OCR failed for an image: {e}")
-                            if not self.config_manager.config.ocr_fallback:
-                                raise
+            # Handle OCR if enabled
+            if self.reader is not None:
+                import numpy as np
+
+                for image, page_num in self._extract_images(doc, extraction):
+                    try:
+                        results = self.reader.readtext(np.asarray(image))
+                        if results:
+                            ocr_text, ocr_conf = self._process_ocr_results(
+                                results, page_num
+                            )
+                            ocr_results.append(ocr_text)
+                            ocr_confidences.append(ocr_conf)
+                    except Exception as e:
+                        if self.verbose:
+                            logger.warning(f"OCR failed for an image: {e}")
+                        if not self.config_manager.config.ocr_fallback:
+                            raise
 
             # Combine text
             pdf_text = "\n".join(text_content)
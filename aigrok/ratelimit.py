@@ -0,0 +1,172 @@
+"""
+Client-side request and token rate limits for provider calls.
+
+Providers such as OpenAI enforce requests per minute (RPM) and tokens per
+minute (TPM) per model and answer 429 once either is exceeded. Rather than
+discovering the limit through rejected calls, each configured provider/model
+meters its own calls with two token buckets that refill continuously at the
+per-minute rate.
+
+A call reserves one request and its estimated tokens before it is sent. The
+reservation may overdraw a bucket; the caller then sleeps until the debt is
+repaid. Concurrent callers are thereby queued in arrival order and the quota
+is used as fast as it refills, without bursting past it. Once a response
+reports its actual usage, the difference from the estimate is settled so the
+estimate error does not accumulate.
+
+Every attempt of a call, retries included, reserves its own quota before it
+is timed, so the wait for quota is never mistaken for provider latency.
+Hedged duplicates only go out when the buckets can cover them without
+waiting.
+
+Limits are shared per provider/model by every processor and thread of the
+process.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+from loguru import logger
+
+DEFAULT_OUTPUT_TOKENS = 500  # Reserved for a response before its usage is known
+IMAGE_TOKENS = 765  # Tokens charged for one tiled 1024px image by OpenAI
+
+
+class TokenBucket:
+    """Bucket of ``capacity`` units refilled at ``rate`` units per second."""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take ``amount`` units, overdrawing if needed.
+
+        Returns:
+            Seconds until the bucket is out of debt again
+        """
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate)
+
+    def take(self, amount: float, now: float) -> bool:
+        """Take ``amount`` units only if the bucket holds them right now."""
+        self._refill(now)
+        if self.level < min(amount, self.capacity):
+            return False
+        self.level -= min(amount, self.capacity)
+        return True
+
+    def refund(self, amount: float) -> None:
+        """Give back units reserved but not used (negative to charge more)."""
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits of one model."""
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None):
+        """Initialize the limiter.
+
+        Args:
+            rpm: Requests per minute, or None for no request limit
+            tpm: Tokens per minute, or None for no token limit
+        """
+        self.requests = TokenBucket(rpm, rpm / 60) if rpm else None
+        self.tokens = TokenBucket(tpm, tpm / 60) if tpm else None
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int) -> float:
+        """Reserve one request and ``tokens`` tokens.
+
+        Returns:
+            Seconds to wait before sending the request
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self.requests is not None:
+                wait = self.requests.reserve(1, now)
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.reserve(tokens, now))
+            return wait
+
+    def settle(self, reserved: int, used: int) -> None:
+        """Correct a reservation once the response reports its actual usage."""
+        if self.tokens is not None:
+            with self._lock:
+                self.tokens.refund(reserved - used)
+
+    def try_reserve(self, tokens: int) -> bool:
+        """Reserve one request and ``tokens`` tokens only if no wait is needed.
+
+        Returns:
+            Whether the quota was reserved
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.requests is not None and not self.requests.take(1, now):
+                return False
+            if self.tokens is not None and not self.tokens.take(tokens, now):
+                if self.requests is not None:
+                    self.requests.refund(1)
+                return False
+            return True
+
+    def acquire(
+        self, tokens: int, sleep: Callable[[float], None] = time.sleep
+    ) -> None:
+        """Reserve one request and ``tokens`` tokens, waiting until they are due.
+
+        Args:
+            tokens: Estimated tokens of the request and its response
+            sleep: Function used to wait for quota
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            logger.debug(f"Rate limit reached; waiting {wait:.2f}s")
+            sleep(wait)
+
+
+def response_tokens(response: Any) -> Optional[int]:
+    """Tokens a response reports having used, if it reports any.
+
+    Reads ``usage.total_tokens`` of litellm/OpenAI responses and
+    ``prompt_eval_count + eval_count`` of Ollama responses.
+    """
+    usage = getattr(response, "usage", None)
+    if usage is None and isinstance(response, dict):
+        usage = response.get("usage")
+    total = usage.get("total_tokens") if isinstance(usage, dict) else None
+    if usage is not None and total is None:
+        total = getattr(usage, "total_tokens", None)
+    if isinstance(total, int):
+        return total
+    prompt = getattr(response, "prompt_eval_count", None)
+    output = getattr(response, "eval_count", None)
+    if isinstance(prompt, int) and isinstance(output, int):
+        return prompt + output
+    return None
+
+
+_lock = threading.Lock()
+_limiters: Dict[Tuple[str, Optional[int], Optional[int]], RateLimiter] = {}
+
+
+def rate_limiter(
+    key: str, rpm: Optional[int] = None, tpm: Optional[int] = None
+) -> Optional[RateLimiter]:
+    """Shared limiter for a provider/model, or None if neither limit is set."""
+    if not rpm and not tpm:
+        return None
+    with _lock:
+        limiter = _limiters.get((key, rpm, tpm))
+        if limiter is None:
+            limiter = _limiters[(key, rpm, tpm)] = RateLimiter(rpm, tpm)
+        return limiter
@@ -0,0 +1,377 @@
+"""
+Retries, circuit breaking and hedging for provider calls.
+
+A provider call is retried up to ``RetryPolicy.retries`` times when it fails
+with a transient error (timeouts, dropped connections, 408/429/5xx responses),
+sleeping a jittered exponential backoff between attempts. Errors such as a bad
+request or a missing model fail immediately.
+
+Each endpoint has a ``CircuitBreaker``: after ``failure_threshold``
+consecutive transient failures it opens and calls fail fast with
+``CircuitOpenError`` for ``reset_seconds``, then a single trial call decides
+whether it closes again.
+
+With hedging enabled, a call still running after the endpoint's p95 latency
+is duplicated and whichever copy answers first wins. Behind an endpoint pool
+each host has its own breaker and latencies, and the duplicate goes to a host
+other than the one the first copy is waiting on (see ``balancer``). A single
+endpoint is only sent a duplicate with ``hedge_same_endpoint``.
+
+A streamed call is only guarded until its first chunk arrives: connection
+errors are retried and counted by the breaker, while errors after tokens have
+been passed on are not. Streams are neither timed nor hedged.
+"""
+
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Iterable, Iterator, Optional, Tuple, TypeVar
+from loguru import logger
+
+T = TypeVar("T")
+
+DEFAULT_RETRIES = 2  # Attempts after the first one
+DEFAULT_RETRY_BASE_DELAY = 0.5
+DEFAULT_RETRY_MAX_DELAY = 8.0
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_RESET_SECONDS = 30.0
+DEFAULT_HEDGE_MIN_DELAY = 0.5
+HEDGE_MIN_SAMPLES = 10  # Latencies needed before the p95 is trusted
+LATENCY_WINDOW = 200
+
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+RETRYABLE_ERROR_NAMES = frozenset(
+    {
+        # httpx / httpcore transport errors
+        "TimeoutException",
+        "ConnectTimeout",
+        "ReadTimeout",
+        "WriteTimeout",
+        "PoolTimeout",
+        "ConnectError",
+        "ReadError",
+        "RemoteProtocolError",
+        # litellm / openai
+        "APIConnectionError",
+        "APITimeoutError",
+        "Timeout",
+        "RateLimitError",
+        "ServiceUnavailableError",
+        "InternalServerError",
+    }
+)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an endpoint whose circuit breaker is open."""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Return True if an error is transient and the call may be retried."""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS_CODES
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+
+@dataclass
+class RetryPolicy:
+    """How often and how long to wait before retrying a transient failure.
+
+    Attributes:
+        retries: Attempts after the first one
+        base_delay: Backoff ceiling of the first retry in seconds
+        max_delay: Largest backoff ceiling in seconds
+    """
+
+    retries: int = DEFAULT_RETRIES
+    base_delay: float = DEFAULT_RETRY_BASE_DELAY
+    max_delay: float = DEFAULT_RETRY_MAX_DELAY
+
+    def delay(self, attempt: int) -> float:
+        """Backoff before retry ``attempt`` (0-based), with full jitter."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one endpoint."""
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_BREAKER_THRESHOLD,
+        reset_seconds: float = DEFAULT_BREAKER_RESET_SECONDS,
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """``closed``, ``open`` or ``half-open``."""
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_seconds:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> bool:
+        """Return True if a call may go through; half-open allows one trial."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+class LatencyWindow:
+    """Recent successful call latencies of an endpoint."""
+
+    def __init__(self, size: int = LATENCY_WINDOW):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency below which a fraction ``q`` of samples fall, if known."""
+        with self._lock:
+            if len(self._samples) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass
+class EndpointGuard:
+    """Breaker and latency history shared by every call to one endpoint."""
+
+    breaker: CircuitBreaker
+    latencies: LatencyWindow
+
+
+_lock = threading.Lock()
+_guards: Dict[Tuple[str, int, float], EndpointGuard] = {}
+
+
+def endpoint_guard(
+    endpoint: str,
+    failure_threshold: int = DEFAULT_BREAKER_THRESHOLD,
+    reset_seconds: float = DEFAULT_BREAKER_RESET_SECONDS,
+) -> EndpointGuard:
+    """Shared guard for an endpoint, created on first use."""
+    key = (endpoint, failure_threshold, reset_seconds)
+    with _lock:
+        guard = _guards.get(key)
+        if guard is None:
+            guard = _guards[key] = EndpointGuard(
+                CircuitBreaker(failure_threshold, reset_seconds), LatencyWindow()
+            )
+        return guard
+
+
+def hedged(
+    call: Callable[[], T],
+    delay: float,
+    duplicate: Optional[Callable[[], Optional[Callable[[], T]]]] = None,
+) -> T:
+    """Run ``call``, starting a duplicate if it has not finished after ``delay``.
+
+    Args:
+        call: Provider call without arguments
+        delay: Seconds to wait before the duplicate is sent
+        duplicate: Returns the copy to send once the delay has passed, or None
+            to keep waiting on ``call`` alone; by default ``call`` is repeated
+
+    Returns:
+        The first successful result; if both copies fail, the last error is
+        raised
+    """
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        primary = executor.submit(call)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        copy = duplicate() if duplicate is not None else call
+        if copy is None:
+            return primary.result()
+        logger.debug(f"Hedging a request still running after {delay:.2f}s")
+        pending = {primary, executor.submit(copy)}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+    finally:
+        # The slower copy finishes in the background; its result is dropped
+        executor.shutdown(wait=False)
+
+
+def guarded_call(call: Callable[[], T], guard: EndpointGuard, timed: bool = True) -> T:
+    """Run a call, recording its outcome on the endpoint's breaker and latencies.
+
+    Args:
+        call: Provider call without arguments
+        guard: Breaker and latencies of the endpoint the call goes to
+        timed: Add the call's duration to the latency window on success
+    """
+    start = time.monotonic()
+    try:
+        result = call()
+    except Exception as e:
+        if is_retryable(e):
+            guard.breaker.record_failure()
+        else:
+            guard.breaker.record_success()  # The endpoint answered
+        raise
+    guard.breaker.record_success()
+    if timed:
+        guard.latencies.add(time.monotonic() - start)
+    return result
+
+
+def open_stream(call: Callable[[], Iterable[T]]) -> Iterator[T]:
+    """Start a streamed call and wait for its first chunk.
+
+    Connection errors surface here, before anything has been passed on.
+    """
+    chunks = iter(call())
+    try:
+        first = next(chunks)
+    except StopIteration:
+        return iter(())
+    return itertools.chain((first,), chunks)
+
+
+def retrying(
+    attempt: Callable[[], T],
+    policy: RetryPolicy,
+    sleep: Callable[[float], None] = time.sleep,
+) -> T:
+    """Run ``attempt`` until it succeeds, retrying transient failures.
+
+    A ``CircuitOpenError`` ends the retries; if an earlier attempt failed,
+    that error is raised instead.
+
+    Args:
+        attempt: One attempt of the call
+        policy: Retry policy for transient failures
+        sleep: Function used to wait between attempts
+
+    Returns:
+        The first successful result
+    """
+    retry = 0
+    last_error: Optional[Exception] = None
+    while True:
+        try:
+            return attempt()
+        except CircuitOpenError:
+            if last_error is not None:
+                raise last_error  # The breaker opened while retrying
+            raise
+        except Exception as e:
+            if not is_retryable(e) or retry >= policy.retries:
+                raise
+            last_error = e
+            backoff = policy.delay(retry)
+            retry += 1
+            logger.warning(
+                f"LLM call failed ({e}); retry {retry}/{policy.retries} "
+                f"in {backoff:.2f}s"
+            )
+            sleep(backoff)
+
+
+def call_with_resilience(
+    call: Callable[[], T],
+    guard: EndpointGuard,
+    policy: RetryPolicy,
+    hedge: bool = False,
+    hedge_min_delay: float = DEFAULT_HEDGE_MIN_DELAY,
+    sleep: Callable[[float], None] = time.sleep,
+    may_hedge: Optional[Callable[[], bool]] = None,
+    stream: bool = False,
+    acquire: Optional[Callable[[], None]] = None,
+    hedge_same_endpoint: bool = False,
+) -> T:
+    """Call a provider through the endpoint's breaker, retrying and hedging.
+
+    Args:
+        call: Provider call without arguments
+        guard: Breaker and latencies of the endpoint
+        policy: Retry policy for transient failures
+        hedge: Duplicate calls running longer than the endpoint's p95 latency
+        hedge_min_delay: Shortest delay before a duplicate is sent
+        sleep: Function used to wait between attempts
+        may_hedge: Asked before a duplicate is sent; False skips it
+        stream: The call returns a stream, which is guarded until its first
+            chunk and returned as an iterator
+        acquire: Waits for rate-limit quota before each attempt, outside its
+            latency sample
+        hedge_same_endpoint: Allow the duplicate to go to the same endpoint;
+            without another endpoint to send it to, hedging is skipped
+            instead of doubling the load on the slow one
+
+    Returns:
+        The call's result
+
+    Raises:
+        CircuitOpenError: If the endpoint's circuit is open
+        Exception: The last error once retries are exhausted, or the first
+            error that is not transient
+    """
+
+    def send() -> T:
+        if stream:
+            return guarded_call(lambda: open_stream(call), guard, timed=False)
+        return guarded_call(call, guard)
+
+    def duplicate() -> Optional[Callable[[], T]]:
+        return send if may_hedge is None or may_hedge() else None
+
+    def attempt() -> T:
+        if not guard.breaker.allow():
+            raise CircuitOpenError("Circuit open: endpoint failed repeatedly")
+        if acquire is not None:
+            acquire()
+        # The only endpoint is the one already slow: resend there only on request
+        hedging = hedge and hedge_same_endpoint and not stream
+        delay = guard.latencies.percentile(0.95) if hedging else None
+        if delay is None:
+            return send()
+        return hedged(send, max(delay, hedge_min_delay), duplicate)
+
+    return retrying(attempt, policy, sleep)
@@ -0,0 +1,103 @@
+"""
+Lexical retrieval over the pages of a document.
+
+A BM25 index over page text lets a prompt about a long document be answered
+from the few pages that mention its terms instead of the whole text. Indexes
+are plain term counts, so they serialize to JSON next to the extraction cache
+entry they were built from.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, Sequence, Tuple
+
+DEFAULT_TOP_K = 5
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = frozenset(
+    """a an and are as at be by did do does for from has have how i in is it its
+    of on or that the this to was were what when where which who why will with
+    you your""".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase terms, dropping common stopwords."""
+    return [
+        term
+        for term in _TOKEN_RE.findall(text.casefold())
+        if term not in STOPWORDS
+    ]
+
+
+def idf(count: int, doc_freq: int) -> float:
+    """BM25 inverse document frequency of a term in doc_freq of count documents."""
+    return math.log((count - doc_freq + 0.5) / (doc_freq + 0.5) + 1)
+
+
+def term_score(tf: int, length: int, avg_length: float, term_idf: float) -> float:
+    """BM25 contribution of one query term to a document's score."""
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / (avg_length or 1))
+    return term_idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+
+class BM25Index:
+    """Okapi BM25 index where each page is a document."""
+
+    def __init__(self, term_counts: List[Dict[str, int]]):
+        """Initialize the index from per-page term counts.
+
+        Args:
+            term_counts: Term frequencies of each page, in page order
+        """
+        self.term_counts = term_counts
+        self.lengths = [sum(counts.values()) for counts in term_counts]
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0
+        doc_freqs: Counter = Counter()
+        for counts in term_counts:
+            doc_freqs.update(counts.keys())
+        n = len(term_counts)
+        self.idf = {term: idf(n, df) for term, df in doc_freqs.items()}
+
+    @classmethod
+    def build(cls, pages: Sequence[str]) -> "BM25Index":
+        """Index the text of each page."""
+        return cls([dict(Counter(tokenize(page))) for page in pages])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the index for the extraction cache."""
+        return {"term_counts": self.term_counts}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BM25Index":
+        """Rebuild an index serialized with to_dict()."""
+        return cls(data["term_counts"])
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """Rank pages against a query.
+
+        Args:
+            query: Free-text query, usually the user prompt
+            k: Maximum number of pages to return
+
+        Returns:
+            (page index, score) pairs for pages matching at least one term,
+            best first
+        """
+        terms = set(tokenize(query))
+        scores = []
+        for index, counts in enumerate(self.term_counts):
+            score = 0.0
+            for term in terms:
+                tf = counts.get(term)
+                if tf:
+                    score += term_score(
+                        tf, self.lengths[index], self.avg_length, self.idf[term]
+                    )
+            if score > 0:
+                scores.append((index, score))
+        scores.sort(key=lambda item: (-item[1], item[0]))
+        return scores[:k]
@@ -0,0 +1,327 @@
+"""
+ASGI HTTP server for aigrok.
+
+Serves ``APIProcessor.process_pdf`` at ``POST /process`` (the endpoint
+``APIClient`` talks to) plus ``GET /health`` and ``GET /ready`` probes for
+load balancers. Run it with ``aigrok-server`` or any ASGI server, e.g.
+``uvicorn aigrok.server:app``. Clients sending ``Accept: text/event-stream``
+to ``/process`` receive the LLM response as server-sent ``token`` events
+followed by a final ``result`` event.
+
+Blocking work never runs on the event loop: extraction and OCR go to a pool
+of worker processes, each with its own warm ``PDFProcessor`` (MuPDF is not
+thread-safe), and LLM queries go to a thread pool sharing one processor.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+from pydantic import ValidationError
+from .api import APIProcessor, ProcessRequest, ProcessResponse
+from .batch import _extract_in_worker, _init_worker
+from .clients import close_clients
+from .config import ConfigManager
+from .logging import configure_logging
+from .pdf_processor import PDFProcessor
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+DEFAULT_JOBS = 2
+DEFAULT_LLM_CONCURRENCY = 4
+
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def _worker_ready() -> bool:
+    """No-op run in a fresh extraction worker to finish its startup."""
+    return True
+
+
+class AigrokApp:
+    """ASGI application wrapping a shared, warm APIProcessor."""
+
+    def __init__(
+        self,
+        config_manager: Optional[ConfigManager] = None,
+        jobs: int = DEFAULT_JOBS,
+        llm_concurrency: int = DEFAULT_LLM_CONCURRENCY,
+        verbose: bool = False,
+        workers: int = 1,
+        api_processor: Optional[APIProcessor] = None,
+    ):
+        """Initialize the application; processors are built at startup.
+
+        Args:
+            config_manager: Configuration (loaded from disk if omitted)
+            jobs: Number of extraction and OCR processes
+            llm_concurrency: Maximum number of concurrent LLM requests
+            verbose: Enable verbose processor logging
+            workers: Number of processes used to extract pages of large PDFs
+            api_processor: Processor to use instead of building one
+        """
+        self.config_manager = config_manager
+        self.jobs = max(1, jobs)
+        self.llm_concurrency = max(1, llm_concurrency)
+        self.verbose = verbose
+        self.workers = workers
+        self.api_processor = api_processor
+        self.ready = False
+        self._extract_pool: Optional[ProcessPoolExecutor] = None
+        self._llm_pool: Optional[ThreadPoolExecutor] = None
+
+    async def __call__(self, scope: Dict[str, Any], receive: Receive, send: Send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            response = await self._route(scope, receive, send)
+            if response is not None:
+                status, body = response
+                await _start_response(send, status, b"application/json")
+                await send({"type": "http.response.body", "body": body})
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as e:
+                    logger.error(f"Server startup failed: {e}")
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def startup(self) -> None:
+        """Start the worker pools and load the models."""
+        loop = asyncio.get_running_loop()
+        config_manager = self.config_manager
+        if self.api_processor is None:
+            config_manager = config_manager or ConfigManager()
+        else:
+            config_manager = self.api_processor.pdf_processor.config_manager
+
+        # Fork extraction workers before any threads exist
+        self._extract_pool = ProcessPoolExecutor(
+            max_workers=self.jobs,
+            initializer=_init_worker,
+            initargs=(config_manager.config, self.verbose, self.workers, self.jobs),
+        )
+        await loop.run_in_executor(self._extract_pool, _worker_ready)
+
+        self._llm_pool = ThreadPoolExecutor(max_workers=self.llm_concurrency)
+        if self.api_processor is None:
+            processor = await loop.run_in_executor(
+                self._llm_pool,
+                lambda: PDFProcessor(
+                    config_manager=config_manager,
+                    verbose=self.verbose,
+                    workers=self.workers,
+                ),
+            )
+            self.api_processor = APIProcessor(processor)
+
+        self.ready = True
+        logger.info("aigrok server ready")
+
+    async def shutdown(self) -> None:
+        """Stop accepting work and shut down the worker pools."""
+        self.ready = False
+        for pool in (self._extract_pool, self._llm_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._extract_pool = self._llm_pool = None
+        if self.api_processor is not None:
+            self.api_processor.pdf_processor.close()
+        close_clients()
+
+    async def _route(
+        self, scope: Dict[str, Any], receive: Receive, send: Send
+    ) -> Optional[Tuple[int, bytes]]:
+        """Dispatch a request.
+
+        Returns:
+            Status and JSON body, or None if the handler already responded
+        """
+        routes = {
+            "/health": ("GET", self._health),
+            "/ready": ("GET", self._ready),
+            "/process": ("POST", self._process),
+        }
+        if scope["path"] not in routes:
+            return 404, _json({"error": "Not found"})
+        method, handler = routes[scope["path"]]
+        if scope["method"] != method:
+            return 405, _json({"error": "Method not allowed"})
+        return await handler(scope, await _read_body(receive), send)
+
+    async def _health(self, scope, body: bytes, send: Send) -> Tuple[int, bytes]:
+        return 200, _json({"status": "ok"})
+
+    async def _ready(self, scope, body: bytes, send: Send) -> Tuple[int, bytes]:
+        if self.ready:
+            return 200, _json({"status": "ready"})
+        return 503, _json({"status": "starting"})
+
+    async def _process(
+        self, scope: Dict[str, Any], body: bytes, send: Send
+    ) -> Optional[Tuple[int, bytes]]:
+        if not self.ready:
+            return 503, _json({"error": "Server is not ready"})
+        try:
+            request = ProcessRequest(**json.loads(body or b"{}"))
+        except json.JSONDecodeError as e:
+            return 400, _json({"error": f"Invalid JSON: {e}"})
+        except (TypeError, ValidationError) as e:
+            return 422, _json({"error": str(e)})
+
+        if b"text/event-stream" in dict(scope.get("headers", [])).get(b"accept", b""):
+            await self._process_stream(request, send)
+            return None
+
+        loop = asyncio.get_running_loop()
+        try:
+            content = await loop.run_in_executor(
+                self._extract_pool, _extract_in_worker, request.file_path
+            )
+        except Exception as e:
+            logger.error(f"Error processing PDF through API: {e}")
+            response = ProcessResponse(success=False, error=str(e))
+            return 200, response.model_dump_json().encode()
+
+        response = await loop.run_in_executor(
+            self._llm_pool, self.api_processor.process_pdf, request, content
+        )
+        return 200, response.model_dump_json().encode()
+
+    async def _process_stream(self, request: ProcessRequest, send: Send) -> None:
+        """Answer with server-sent events: ``token`` events, then ``result``."""
+        loop = asyncio.get_running_loop()
+        tokens: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+        await _start_response(send, 200, b"text/event-stream")
+
+        try:
+            content = await loop.run_in_executor(
+                self._extract_pool, _extract_in_worker, request.file_path
+            )
+        except Exception as e:
+            logger.error(f"Error processing PDF through API: {e}")
+            response = ProcessResponse(success=False, error=str(e))
+            await send(_sse_body("result", response.model_dump_json()))
+            return
+
+        def on_token(token: str) -> None:
+            loop.call_soon_threadsafe(tokens.put_nowait, token)
+
+        future = loop.run_in_executor(
+            self._llm_pool, self.api_processor.process_pdf, request, content, on_token
+        )
+        # Tokens are queued before the future completes, so None comes last
+        future.add_done_callback(lambda _: tokens.put_nowait(None))
+        while True:
+            token = await tokens.get()
+            if token is None:
+                break
+            await send(_sse_body("token", json.dumps({"token": token}), more=True))
+        response = await future
+        await send(_sse_body("result", response.model_dump_json()))
+
+
+async def _read_body(receive: Receive) -> bytes:
+    """Read the full request body."""
+    chunks: List[bytes] = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+def _json(data: Dict[str, Any]) -> bytes:
+    return json.dumps(data).encode()
+
+
+async def _start_response(send: Send, status: int, content_type: bytes) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", content_type)],
+        }
+    )
+
+
+def _sse_body(event: str, data: str, more: bool = False) -> Dict[str, Any]:
+    """Build a response body message carrying one server-sent event."""
+    return {
+        "type": "http.response.body",
+        "body": f"event: {event}\ndata: {data}\n\n".encode(),
+        "more_body": more,
+    }
+
+
+# Module-level app for ``uvicorn aigrok.server:app``
+app = AigrokApp()
+
+
+def main() -> None:
+    """Run the HTTP server with uvicorn."""
+    parser = argparse.ArgumentParser(
+        prog="aigrok-server", description="Serve aigrok over HTTP"
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Bind address")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Bind port")
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Extraction and OCR processes (default: {DEFAULT_JOBS})",
+    )
+    parser.add_argument(
+        "--llm-concurrency",
+        type=int,
+        default=DEFAULT_LLM_CONCURRENCY,
+        help=f"Maximum LLM requests in flight (default: {DEFAULT_LLM_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes used to extract pages of large PDFs (default: 1)",
+    )
+    parser.add_argument(
+        "--verbose", "-v", action="store_true", help="Enable verbose logging"
+    )
+    args = parser.parse_args()
+    configure_logging(args.verbose)
+
+    try:
+        import uvicorn
+    except ImportError:
+        print("Error: aigrok-server requires uvicorn (pip install 'aigrok[server]')")
+        sys.exit(1)
+
+    uvicorn.run(
+        AigrokApp(
+            jobs=args.jobs,
+            llm_concurrency=args.llm_concurrency,
+            verbose=args.verbose,
+            workers=args.workers,
+        ),
+        host=args.host,
+        port=args.port,
+        lifespan="on",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -153,6 +153,22 @@ def mock_env_vars(monkeypatch):
         monkeypatch.setenv(key, value)
 
 
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(monkeypatch, tmp_path):
+    """Keep extraction cache entries out of the user's cache directory."""
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setattr("aigrok.cache.DEFAULT_CACHE_DIR", cache_dir)
+    return cache_dir
+
+
+@pytest.fixture(autouse=True)
+def isolated_endpoint_state(monkeypatch):
+    """Start each test with closed circuit breakers, fresh pools and quotas."""
+    monkeypatch.setattr("aigrok.resilience._guards", {})
+    monkeypatch.setattr("aigrok.balancer._pools", {})
+    monkeypatch.setattr("aigrok.ratelimit._limiters", {})
+
+
 @pytest.fixture(autouse=True)
 def cleanup_test_files(request, test_dir):
     """Clean up test files after tests."""
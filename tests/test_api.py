@@ -27,7 +27,7 @@ class OCRConfig(BaseModel):
 
 
 class AigrokConfig(BaseModel):
-    model_config: ModelConfig
+    models: ModelConfig
     ocr_config: OCRConfig
 
     @property
@@ -44,11 +44,11 @@ class AigrokConfig(BaseModel):
 
     @property
     def text_model(self) -> str:
-        return self.model_config.text_model
+        return self.models.text_model
 
     @property
     def vision_model(self) -> str:
-        return self.model_config.vision_model
+        return self.models.vision_model
 
 
 @pytest.fixture
@@ -78,8 +78,10 @@ def mock_requests():
 def mock_api_processor(mocker):
     """Create a mock API processor for testing."""
     processor = APIProcessor()
-    # Mock the process_file method
+    # Mock the processing stages
     mocker.patch.object(processor.pdf_processor, "process_file")
+    mocker.patch.object(processor.pdf_processor, "extract")
+    mocker.patch.object(processor.pdf_processor, "query")
     return processor
 
 
@@ -153,16 +155,19 @@ def test_api_processor_json_output(mock_api_processor):
     schema = OutputSchema(format="json", schema_def='{"title": "string", "amount": "number"}')
     request = ProcessRequest(file_path="test.pdf", output_schema=schema)
 
-    # Mock first call for text extraction
-    mock_api_processor.pdf_processor.process_file.side_effect = [
-        ProcessingResult(success=True, text="Sample text"),
-        ProcessingResult(success=True, llm_response='{"title": "Invoice", "amount": 100.0}'),
-    ]
+    mock_api_processor.pdf_processor.query.return_value = ProcessingResult(
+        success=True, text="Sample text", llm_response='{"title": "Invoice", "amount": 100.0}'
+    )
 
     response = mock_api_processor.process_pdf(request)
     assert response.success
     assert response.structured_output == '{"title": "Invoice", "amount": 100.0}'
 
+    # The document is extracted once, for the prompt and the format prompt
+    mock_api_processor.pdf_processor.extract.assert_called_once_with("test.pdf")
+    assert mock_api_processor.pdf_processor.query.call_count == 2
+    mock_api_processor.pdf_processor.process_file.assert_not_called()
+
     # Additional validation of JSON structure (preserved from original)
     output = json.loads(response.structured_output)
     assert "title" in output
@@ -174,17 +179,58 @@ def test_api_processor_csv_output(mock_api_processor):
     schema = OutputSchema(format="csv", schema_def=["title", "amount"])
     request = ProcessRequest(file_path="test.pdf", output_schema=schema)
 
-    # Mock first call for text extraction
-    mock_api_processor.pdf_processor.process_file.side_effect = [
-        ProcessingResult(success=True, text="Sample text"),
-        ProcessingResult(success=True, llm_response="Invoice,100.0"),
-    ]
+    mock_api_processor.pdf_processor.query.return_value = ProcessingResult(
+        success=True, text="Sample text", llm_response="Invoice,100.0"
+    )
 
     response = mock_api_processor.process_pdf(request)
     assert response.success
     assert response.structured_output == "Invoice,100.0"
 
 
+def test_api_processor_structured_output_keeps_answer(mock_api_processor):
+    """By default the free-text answer and the structured output are separate."""
+    schema = OutputSchema(format="csv", schema_def=["title", "amount"])
+    request = ProcessRequest(file_path="test.pdf", prompt="Find the invoice", output_schema=schema)
+    content = mock_api_processor.pdf_processor.extract.return_value
+    mock_api_processor.pdf_processor.query.side_effect = [
+        ProcessingResult(success=True, text="Sample text", llm_response="The invoice is for 100."),
+        ProcessingResult(success=True, text="Sample text", llm_response="Invoice,100.0"),
+    ]
+
+    response = mock_api_processor.process_pdf(request)
+
+    assert response.llm_response == "The invoice is for 100."
+    assert response.structured_output == "Invoice,100.0"
+    mock_api_processor.pdf_processor.extract.assert_called_once_with("test.pdf")
+    (answer_call, format_call) = mock_api_processor.pdf_processor.query.call_args_list
+    assert answer_call.args == (content, "Find the invoice")
+    assert format_call.args[0] is content
+    assert "title, amount" in format_call.args[1]
+
+
+def test_api_processor_structured_output_combines_prompt(mock_api_processor):
+    """With combine_prompts the prompt and format instructions share one call."""
+    schema = OutputSchema(format="csv", schema_def=["title", "amount"])
+    request = ProcessRequest(
+        file_path="test.pdf", prompt="Find the invoice", output_schema=schema, combine_prompts=True
+    )
+    content = mock_api_processor.pdf_processor.extract.return_value
+    mock_api_processor.pdf_processor.query.return_value = ProcessingResult(
+        success=True, text="Sample text", llm_response="Invoice,100.0"
+    )
+
+    response = mock_api_processor.process_pdf(request)
+
+    assert response.structured_output == "Invoice,100.0"
+    assert response.llm_response == "Invoice,100.0"
+    mock_api_processor.pdf_processor.query.assert_called_once()
+    (queried_content, prompt), _ = mock_api_processor.pdf_processor.query.call_args
+    assert queried_content is content
+    assert prompt.startswith("Find the invoice\n\n")
+    assert "title, amount" in prompt
+
+
 def test_api_processor_error_handling(mock_api_processor):
     """Test error handling in API processor."""
     request = ProcessRequest(file_path="test.pdf")
@@ -200,11 +246,10 @@ def test_invalid_structured_output(mock_api_processor):
     schema = OutputSchema(format="json", schema_def='{"title": "string", "amount": "number"}')
     request = ProcessRequest(file_path="test.pdf", output_schema=schema)
 
-    # Mock responses with invalid JSON
-    mock_api_processor.pdf_processor.process_file.side_effect = [
-        ProcessingResult(success=True, text="Sample text"),
-        ProcessingResult(success=True, llm_response="Invalid JSON"),
-    ]
+    # Mock a response with invalid JSON
+    mock_api_processor.pdf_processor.query.return_value = ProcessingResult(
+        success=True, text="Sample text", llm_response="Invalid JSON"
+    )
 
     response = mock_api_processor.process_pdf(request)
     assert response.success  # Overall process succeeded
@@ -300,10 +345,9 @@ def test_api_processor_markdown_output(mock_api_processor):
     schema = OutputSchema(format="markdown", schema_def=["# Title", "## Section", "Content"])
     request = ProcessRequest(file_path="test.pdf", output_schema=schema)
 
-    mock_api_processor.pdf_processor.process_file.side_effect = [
-        ProcessingResult(success=True, text="Sample text"),
-        ProcessingResult(success=True, llm_response="# Document Title\n## Summary\nContent here"),
-    ]
+    mock_api_processor.pdf_processor.query.return_value = ProcessingResult(
+        success=True, text="Sample text", llm_response="# Document Title\n## Summary\nContent here"
+    )
 
     response = mock_api_processor.process_pdf(request)
     assert response.success
@@ -0,0 +1,176 @@
+"""Tests for latency-aware load balancing over Ollama endpoints."""
+
+import time
+from unittest.mock import MagicMock, patch
+import pytest
+from aigrok.balancer import BalancedOllamaClient, EndpointPool
+from aigrok.config import AigrokConfig, ConfigManager, ModelConfig
+from aigrok.pdf_processor import PDFProcessor
+from aigrok.resilience import RetryPolicy, endpoint_guard
+
+HOSTS = ["http://gpu1:11434", "http://gpu2:11434", "http://gpu3:11434"]
+
+
+def test_requests_spread_by_in_flight_count():
+    pool = EndpointPool(HOSTS)
+
+    picked = [pool.acquire().url for _ in range(3)]
+
+    assert sorted(picked) == HOSTS  # Each idle host takes one request
+
+
+def test_faster_endpoint_gets_more_traffic():
+    pool = EndpointPool(HOSTS[:2])
+    fast, slow = pool.stats
+    fast.latency, slow.latency = 0.1, 1.0
+
+    # Even with requests in flight the fast host is expected to answer first
+    assert [pool.acquire().url for _ in range(3)] == [fast.url] * 3
+    fast.in_flight = 20
+    assert pool.acquire().url == slow.url
+
+
+def test_failing_endpoint_is_ejected_and_readmitted():
+    pool = EndpointPool(HOSTS[:2], eject_after=2, eject_seconds=10)
+    bad = pool.stats[0]
+    with patch("aigrok.balancer.time.monotonic", return_value=100.0):
+        bad.in_flight = 2
+        for _ in range(2):
+            pool.release(bad, 0.5, ConnectionError("refused"))
+        assert bad.ejected(100.0)
+        assert all(pool.acquire() is pool.stats[1] for _ in range(3))
+
+    # Re-admitted after the ejection period, on probation
+    with patch("aigrok.balancer.time.monotonic", return_value=111.0):
+        assert not bad.ejected(111.0)
+        bad.in_flight = 1
+        pool.release(bad, 0.5, ConnectionError("refused"))
+        assert bad.ejected_until == 111.0 + 20  # Doubled
+
+    with patch("aigrok.balancer.time.monotonic", return_value=200.0):
+        bad.in_flight = 1
+        pool.release(bad, 0.2)
+        assert (bad.failures, bad.ejections) == (0, 0)
+
+
+def test_balanced_client_records_outcomes():
+    pool = EndpointPool(HOSTS[:2])
+    clients = {url: MagicMock() for url in HOSTS[:2]}
+    clients[HOSTS[0]].chat.side_effect = ConnectionError("down")
+    clients[HOSTS[1]].chat.return_value = "answer"
+
+    with patch(
+        "aigrok.balancer.ollama_client", side_effect=lambda url, _: clients[url]
+    ):
+        client = BalancedOllamaClient(pool)
+        with pytest.raises(ConnectionError):
+            client.chat(model="m", messages=[])
+        assert client.chat(model="m", messages=[]) == "answer"
+
+        clients[HOSTS[1]].chat.return_value = iter(["a", "b"])
+        stream = client.chat(model="m", messages=[], stream=True)
+        assert pool.stats[1].in_flight == 0  # Not started until iterated
+        assert next(stream) == "a"
+        assert pool.stats[1].in_flight == 1
+        stream.close()
+
+    assert [s["in_flight"] for s in pool.snapshot()] == [0, 0]
+    assert pool.stats[0].failures == 1 and pool.stats[0].latency is None
+    assert pool.stats[1].latency is not None
+
+
+def test_hosts_have_their_own_breaker_and_latencies():
+    pool = EndpointPool(HOSTS[:2])
+    clients = {url: MagicMock() for url in HOSTS[:2]}
+    clients[HOSTS[0]].chat.side_effect = ConnectionError("down")
+    clients[HOSTS[1]].chat.return_value = "answer"
+    policy = RetryPolicy(retries=1, base_delay=0)
+
+    with patch(
+        "aigrok.balancer.ollama_client", side_effect=lambda url, _: clients[url]
+    ):
+        client = BalancedOllamaClient(pool)
+        assert client.call("chat", {"model": "m"}, policy, breaker_threshold=1) == (
+            "answer"
+        )
+        # The failed host's breaker is open, so it is no longer tried
+        assert client.call("chat", {"model": "m"}, policy, breaker_threshold=1) == (
+            "answer"
+        )
+
+    down, up = (endpoint_guard(url, 1) for url in HOSTS[:2])
+    assert down.breaker.state == "open" and up.breaker.state == "closed"
+    assert clients[HOSTS[0]].chat.call_count == 1
+    assert len(down.latencies._samples) == 0
+    assert len(up.latencies._samples) == 2
+
+
+@pytest.mark.parametrize("hosts,answer", [(HOSTS[:2], "fast"), (HOSTS[:1], "slow")])
+def test_hedge_goes_to_another_host(hosts, answer):
+    pool = EndpointPool(hosts)
+    pool.stats[0].latency = 0.01  # Preferred for the first copy
+    clients = {url: MagicMock() for url in hosts}
+    for url in hosts:
+        guard = endpoint_guard(url)
+        for _ in range(10):
+            guard.latencies.add(0.01)
+
+    def slow(**kwargs):
+        time.sleep(0.3)
+        return "slow"
+
+    clients[HOSTS[0]].chat.side_effect = slow
+    if len(hosts) > 1:
+        clients[HOSTS[1]].chat.return_value = "fast"
+
+    with patch(
+        "aigrok.balancer.ollama_client", side_effect=lambda url, _: clients[url]
+    ):
+        client = BalancedOllamaClient(pool)
+        result = client.call(
+            "chat", {"model": "m"}, RetryPolicy(), hedge=True, hedge_min_delay=0.05
+        )
+
+    assert result == answer
+    # With no other host, the slow one is never sent a second copy
+    assert clients[HOSTS[0]].chat.call_count == 1
+
+
+def test_stream_connection_is_retried_on_another_host():
+    pool = EndpointPool(HOSTS[:2])
+    clients = {url: MagicMock() for url in HOSTS[:2]}
+    clients[HOSTS[0]].chat.side_effect = ConnectionError("refused")
+    clients[HOSTS[1]].chat.return_value = iter(["a", "b"])
+
+    with patch(
+        "aigrok.balancer.ollama_client", side_effect=lambda url, _: clients[url]
+    ):
+        client = BalancedOllamaClient(pool)
+        stream = client.call(
+            "chat",
+            {"model": "m", "stream": True},
+            RetryPolicy(retries=1, base_delay=0),
+        )
+        assert pool.stats[1].in_flight == 1  # Connected, first chunk received
+        assert list(stream) == ["a", "b"]
+
+    assert [s["in_flight"] for s in pool.snapshot()] == [0, 0]
+    assert endpoint_guard(HOSTS[0]).breaker.failures == 1
+
+
+def test_processor_balances_models_with_several_endpoints():
+    config_manager = ConfigManager()
+    config_manager.config = AigrokConfig(
+        text_model=ModelConfig(provider="ollama", model_name="m", endpoints=HOSTS),
+        vision_model=ModelConfig(
+            provider="ollama", model_name="v", endpoint=HOSTS[0]
+        ),
+        endpoint_eject_after=5,
+    )
+
+    processor = PDFProcessor(config_manager=config_manager)
+
+    assert isinstance(processor.llm, BalancedOllamaClient)
+    assert [s.url for s in processor.llm.pool.stats] == HOSTS
+    assert processor.llm.pool.eject_after == 5
+    assert PDFProcessor(config_manager=config_manager).llm.pool is processor.llm.pool
@@ -0,0 +1,180 @@
+"""Tests for concurrent batch processing."""
+
+import multiprocessing
+import threading
+import time
+from unittest.mock import MagicMock
+import pytest
+from aigrok import batch
+from aigrok.batch import process_batch
+from aigrok.pdf_processor import DocumentContent
+from aigrok.types import ProcessingResult
+
+requires_fork = pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork",
+    reason="Worker processes inherit the patched processor only when forked",
+)
+
+
+class FakeExtractor:
+    """Stand-in for the processor built inside extraction workers."""
+
+    def __init__(self, config_manager=None, verbose=False, workers=1):
+        self.ocr_workers = getattr(config_manager.config, "ocr_workers", None)
+
+    def extract(self, file_path):
+        if file_path == "missing.pdf":
+            raise ValueError(f"File not found: {file_path}")
+        return DocumentContent(
+            text=f"text of {file_path}",
+            page_count=1,
+            metadata={"file_name": file_path, "ocr_workers": self.ocr_workers},
+        )
+
+    def preload_ocr(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeQuerier:
+    """Stand-in for the processor running the LLM stage."""
+
+    verbose = False
+    workers = 1
+    config_manager = MagicMock(config=None)
+
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def query(self, content, prompt):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delays.get(content.metadata["file_name"], 0.05))
+        with self._lock:
+            self.in_flight -= 1
+        return ProcessingResult(
+            success=True,
+            text=content.text,
+            llm_response=f"answer for {content.metadata['file_name']}",
+            metadata=content.metadata,
+        )
+
+
+@pytest.fixture
+def fake_workers(monkeypatch):
+    """Make extraction workers build FakeExtractor instead of PDFProcessor."""
+    monkeypatch.setattr(batch, "PDFProcessor", FakeExtractor)
+
+
+def test_process_batch_serial_uses_process_file():
+    """With both knobs at 1 files are processed one after another."""
+    processor = MagicMock()
+    processor.process_file.side_effect = lambda f, p: ProcessingResult(
+        success=True, llm_response=f"answer for {f}"
+    )
+
+    results = list(process_batch(processor, ["a.pdf", "b.pdf"], "prompt"))
+
+    assert [f for f, _ in results] == ["a.pdf", "b.pdf"]
+    assert processor.process_file.call_count == 2
+
+
+def test_process_batch_extracts_in_process_with_one_job(monkeypatch):
+    """jobs=1 starts no worker process, so no second OCR reader is loaded."""
+    monkeypatch.setattr(batch, "ProcessPoolExecutor", None)
+    querier = FakeQuerier()
+    querier.extract = FakeExtractor(MagicMock(config=None)).extract
+    files = [f"file{i}.pdf" for i in range(4)]
+
+    results = dict(process_batch(querier, files, "prompt", llm_concurrency=2))
+
+    assert sorted(results) == files
+    assert all(r.llm_response == f"answer for {f}" for f, r in results.items())
+
+
+@requires_fork
+def test_process_batch_bounds_llm_concurrency(fake_workers):
+    """No more than llm_concurrency queries run at once."""
+    querier = FakeQuerier()
+    files = [f"file{i}.pdf" for i in range(6)]
+
+    results = list(
+        process_batch(querier, files, "prompt", jobs=2, llm_concurrency=2)
+    )
+
+    assert sorted(f for f, _ in results) == sorted(files)
+    assert all(r.llm_response == f"answer for {f}" for f, r in results)
+    assert querier.max_in_flight <= 2
+
+
+@requires_fork
+def test_process_batch_keep_order(fake_workers):
+    """keep_order yields results in input order even if they finish out of order."""
+    querier = FakeQuerier(delays={"slow.pdf": 0.5, "fast.pdf": 0.0})
+    files = ["slow.pdf", "fast.pdf", "other.pdf"]
+
+    unordered = [f for f, _ in process_batch(querier, files, "p", 2, 3)]
+    ordered = [
+        f for f, _ in process_batch(querier, files, "p", 2, 3, keep_order=True)
+    ]
+
+    assert unordered[0] != "slow.pdf"
+    assert ordered == files
+
+
+@requires_fork
+def test_process_batch_reports_extraction_errors(fake_workers):
+    """Extraction failures become failed results instead of aborting the batch."""
+    querier = FakeQuerier()
+
+    results = dict(
+        process_batch(querier, ["ok.pdf", "missing.pdf"], "p", jobs=2, keep_order=True)
+    )
+
+    assert results["ok.pdf"].success
+    assert not results["missing.pdf"].success
+    assert "File not found" in results["missing.pdf"].error
+    assert results["missing.pdf"].metadata["file_name"] == "missing.pdf"
+
+
+@requires_fork
+def test_process_batch_splits_ocr_workers_between_jobs(fake_workers):
+    """Each extraction process gets its share of the OCR worker budget."""
+    from aigrok.config import AigrokConfig, ModelConfig
+
+    model = ModelConfig(provider="ollama", model_name="llama3.2:3b")
+    querier = FakeQuerier()
+    querier.config_manager = MagicMock(
+        config=AigrokConfig(text_model=model, vision_model=model, ocr_workers=4)
+    )
+
+    results = list(process_batch(querier, ["a.pdf", "b.pdf"], "p", jobs=2))
+
+    assert [r.metadata["ocr_workers"] for _, r in results] == [2, 2]
+
+
+def test_init_worker_splits_ocr_workers(monkeypatch):
+    """Extraction workers share the OCR worker budget and close their pools."""
+    from aigrok.config import AigrokConfig, ModelConfig
+
+    built = MagicMock()
+    monkeypatch.setattr(batch, "PDFProcessor", built)
+    finalizers = []
+    monkeypatch.setattr(
+        batch.multiprocessing.util,
+        "Finalize",
+        lambda obj, callback, exitpriority=None: finalizers.append(callback),
+    )
+    model = ModelConfig(provider="ollama", model_name="llama3.2:3b")
+    config = AigrokConfig(text_model=model, vision_model=model, ocr_workers=4)
+
+    batch._init_worker(config, False, 1, jobs=2)
+
+    assert built.call_args.kwargs["config_manager"].config.ocr_workers == 2
+    assert finalizers == [built.return_value.close]
@@ -0,0 +1,216 @@
+"""Tests for the extraction and LLM response caches."""
+
+import os
+import time
+from unittest.mock import patch
+import pytest
+from aigrok.cache import ExtractionCache, file_hash
+from aigrok.config import AigrokConfig, ConfigManager, ModelConfig
+from aigrok.pdf_processor import PDFProcessor
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Create a cache in a temporary directory."""
+    return ExtractionCache(tmp_path / "cache")
+
+
+@pytest.fixture
+def sample_file(tmp_path):
+    """Create a small file to hash."""
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(b"%PDF-1.4 sample content")
+    return path
+
+
+def test_key_depends_on_content_and_settings(cache, sample_file, tmp_path):
+    """Keys change with file content and settings, not with file name."""
+    key = cache.key(sample_file, {"ocr_enabled": False})
+    copy = tmp_path / "renamed.pdf"
+    copy.write_bytes(sample_file.read_bytes())
+
+    assert cache.key(copy, {"ocr_enabled": False}) == key
+    assert cache.key(sample_file, {"ocr_enabled": True}) != key
+
+    sample_file.write_bytes(b"%PDF-1.4 other content")
+    assert cache.key(sample_file, {"ocr_enabled": False}) != key
+    assert file_hash(sample_file) != file_hash(copy)
+
+
+def test_put_and_get(cache):
+    """Stored entries round-trip; unknown keys miss."""
+    entry = {"text": "hello", "metadata": {"page_count": 1}, "ocr_confidence": 0.9}
+    cache.put("abc", entry)
+
+    assert cache.get("abc") == entry
+    assert cache.get("missing") is None
+
+
+def test_unreadable_entry_is_a_miss(cache):
+    """Corrupt entries are ignored rather than raising."""
+    cache.directory.mkdir(parents=True)
+    (cache.directory / "bad.json").write_text("{not json")
+
+    assert cache.get("bad") is None
+
+
+def test_lru_eviction(tmp_path):
+    """The least recently used entries are evicted once over the size limit."""
+    cache = ExtractionCache(tmp_path / "cache", max_size_bytes=2500)
+    payload = {"text": "x" * 1000}
+    cache.put("first", payload)
+    cache.put("second", payload)
+
+    # Make "first" the most recently used entry
+    old = time.time() - 60
+    os.utime(cache.directory / "second.json", (old, old))
+    os.utime(cache.directory / "first.json", (old - 60, old - 60))
+    cache.get("first")
+
+    cache.put("third", payload)
+
+    assert cache.get("first") is not None
+    assert cache.get("second") is None
+    assert cache.get("third") is not None
+
+
+@pytest.fixture
+def processor():
+    """Create a PDFProcessor with OCR disabled and caching enabled."""
+    config_manager = ConfigManager()
+    config_manager.config = AigrokConfig(
+        text_model=ModelConfig(
+            provider="ollama", model_name="llama3.2:3b", endpoint="http://localhost:11434"
+        ),
+        vision_model=ModelConfig(
+            provider="ollama",
+            model_name="llama3.2-vision:11b",
+            endpoint="http://localhost:11434",
+        ),
+    )
+    return PDFProcessor(config_manager=config_manager)
+
+
+def test_processor_reuses_cached_extraction(processor, tmp_path, isolated_cache_dir):
+    """A second extract() of the same content skips extraction."""
+    from .test_extraction import build_pdf
+
+    pdf_path = tmp_path / "doc.pdf"
+    doc = build_pdf(2)
+    doc.save(pdf_path)
+    doc.close()
+
+    first = processor.extract(pdf_path)
+    with patch.object(processor, "_extract_document") as mock_extract:
+        second = processor.extract(pdf_path)
+
+    mock_extract.assert_not_called()
+    assert second.text == first.text
+    assert second.page_count == 2
+    assert second.metadata["file_name"] == "doc.pdf"
+    assert processor.cache.directory.parent == isolated_cache_dir
+
+
+def test_processor_without_cache(processor, tmp_path):
+    """Disabling the cache extracts every time."""
+    from .test_extraction import build_pdf
+
+    processor.cache = None
+    pdf_path = tmp_path / "doc.pdf"
+    doc = build_pdf(1)
+    doc.save(pdf_path)
+    doc.close()
+
+    processor.extract(pdf_path)
+    with patch.object(
+        processor, "_extract_document", wraps=processor._extract_document
+    ) as mock_extract:
+        processor.extract(pdf_path)
+
+    mock_extract.assert_called_once()
+
+
+def test_response_cache_key_normalizes_prompt():
+    """Whitespace and case differences in the prompt share a key."""
+    from PIL import Image
+    from aigrok.cache import ResponseCache
+
+    key = ResponseCache.key("ollama", "llama3.2:3b", "What is the  Total?", "ctx")
+
+    assert ResponseCache.key("ollama", "llama3.2:3b", " what is the total? ", "ctx") == key
+    assert ResponseCache.key("ollama", "llama3.2:3b", "What is the total?", "other") != key
+    assert ResponseCache.key("openai", "llama3.2:3b", "What is the total?", "ctx") != key
+
+    red = Image.new("RGB", (4, 4), color="red")
+    blue = Image.new("RGB", (4, 4), color="blue")
+    assert ResponseCache.key("ollama", "m", "p", "", [(red, 0)]) != ResponseCache.key(
+        "ollama", "m", "p", "", [(blue, 0)]
+    )
+
+
+def test_response_cache_hit_miss_and_ttl(tmp_path):
+    """Entries are served until they expire, and hits/misses are counted."""
+    from aigrok.cache import ResponseCache
+
+    cache = ResponseCache(tmp_path, ttl_seconds=60)
+    assert cache.get("k") is None
+    cache.put("k", "answer")
+    assert cache.get("k") == "answer"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    with patch("aigrok.cache.time.time", return_value=time.time() + 120):
+        assert cache.get("k") is None
+    cache.close()
+
+
+def test_response_cache_max_entries(tmp_path):
+    """Only the most recently used max_entries survive eviction."""
+    from aigrok.cache import ResponseCache
+
+    cache = ResponseCache(tmp_path, max_entries=2)
+    now = time.time()
+    with patch("aigrok.cache.time.time", side_effect=[now + i for i in range(4)]):
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")  # "b" is now least recently used
+        cache.put("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+    cache.close()
+
+
+def test_processor_response_cache(processor, tmp_path):
+    """Repeated queries hit the response cache and record counters."""
+    from aigrok.cache import ResponseCache
+    from aigrok.pdf_processor import DocumentContent
+
+    processor.response_cache = ResponseCache(tmp_path)
+    content = DocumentContent(text="Invoice total: 42", page_count=1, metadata={})
+
+    with patch.object(processor, "_call_llm", return_value="42") as mock_call:
+        first = processor.query(content, "What is the total?")
+        second = processor.query(content, "what is the total?")
+
+    assert mock_call.call_count == 1
+    assert second.llm_response == first.llm_response == "42"
+    assert first.metadata == {"llm_cache_hits": 0, "llm_cache_misses": 1}
+    assert second.metadata == {"llm_cache_hits": 1, "llm_cache_misses": 0}
+
+
+def test_processor_response_cache_skips_errors(processor, tmp_path):
+    """Error responses are not cached."""
+    from aigrok.cache import ResponseCache
+    from aigrok.pdf_processor import DocumentContent
+
+    processor.response_cache = ResponseCache(tmp_path)
+    content = DocumentContent(text="text", page_count=1, metadata={})
+
+    with patch.object(
+        processor, "_call_llm", return_value="Error: Request timed out."
+    ) as mock_call:
+        processor.query(content, "prompt")
+        processor.query(content, "prompt")
+
+    assert mock_call.call_count == 2
@@ -0,0 +1,45 @@
+"""Tests for token-aware chunking."""
+
+from aigrok.chunking import estimate_tokens, split_text
+
+
+def test_estimate_tokens():
+    """Tokens are estimated at four characters each, rounded up."""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+
+def test_small_pages_are_packed_together():
+    """Pages that fit the budget together share a chunk and stay whole."""
+    pages = ["a" * 40, "b" * 40, "c" * 40]  # 10 tokens each
+
+    chunks = split_text(pages, max_tokens=25)
+
+    assert chunks == ["a" * 40 + "\n" + "b" * 40, "c" * 40]
+
+
+def test_large_page_splits_on_paragraphs():
+    """A page over budget is split between paragraphs, not inside them."""
+    paragraphs = ["x" * 60, "y" * 60, "z" * 60]  # 15 tokens each
+
+    chunks = split_text(["\n\n".join(paragraphs)], max_tokens=20)
+
+    assert chunks == paragraphs
+
+
+def test_oversized_paragraph_falls_back_to_words():
+    """A single paragraph over budget is split on words, then characters."""
+    words = ["word"] * 50
+    chunks = split_text([" ".join(words)], max_tokens=10)
+
+    assert all(estimate_tokens(c) <= 10 for c in chunks)
+    assert " ".join(chunks).split() == words
+
+    chunks = split_text(["q" * 100], max_tokens=10)
+    assert chunks == ["q" * 40, "q" * 40, "q" * 20]
+
+
+def test_blank_pages_are_dropped():
+    """Blank pages produce no chunks."""
+    assert split_text(["", "  \n", "text"], max_tokens=10) == ["text"]
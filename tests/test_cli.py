@@ -17,6 +17,7 @@ from io import StringIO
 import io
 import contextlib
 from aigrok.pdf_processor import PDFProcessor, PDFProcessingResult
+from aigrok.config import AigrokConfig, ModelConfig
 
 
 def test_format_output_single_file():
@@ -213,6 +214,13 @@ def test_create_parser():
         parser.parse_args([])
 
 
+def test_create_parser_workers():
+    """Test the --workers option."""
+    parser = create_parser()
+    assert parser.parse_args(["prompt", "file1.pdf"]).workers == 1
+    assert parser.parse_args(["--workers", "8", "prompt", "file1.pdf"]).workers == 8
+
+
 def test_process_single_file(mock_pdf_processor, sample_pdf):
     """Test processing a single PDF file."""
     result = process_single_file(sample_pdf, "Analyze this")
@@ -416,6 +424,27 @@ class TestCLI:
         args.format = "text"
         args.output = None
         args.verbose = False
+        args.jobs = 1
+        args.llm_concurrency = 1
+        args.keep_order = False
+        args.no_cache = False
+        args.cache_dir = None
+        args.llm_cache = False
+        args.top_k = None
+        args.ocr_batch_size = None
+        args.ocr_workers = None
+        args.render_pages = None
+        args.render_dpi = None
+        args.index = None
+        args.query = None
+        args.index_path = None
+        args.no_daemon = False
+        args.socket = None
+        args.stream = False
+        args.easyocr = False
+        args.ocr_languages = "en"
+        args.ocr_fallback = False
+        args.workers = 1
         return args
 
     def test_immediate_output(self, mock_processor, mock_args):
@@ -551,3 +580,207 @@ class TestCLI:
         md_output = format_output(results, format_type="markdown", show_filenames=True)
         assert "# test1.pdf" in md_output
         assert "## LLM Response" in md_output
+
+
+def test_process_files_dispatches_to_daemon(tmp_path):
+    """A running daemon handles the files instead of a local processor."""
+    pdf = tmp_path / "test.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+    args = MagicMock(
+        files=[str(pdf)],
+        prompt="prompt",
+        format="text",
+        output=None,
+        verbose=False,
+        jobs=1,
+        llm_concurrency=1,
+        keep_order=False,
+        no_cache=False,
+        cache_dir=None,
+        llm_cache=False,
+        top_k=None,
+        ocr_batch_size=None,
+        ocr_workers=None,
+        render_pages=None,
+        render_dpi=None,
+        index=None,
+        query=None,
+        index_path=None,
+        no_daemon=False,
+        socket=None,
+        stream=False,
+        easyocr=False,
+        ocr_languages="en",
+        ocr_fallback=False,
+        workers=1,
+    )
+    result = ProcessingResult(
+        success=True, llm_response="warm", metadata={"file_name": "test.pdf"}
+    )
+
+    with (
+        patch("aigrok.cli.DaemonClient") as mock_client,
+        patch("aigrok.cli.PDFProcessor") as mock_processor,
+        io.StringIO() as buf,
+        contextlib.redirect_stdout(buf),
+    ):
+        mock_client.return_value.is_running.return_value = True
+        mock_client.return_value.process_many.return_value = iter([(str(pdf), result)])
+        process_files(args)
+        output = buf.getvalue()
+
+    assert output.strip() == "test.pdf:warm"
+    mock_processor.assert_not_called()
+
+    # Per-run overrides need a local processor
+    args.no_cache = True
+    with (
+        patch("aigrok.cli.DaemonClient") as mock_client,
+        patch("aigrok.cli.process_batch", return_value=iter([])),
+        patch("aigrok.cli.PDFProcessor") as mock_processor,
+    ):
+        process_files(args)
+
+    mock_client.assert_not_called()
+    mock_processor.assert_called_once()
+
+
+def test_stream_files_prints_tokens(capsys):
+    """Streamed tokens are printed on one line behind the file name."""
+    from aigrok.cli import stream_files
+
+    def process_file(file_path, prompt, on_token=None):
+        if file_path == "empty.pdf":
+            return ProcessingResult(success=False, error="failed")
+        if file_path == "cached.pdf":
+            return ProcessingResult(success=True, llm_response="whole")
+        for token in ["4", "2"]:
+            on_token(token)
+        return ProcessingResult(success=True, llm_response="42")
+
+    processor = MagicMock()
+    processor.process_file.side_effect = process_file
+
+    files = ["dir/a.pdf", "empty.pdf", "cached.pdf"]
+    results = list(stream_files(processor, files, "Total?"))
+
+    assert [f for f, _ in results] == files
+    assert capsys.readouterr().out == "a.pdf:42\ncached.pdf:whole\n"
+
+
+def test_write_pages_emits_each_page_immediately():
+    """Each page is written and flushed before the next one is extracted."""
+    import json
+    from aigrok.cli import write_pages
+    from aigrok.pdf_processor import PageContent
+
+    out = io.StringIO()
+    written = []
+
+    def iter_pages(file_path):
+        for number in (1, 2):
+            written.append(out.getvalue().count("\n"))
+            yield PageContent(page=number, page_count=2, text=f"text {number}")
+
+    processor = MagicMock()
+    processor.iter_pages.side_effect = iter_pages
+
+    write_pages(processor, ["dir/doc.pdf"], out)
+
+    assert written == [0, 1]
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert records[1] == {
+        "file_name": "doc.pdf",
+        "page": 2,
+        "page_count": 2,
+        "text": "text 2",
+        "ocr_text": None,
+        "ocr_confidence": 0.0,
+        "metadata": {},
+    }
+
+
+@pytest.fixture
+def ocr_config_manager():
+    """ConfigManager stub holding a config with OCR disabled."""
+    config = AigrokConfig(
+        text_model=ModelConfig(provider="ollama", model_name="llama3.2:3b"),
+        vision_model=ModelConfig(provider="ollama", model_name="llava:7b"),
+    )
+    return MagicMock(config=config)
+
+
+def test_pages_applies_easyocr(tmp_path, ocr_config_manager):
+    """--pages builds its processor with the OCR options of the command line."""
+    from aigrok.cli import run_pages
+
+    pdf = tmp_path / "scan.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+    args = create_parser().parse_args(
+        ["--pages", str(pdf), "--easyocr", "--ocr-languages", "en,fr"]
+    )
+
+    with (
+        patch("aigrok.cli.ConfigManager", return_value=ocr_config_manager),
+        patch("aigrok.cli.PDFProcessor") as mock_processor,
+        io.StringIO() as buf,
+        contextlib.redirect_stdout(buf),
+    ):
+        mock_processor.return_value.iter_pages.return_value = iter([])
+        assert run_pages(args) == 0
+
+    config = mock_processor.call_args.kwargs["config_manager"].config
+    assert config.ocr_enabled
+    assert config.ocr_languages == ["en", "fr"]
+
+
+def test_index_applies_easyocr(tmp_path, ocr_config_manager):
+    """--index extracts scanned PDFs with the OCR options of the command line."""
+    from aigrok.cli import run_corpus
+
+    args = create_parser().parse_args(["--index", str(tmp_path), "--easyocr"])
+
+    with (
+        patch("aigrok.cli.ConfigManager", return_value=ocr_config_manager),
+        patch("aigrok.cli.PDFProcessor") as mock_processor,
+        patch("aigrok.cli.CorpusIndex") as mock_index,
+        io.StringIO() as buf,
+        contextlib.redirect_stdout(buf),
+    ):
+        mock_index.return_value.update.return_value = {"added": 0}
+        assert run_corpus(args) == 0
+
+    assert mock_processor.call_args.kwargs["config_manager"].config.ocr_enabled
+    mock_index.return_value.update.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "flags, expected",
+    [
+        (["--easyocr"], {"ocr_enabled": True}),
+        (["--ocr-languages", "de"], {"ocr_languages": ["de"]}),
+        (["--workers", "4"], {}),
+    ],
+)
+def test_ocr_and_worker_flags_bypass_daemon(
+    tmp_path, ocr_config_manager, flags, expected
+):
+    """The daemon keeps its startup config, so these flags run in-process."""
+    pdf = tmp_path / "scan.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+    args = create_parser().parse_args(["prompt", str(pdf), *flags])
+
+    with (
+        patch("aigrok.cli.DaemonClient") as mock_client,
+        patch("aigrok.cli.ConfigManager", return_value=ocr_config_manager),
+        patch("aigrok.cli.process_batch", return_value=iter([])),
+        patch("aigrok.cli.PDFProcessor") as mock_processor,
+    ):
+        mock_client.return_value.is_running.return_value = True
+        process_files(args)
+
+    mock_client.return_value.process_many.assert_not_called()
+    kwargs = mock_processor.call_args.kwargs
+    assert kwargs["workers"] == args.workers
+    for name, value in expected.items():
+        assert getattr(kwargs["config_manager"].config, name) == value
@@ -0,0 +1,81 @@
+"""Tests for the shared provider connection pools."""
+
+import pytest
+from aigrok import clients
+from aigrok.clients import (
+    PoolSettings,
+    close_clients,
+    configure_litellm,
+    http_client,
+)
+from aigrok.config import AigrokConfig, ConfigManager, ModelConfig
+from aigrok.pdf_processor import PDFProcessor
+
+
+@pytest.fixture(autouse=True)
+def fresh_clients():
+    """Start every test with no shared clients."""
+    clients.close_clients()
+    yield
+    clients.close_clients()
+
+
+def make_processor(endpoint="http://localhost:11434", **settings):
+    config_manager = ConfigManager()
+    model = {"provider": "ollama", "endpoint": endpoint}
+    config_manager.config = AigrokConfig(
+        text_model=ModelConfig(model_name="llama3.2:3b", **model),
+        vision_model=ModelConfig(model_name="llama3.2-vision:11b", **model),
+        **settings,
+    )
+    return PDFProcessor(config_manager=config_manager)
+
+
+def test_processors_share_one_client_per_endpoint():
+    first = make_processor()
+    second = make_processor()
+    other = make_processor("http://gpu-box:11434")
+
+    assert first.llm is second.llm
+    assert other.llm is not first.llm
+    assert str(other.llm._client.base_url).startswith("http://gpu-box:11434")
+
+
+def test_pool_settings_come_from_config():
+    processor = make_processor(
+        http_timeout=30, http_max_connections=8, http_max_keepalive_connections=4
+    )
+    pool = processor.llm._client._transport._pool
+
+    assert processor.pool_settings.timeout == 30
+    assert processor.llm._client.timeout.read == 30
+    assert processor.llm._client.timeout.connect == 10
+    assert (pool._max_connections, pool._max_keepalive_connections) == (8, 4)
+    # Different limits get their own pool
+    assert processor.llm is not make_processor().llm
+
+
+def test_http2_is_enabled_only_when_supported(monkeypatch):
+    settings = PoolSettings(http2=True)
+    monkeypatch.setattr(clients, "http2_available", lambda: False)
+    assert clients._client_kwargs(settings)["http2"] is False
+    monkeypatch.setattr(clients, "http2_available", lambda: True)
+    assert clients._client_kwargs(settings)["http2"] is True
+    assert clients._client_kwargs(PoolSettings(http2=False))["http2"] is False
+
+
+def test_configure_litellm_uses_shared_session():
+    import litellm
+
+    previous = litellm.client_session
+    try:
+        configure_litellm()
+        session = litellm.client_session
+        assert session is http_client()
+
+        close_clients()
+        assert session.is_closed
+        assert litellm.client_session is None
+        assert http_client() is not session
+    finally:
+        litellm.client_session = previous
@@ -0,0 +1,106 @@
+"""Tests for the corpus search index."""
+
+import os
+from unittest.mock import patch
+import fitz
+import pytest
+from aigrok.config import AigrokConfig, ConfigManager, ModelConfig
+from aigrok.corpus import CorpusIndex, query_corpus
+from aigrok.pdf_processor import PDFProcessor
+
+
+def write_pdf(path, pages):
+    """Write a PDF with one line of text per page."""
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(path)
+    doc.close()
+
+
+@pytest.fixture
+def processor():
+    """Create a PDFProcessor with OCR disabled."""
+    config_manager = ConfigManager()
+    config_manager.config = AigrokConfig(
+        text_model=ModelConfig(
+            provider="ollama", model_name="llama3.2:3b", endpoint="http://localhost:11434"
+        ),
+        vision_model=ModelConfig(
+            provider="ollama",
+            model_name="llama3.2-vision:11b",
+            endpoint="http://localhost:11434",
+        ),
+    )
+    return PDFProcessor(config_manager=config_manager)
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    """Create a directory of PDFs."""
+    directory = tmp_path / "docs"
+    (directory / "nested").mkdir(parents=True)
+    write_pdf(directory / "report.pdf", ["Annual revenue grew", "Staff headcount"])
+    write_pdf(directory / "nested" / "minutes.pdf", ["Board meeting minutes"])
+    (directory / "notes.txt").write_text("not a pdf")
+    return directory
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = CorpusIndex(tmp_path / "corpus.sqlite")
+    yield index
+    index.close()
+
+
+def test_update_is_incremental(index, processor, corpus):
+    """Only new, changed and deleted files touch the index."""
+    assert index.update(corpus, processor) == {
+        "added": 2,
+        "updated": 0,
+        "unchanged": 0,
+        "removed": 0,
+        "failed": 0,
+    }
+
+    # Touched but identical files are recognized by hash and not re-extracted
+    os.utime(corpus / "report.pdf", (1, 1))
+    with patch.object(processor, "extract") as mock_extract:
+        stats = index.update(corpus, processor)
+    mock_extract.assert_not_called()
+    assert stats["unchanged"] == 2
+
+    write_pdf(corpus / "report.pdf", ["Quarterly revenue fell"])
+    (corpus / "nested" / "minutes.pdf").unlink()
+    stats = index.update(corpus, processor)
+
+    assert (stats["updated"], stats["removed"]) == (1, 1)
+    assert [d["metadata"]["file_name"] for d in index.documents()] == ["report.pdf"]
+    assert index.search("annual") == []
+    assert index.search("quarterly")[0].text == "Quarterly revenue fell"
+
+
+def test_search_returns_located_chunks(index, processor, corpus):
+    index.update(corpus, processor)
+
+    hits = index.search("What about revenue and the board?")
+
+    assert {(os.path.basename(h.path), h.page) for h in hits} == {
+        ("report.pdf", 1),
+        ("minutes.pdf", 1),
+    }
+    assert all(h.offset == 0 and h.score > 0 for h in hits)
+    assert index.search("revenue", k=1)[0].page == 1
+
+
+def test_query_corpus_sends_matching_chunks(index, processor, corpus):
+    index.update(corpus, processor)
+
+    with patch.object(processor, "_call_llm", return_value="answer") as mock_call:
+        result = query_corpus(processor, index, "staff headcount")
+
+    assert result.llm_response == "answer"
+    assert mock_call.call_args.args[1] == "[report.pdf, page 2]\nStaff headcount"
+    assert result.metadata["sources"][0]["page"] == 2
+
+    assert not query_corpus(processor, index, "unrelated").success
@@ -0,0 +1,118 @@
+"""Tests for the warm worker daemon."""
+
+import threading
+import time
+import pytest
+from aigrok.daemon import DaemonClient, DaemonServer, default_socket_path
+from aigrok.pdf_processor import DocumentContent
+from aigrok.types import ProcessingResult
+
+
+class FakeProcessor:
+    """Stand-in for the daemon's warm PDFProcessor."""
+
+    def __init__(self):
+        self.extracted = []
+
+    def extract(self, file_path):
+        if file_path.endswith("missing.pdf"):
+            raise ValueError(f"File not found: {file_path}")
+        self.extracted.append(file_path)
+        return DocumentContent(
+            text=f"text of {file_path}", page_count=1, metadata={"file_name": file_path}
+        )
+
+    def query(self, content, prompt):
+        if "slow" in content.metadata["file_name"]:
+            time.sleep(0.3)
+        return ProcessingResult(
+            success=True,
+            text=content.text,
+            llm_response=f"{prompt}: {content.metadata['file_name']}",
+            metadata=content.metadata,
+        )
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    """Run a daemon with a fake processor on a temporary socket."""
+    processor = FakeProcessor()
+    server = DaemonServer(tmp_path / "daemon.sock", processor)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_default_socket_path(monkeypatch, isolated_cache_dir):
+    """The socket lives in the cache directory unless AIGROK_SOCKET is set."""
+    monkeypatch.delenv("AIGROK_SOCKET", raising=False)
+    assert default_socket_path() == isolated_cache_dir / "daemon.sock"
+
+    monkeypatch.setenv("AIGROK_SOCKET", "/tmp/other.sock")
+    assert str(default_socket_path()) == "/tmp/other.sock"
+
+
+def test_client_detects_daemon(daemon, tmp_path):
+    """is_running() is True only while a daemon answers."""
+    assert DaemonClient(daemon.socket_path).is_running()
+    assert not DaemonClient(tmp_path / "none.sock").is_running()
+
+
+def test_process_file_uses_warm_processor(daemon, tmp_path):
+    """Requests are served by the daemon's processor with absolute paths."""
+    client = DaemonClient(daemon.socket_path)
+    result = client.process_file(tmp_path / "a.pdf", "summarize")
+
+    assert result.success
+    assert result.llm_response == f"summarize: {tmp_path / 'a.pdf'}"
+    assert daemon.processor.extracted == [str(tmp_path / "a.pdf")]
+
+
+def test_process_file_reports_errors(daemon, tmp_path):
+    """Extraction errors come back as failed results."""
+    result = DaemonClient(daemon.socket_path).process_file(tmp_path / "missing.pdf")
+
+    assert not result.success
+    assert "File not found" in result.error
+
+
+def test_process_file_without_daemon(tmp_path):
+    """An unreachable daemon produces a failed result instead of raising."""
+    result = DaemonClient(tmp_path / "none.sock").process_file("a.pdf", "p")
+
+    assert not result.success
+    assert result.metadata["file_name"] == "a.pdf"
+
+
+def test_process_many_keep_order(daemon, tmp_path):
+    """Concurrent requests can be yielded in input order."""
+    client = DaemonClient(daemon.socket_path)
+    files = [tmp_path / "slow.pdf", tmp_path / "fast.pdf"]
+
+    unordered = [f for f, _ in client.process_many(files, "p", concurrency=2)]
+    ordered = [
+        f for f, _ in client.process_many(files, "p", concurrency=2, keep_order=True)
+    ]
+
+    assert unordered == files[::-1]
+    assert ordered == files
+
+
+def test_stale_socket_is_replaced(tmp_path):
+    """A socket file left by a dead daemon does not block startup."""
+    path = tmp_path / "daemon.sock"
+    path.write_text("")
+
+    server = DaemonServer(path, FakeProcessor())
+    server.server_close()
+
+    assert not path.exists()
+
+
+def test_second_daemon_refuses_to_start(daemon):
+    """Only one daemon can listen on a socket."""
+    with pytest.raises(RuntimeError, match="already running"):
+        DaemonServer(daemon.socket_path, FakeProcessor())
@@ -0,0 +1,178 @@
+"""Tests for the single-pass extraction engine."""
+
+from io import BytesIO
+from unittest.mock import MagicMock
+import fitz  # PyMuPDF
+import pytest
+from PIL import Image
+from aigrok.extraction import (
+    extract_document,
+    extract_document_parallel,
+    load_images,
+    page_ranges,
+    pages_to_ocr,
+    pages_to_render,
+)
+
+
+def _png_bytes(color="red", size=(40, 20)) -> bytes:
+    """Encode a solid-color PNG."""
+    buffered = BytesIO()
+    Image.new("RGB", size, color=color).save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+def build_pdf(pages: int, shared_image: bool = True, unique_images: bool = False):
+    """Build an in-memory PDF with text and images on every page."""
+    doc = fitz.open()
+    shared_xref = 0
+    for page_num in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {page_num + 1} text")
+        if shared_image:
+            if shared_xref:
+                page.insert_image(fitz.Rect(0, 100, 40, 120), xref=shared_xref)
+            else:
+                shared_xref = page.insert_image(
+                    fitz.Rect(0, 100, 40, 120), stream=_png_bytes()
+                )
+        if unique_images:
+            color = (page_num * 7 % 256, 0, 0)
+            page.insert_image(
+                fitz.Rect(0, 200, 40, 220), stream=_png_bytes(color=color)
+            )
+    return doc
+
+
+@pytest.fixture
+def shared_image_pdf():
+    """Three-page PDF referencing one shared image from every page."""
+    doc = build_pdf(3)
+    yield doc
+    doc.close()
+
+
+def test_extract_document_pages(shared_image_pdf):
+    """Every page produces a record with its text and image references."""
+    extraction = extract_document(shared_image_pdf)
+
+    assert extraction.page_count == 3
+    assert [p.page_num for p in extraction.pages] == [0, 1, 2]
+    assert "Page 2 text" in extraction.pages[1].text
+    assert len(extraction.text_pages) == 3
+    assert all(len(p.image_xrefs) == 1 for p in extraction.pages)
+
+
+def test_extract_document_dedupes_shared_images(shared_image_pdf):
+    """A shared xref is recorded once with every page that references it."""
+    extraction = extract_document(shared_image_pdf)
+
+    assert len(extraction.images) == 1
+    info = next(iter(extraction.images.values()))
+    assert info.pages == [0, 1, 2]
+    assert info.first_page == 0
+    assert (info.width, info.height) == (40, 20)
+
+
+def test_load_images_decodes_each_xref_once(shared_image_pdf):
+    """Shared images are decoded once and attributed to their first page."""
+    extraction = extract_document(shared_image_pdf)
+    doc = MagicMock(wraps=shared_image_pdf)
+
+    images = load_images(doc, extraction)
+
+    assert len(images) == 1
+    assert images[0][1] == 0
+    assert images[0][0].size == (40, 20)
+    assert doc.extract_image.call_count == 1
+
+
+def test_load_images_skips_undecodable(shared_image_pdf):
+    """Images that fail to decode are skipped rather than raising."""
+    extraction = extract_document(shared_image_pdf)
+    doc = MagicMock()
+    doc.extract_image.return_value = {"image": b"not an image"}
+
+    assert load_images(doc, extraction) == []
+
+
+def test_page_ranges():
+    """Page ranges are contiguous, ordered and cover every page."""
+    assert page_ranges(10, 3) == [(0, 4), (4, 7), (7, 10)]
+    assert page_ranges(2, 8) == [(0, 1), (1, 2)]
+    assert page_ranges(5, 1) == [(0, 5)]
+
+
+def test_extract_document_parallel_matches_serial(tmp_path):
+    """Parallel extraction merges worker results back in page order."""
+    pdf_path = tmp_path / "parallel.pdf"
+    doc = build_pdf(9, unique_images=True)
+    doc.save(pdf_path)
+    serial = extract_document(doc)
+
+    parallel = extract_document_parallel(pdf_path, len(doc), 3)
+
+    assert [p.page_num for p in parallel.pages] == list(range(9))
+    assert [p.text for p in parallel.pages] == [p.text for p in serial.pages]
+    assert list(parallel.images) == list(serial.images)
+    for xref, info in serial.images.items():
+        assert parallel.images[xref].pages == info.pages
+        assert parallel.images[xref].data is not None
+    assert len(load_images(doc, parallel)) == len(serial.images)
+    doc.close()
+
+
+def test_pages_to_render_auto():
+    """Textless pages with many or tiny images, or only drawings, are rendered."""
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Text page with icons")  # 0: has text
+    scan = doc.new_page()  # 1: one large scan
+    scan.insert_image(fitz.Rect(0, 0, 300, 400), stream=_png_bytes(size=(600, 800)))
+    icons = doc.new_page()  # 2: many small images
+    for i in range(5):
+        icons.insert_image(
+            fitz.Rect(i * 50, 0, i * 50 + 40, 20), stream=_png_bytes(color=(i, 0, 0))
+        )
+    doc.new_page().draw_rect(fitz.Rect(50, 50, 200, 200))  # 3: vector drawing
+    doc.new_page()  # 4: blank
+    extraction = extract_document(doc)
+
+    assert pages_to_render(doc, extraction) == [2, 3]
+    assert pages_to_render(doc, extraction, "always") == [0, 1, 2, 3, 4]
+    assert pages_to_render(doc, extraction, "never") == []
+    with pytest.raises(ValueError):
+        pages_to_render(doc, extraction, "sometimes")
+
+    images = load_images(doc, extraction, [2, 3], dpi=72)
+
+    # The scan is decoded; the icons are replaced by one raster of their page
+    assert [page for _, page in images] == [1, 2, 3]
+    assert images[0][0].size == (600, 800)
+    assert images[1][0].size == (595, 842)  # A4 at 72 DPI
+    doc.close()
+
+
+def test_pages_to_ocr_auto():
+    """Only pages whose content is not already in their text layer are OCR'd."""
+    text = "Quarterly revenue grew in every region we operate in. " * 3
+    doc = fitz.open()
+    logo = doc.new_page()  # 0: text with a logo beside it
+    logo.insert_text((72, 200), text)
+    logo.insert_image(fitz.Rect(20, 20, 120, 70), stream=_png_bytes(size=(200, 100)))
+    scan = doc.new_page()  # 1: scan without a text layer
+    scan.insert_image(scan.rect, stream=_png_bytes(size=(600, 800)))
+    ocred = doc.new_page()  # 2: scan under a text layer covering the page
+    ocred.insert_image(ocred.rect, stream=_png_bytes(size=(600, 800)))
+    ocred.insert_text((72, 200), text)
+    icon = doc.new_page()  # 3: no text, but the image is too small to read
+    icon.insert_image(fitz.Rect(20, 20, 36, 36), stream=_png_bytes(size=(16, 16)))
+    doc.new_page().insert_text((72, 72), "Short")  # 4: no images
+    extraction = extract_document(doc)
+
+    assert pages_to_ocr(doc, extraction) == [1, 2]
+    assert pages_to_ocr(doc, extraction, max_image_coverage=1.0) == [1]
+    assert pages_to_ocr(doc, extraction, rendered_pages=[4]) == [1, 2, 4]
+    assert pages_to_ocr(doc, extraction, mode="always") == [0, 1, 2, 3]
+    with pytest.raises(ValueError):
+        pages_to_ocr(doc, extraction, mode="never")
+    doc.close()
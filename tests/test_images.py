@@ -0,0 +1,108 @@
+"""Tests for vision image encoding."""
+
+from io import BytesIO
+from PIL import Image
+import numpy as np
+import pytest
+from aigrok.images import ImageBudget, PageImage, encode_image
+
+
+def open_jpeg(size, mode="RGB"):
+    """Wrap a JPEG stream the way extraction does."""
+    buffered = BytesIO()
+    Image.new(mode, size, color="white").save(buffered, format="JPEG")
+    data = buffered.getvalue()
+    return PageImage(data), data
+
+
+def test_small_jpeg_is_passed_through():
+    image, data = open_jpeg((800, 600))
+
+    assert encode_image(image, ImageBudget(format="webp")) == (data, "image/jpeg")
+
+
+def test_large_image_is_downscaled_and_reencoded():
+    image, data = open_jpeg((4000, 3000))
+
+    encoded, mime = encode_image(image, ImageBudget(max_px=1000, format="webp"))
+
+    assert mime == "image/webp"
+    assert encoded != data
+    assert Image.open(BytesIO(encoded)).size == (1000, 750)
+
+
+def test_grayscale_and_edited_images_are_reencoded():
+    image, data = open_jpeg((100, 100))
+
+    encoded, mime = encode_image(image, ImageBudget(grayscale=True))
+    assert mime == "image/jpeg"
+    assert Image.open(BytesIO(encoded)).mode == "L"
+
+    # Decoded PIL images are always re-encoded
+    rgba = image.image.convert("RGBA")
+    encoded, mime = encode_image(rgba, ImageBudget(format="png"))
+    assert mime == "image/png"
+    assert Image.open(BytesIO(encoded)).size == (100, 100)
+
+
+def test_page_image_decodes_lazily_and_shares_pixels():
+    """Header fields need no decode; pixels are decoded once and released."""
+    image, data = open_jpeg((64, 32))
+
+    assert (image.size, image.mode, image.format) == ((64, 32), "RGB", "JPEG")
+    assert image._pixels is None
+
+    pixels = np.asarray(image)
+    assert pixels.shape == (32, 64, 3)
+    assert np.asarray(image) is pixels
+    assert image._image is None  # The array is the only decoded copy
+
+    image.release()
+    assert image._pixels is None
+    assert np.asarray(image).shape == (32, 64, 3)
+
+
+def test_page_image_pickles_only_encoded_bytes():
+    import pickle
+
+    image, data = open_jpeg((64, 32))
+    np.asarray(image)
+
+    restored = pickle.loads(pickle.dumps(image))
+
+    assert restored.data == data
+    assert restored._pixels is None and restored._image is None
+    assert restored.size == (64, 32)
+
+    rendered = PageImage(image=Image.new("RGB", (8, 8)))
+    assert pickle.loads(pickle.dumps(rendered)).image.size == (8, 8)
+    with pytest.raises(ValueError):
+        PageImage()
+
+
+@pytest.mark.parametrize("mode", ["CMYK", "P"])
+def test_colours_survive_ocr_then_vision(mode):
+    """Pixels kept by OCR are encoded for vision without a colour shift."""
+    red = Image.new("RGB", (32, 32), color=(255, 0, 0))
+    buffered = BytesIO()
+    if mode == "CMYK":
+        red.convert("CMYK").save(buffered, format="JPEG", quality=100)
+    else:
+        red.convert("P").save(buffered, format="PNG")
+    image = PageImage(buffered.getvalue())
+
+    np.asarray(image)  # OCR decodes and keeps the pixels for vision
+    data, _ = encode_image(image, ImageBudget(format="png"))
+
+    r, g, b = Image.open(BytesIO(data)).convert("RGB").getpixel((16, 16))
+    assert r > 240 and g < 15 and b < 15
+
+
+def test_cmyk_jpeg_is_converted_to_rgb():
+    image, _ = open_jpeg((64, 32), "CMYK")
+
+    data, mime = encode_image(image, ImageBudget())
+
+    assert mime == "image/jpeg"
+    assert data != image.data
+    assert Image.open(BytesIO(data)).mode == "RGB"
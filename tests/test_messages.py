@@ -0,0 +1,37 @@
+"""Tests for provider-specific chat payloads."""
+
+import base64
+from aigrok.messages import data_url, text_messages, vision_messages
+
+IMAGES = [(b"\xff\xd8jpeg-one", "image/jpeg"), (b"webp-two", "image/webp")]
+
+
+def test_ollama_images_go_in_the_images_field():
+    messages = vision_messages("ollama", "What is shown?", IMAGES)
+
+    assert len(messages) == 1
+    assert messages[0]["images"] == [b"\xff\xd8jpeg-one", b"webp-two"]
+    assert "Question: What is shown?" in messages[0]["content"]
+    assert "base64" not in messages[0]["content"]
+
+
+def test_openai_images_are_content_parts():
+    messages = vision_messages("openai", "What is shown?", IMAGES)
+
+    parts = messages[1]["content"]
+    assert parts[0]["type"] == "text" and parts[0]["text"].endswith("What is shown?")
+    assert [part["image_url"]["url"] for part in parts[1:]] == [
+        "data:image/jpeg;base64," + base64.b64encode(b"\xff\xd8jpeg-one").decode(),
+        data_url(b"webp-two", "image/webp"),
+    ]
+
+
+def test_text_messages_per_provider():
+    ollama = text_messages("ollama", "Total?", "Invoice 42")
+    openai = text_messages("openai", "Total?", "Invoice 42")
+
+    assert [m["role"] for m in ollama] == ["user"]
+    assert "Context:\nInvoice 42" in ollama[0]["content"]
+    assert [m["role"] for m in openai] == ["system", "user"]
+    assert openai[1]["content"] == "Document content:\n\nInvoice 42\n\nPrompt: Total?"
+
@@ -4,8 +4,13 @@ Test OCR functionality in both mock and e2e modes.
 
 import pytest
 import os
+from unittest.mock import Mock
+from PIL import Image
+from aigrok import ocr
 from .services import MockOCRService, RealOCRService
 
+REGION = [[0, 0], [1, 0], [1, 1], [0, 1]]
+
 
 def test_mock_ocr_valid_image(test_files):
     """Test mock OCR with valid image."""
@@ -58,3 +63,57 @@ def test_real_ocr_invalid_file(test_files):
     result = service.process_document(str(test_files["invalid"]))
     assert not result["success"]
     assert "Invalid file format" in result["error"]
+
+def test_summarize_joins_regions():
+    assert ocr.summarize([]) == ("", 0.0)
+    assert ocr.summarize([(REGION, "a", 0.5), (REGION, "b", 1.0)]) == ("a b", 0.75)
+
+
+def test_size_batches_groups_by_size_and_mode():
+    images = [
+        Image.new("RGB", (10, 10)),
+        Image.new("L", (10, 10)),
+        Image.new("RGB", (10, 10)),
+        Image.new("RGB", (10, 10)),
+        Image.new("RGB", (5, 5)),
+    ]
+
+    assert ocr.size_batches(images, 2) == [[0, 2], [3], [1], [4]]
+
+
+def test_read_batch_falls_back_to_single_images():
+    """A failed batched call is retried with readtext for each image."""
+    reader = Mock()
+    reader.readtext_batched.side_effect = RuntimeError("out of memory")
+    reader.readtext.return_value = [(REGION, "text", 0.9)]
+    images = [Image.new("RGB", (10, 10))] * 2
+
+    assert ocr.read_batch(reader, images) == [("text", 0.9)] * 2
+    assert reader.readtext.call_count == 2
+
+
+def test_read_in_worker_uses_worker_reader(monkeypatch):
+    reader = Mock()
+    reader.readtext_batched.return_value = [[(REGION, "x", 0.5)], []]
+    monkeypatch.setattr(ocr, "_worker_reader", reader)
+
+    images = [Image.new("RGB", (10, 10))] * 2
+    assert ocr._read_in_worker(images) == [("x", 0.5), ("", 0.0)]
+
+
+def test_read_batch_keeps_pixels_for_the_next_consumer():
+    """release=False leaves the decoded pixels for the vision model."""
+    from io import BytesIO
+    from aigrok.images import PageImage
+
+    buffered = BytesIO()
+    Image.new("RGB", (10, 10)).save(buffered, format="PNG")
+    images = [PageImage(buffered.getvalue()), PageImage(buffered.getvalue())]
+    reader = Mock()
+    reader.readtext_batched.return_value = [[(REGION, "x", 0.5)], []]
+
+    ocr.read_batch(reader, images, release=False)
+    assert all(image._pixels is not None for image in images)
+
+    ocr.read_batch(reader, images)
+    assert all(image._pixels is None for image in images)
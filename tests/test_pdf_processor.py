@@ -82,6 +82,415 @@ def test_process_image_ocr_error(mock_reader, processor, sample_image):
     assert confidence == 0.0
 
 
+def test_process_images_ocr_batches_same_size_images(processor):
+    """Same-size images share readtext_batched calls; odd sizes use readtext."""
+    region = [[0, 0], [1, 0], [1, 1], [0, 1]]
+    reader = Mock()
+    reader.readtext_batched.side_effect = lambda arrays: [
+        [(region, f"page{arrays[i].shape[1]}-{i}", 0.8)] for i in range(len(arrays))
+    ]
+    reader.readtext.return_value = [(region, "odd", 0.5)]
+    processor.reader = reader
+    processor.ocr_batch_size = 2
+    images = [
+        Image.new("RGB", (100, 30)),
+        Image.new("RGB", (60, 20)),
+        Image.new("RGB", (100, 30)),
+        Image.new("RGB", (100, 30)),
+    ]
+
+    results = processor._process_images_ocr(images)
+
+    assert results == [
+        ("page100-0", 0.8),
+        ("odd", 0.5),
+        ("page100-1", 0.8),
+        ("odd", 0.5),  # Third 100x30 image is left over from the batch of two
+    ]
+    assert reader.readtext_batched.call_count == 1
+    # ocr_batch_size groups images; EasyOCR's recognizer batch is left alone
+    assert len(reader.readtext_batched.call_args.args[0]) == 2
+    assert "batch_size" not in reader.readtext_batched.call_args.kwargs
+    assert reader.readtext.call_count == 2
+
+
+def test_ocr_pool_failure_shuts_pool_down(processor):
+    """A failed pool is closed before OCR falls back to this process."""
+    pool = Mock()
+    pool.map.side_effect = RuntimeError("worker died")
+    reader = Mock()
+    reader.readtext.return_value = [([[0, 0], [1, 0], [1, 1], [0, 1]], "text", 0.9)]
+    processor.reader = reader
+    processor.ocr_workers = 2
+    processor._ocr_pool = pool
+
+    results = processor._process_images_ocr([Image.new("RGB", (10, 10))])
+
+    assert results == [("text", 0.9)]
+    pool.close.assert_called_once()
+    assert processor._ocr_pool is None
+
+
+def test_ocr_reader_is_loaded_on_first_use(mock_config):
+    """A processor that never OCRs in-process never loads EasyOCR."""
+    config_manager = ConfigManager()
+    config_manager.config = AigrokConfig(**mock_config)
+
+    with patch("easyocr.Reader") as mock_reader:
+        processor = PDFProcessor(config_manager=config_manager)
+        assert processor.ocr_active
+        mock_reader.assert_not_called()
+
+        processor.preload_ocr()
+        assert processor.reader is mock_reader.return_value
+        mock_reader.assert_called_once_with(["en"])
+
+
+def test_ocr_workers_load_parent_reader_only_on_fallback(mock_config):
+    """With an OCR pool, this process loads a reader only if the pool fails."""
+    mock_config["ocr_workers"] = 2
+    config_manager = ConfigManager()
+    config_manager.config = AigrokConfig(**mock_config)
+
+    with patch("easyocr.Reader") as mock_reader:
+        with PDFProcessor(config_manager=config_manager) as processor:
+            assert processor.ocr_active
+            mock_reader.assert_not_called()
+
+            pool = Mock()
+            pool.map.side_effect = RuntimeError("worker died")
+            processor._ocr_pool = pool
+            processor._process_images_ocr([Image.new("RGB", (10, 10))])
+            mock_reader.assert_called_once_with(["en"])
+
+            processor._ocr_pool = pool = Mock()
+    # Leaving the context shuts the pool down
+    pool.close.assert_called_once()
+
+
+def test_extract_ocr_pool_reassembles_pages(processor, tmp_path):
+    """Batches OCR'd by the worker pool come back in page order with confidences."""
+    from .test_extraction import build_pdf
+
+    pdf_path = tmp_path / "scan.pdf"
+    doc = build_pdf(3, shared_image=False, unique_images=True)
+    doc.save(pdf_path)
+    doc.close()
+
+    pool = Mock()
+    # One batch per image; answer each with its position so order is visible
+    pool.map.side_effect = lambda batches: [
+        [(f"image {i}", 0.5 + i / 10)] for i, _ in enumerate(batches)
+    ]
+    processor.reader = Mock()
+    processor.cache = None
+    processor.ocr_workers = 2
+    processor.ocr_batch_size = 1
+    processor._ocr_pool = pool
+
+    content = processor.extract(pdf_path)
+
+    pool.map.assert_called_once()
+    assert content.ocr_text == "image 0\nimage 1\nimage 2"
+    assert content.metadata["ocr_pages_processed"] == 3
+    assert content.metadata["ocr_pages_skipped"] == 0
+    assert content.metadata["ocr_pages"] == [
+        {"page": 1, "confidence": 0.5},
+        {"page": 2, "confidence": 0.6},
+        {"page": 3, "confidence": 0.7},
+    ]
+
+
+def test_extract_skips_ocr_on_pages_with_text(processor, tmp_path):
+    """Images beside a real text layer are not OCR'd; the skip is reported."""
+    from .test_extraction import build_pdf
+
+    pdf_path = tmp_path / "report.pdf"
+    doc = build_pdf(2, shared_image=False, unique_images=True)
+    doc[0].insert_text((72, 300), "Born-digital paragraph of report text. " * 3)
+    doc.save(pdf_path)
+    doc.close()
+    processor.reader = Mock()
+    processor.cache = None
+
+    with patch.object(
+        processor, "_process_images_ocr", return_value=[("scan", 0.9)]
+    ) as mock_ocr:
+        content = processor.extract(pdf_path)
+
+    assert len(mock_ocr.call_args.args[0]) == 1  # Only the second page's image
+    assert content.metadata["ocr_pages_processed"] == 1
+    assert content.metadata["ocr_pages_skipped"] == 1
+    assert content.metadata["ocr_pages"] == [{"page": 2, "confidence": 0.9}]
+
+
+def test_iter_pages_yields_each_page_with_its_ocr(processor, tmp_path):
+    """Pages are yielded lazily; a shared image is OCR'd on its first page only."""
+    from .test_extraction import build_pdf
+
+    pdf_path = tmp_path / "pages.pdf"
+    doc = build_pdf(3, shared_image=True, unique_images=True)
+    doc.save(pdf_path)
+    doc.close()
+    processor.reader = Mock()
+    with patch.object(
+        processor,
+        "_process_images_ocr",
+        side_effect=lambda images: [("", 0.0)] + [("scan", 0.9)] * (len(images) - 1),
+    ) as mock_ocr:
+        pages = processor.iter_pages(pdf_path)
+        first = next(pages)
+        assert mock_ocr.call_count == 1  # Later pages are not touched yet
+        rest = list(pages)
+
+    assert [page.page for page in [first] + rest] == [1, 2, 3]
+    assert first.text.strip() == "Page 1 text"
+    assert first.metadata == {
+        "image_count": 2,
+        "rendered": False,
+        "ocr_skipped": False,
+    }
+    assert (first.ocr_text, first.ocr_confidence) == ("scan", 0.9)
+    assert [page.metadata["image_count"] for page in rest] == [1, 1]
+    assert all(page.page_count == 3 for page in rest)
+
+
+def test_extract_renders_vector_only_pages(processor, tmp_path):
+    """A diagram drawn with vector paths reaches the vision model as a raster."""
+    import fitz
+
+    pdf_path = tmp_path / "diagram.pdf"
+    doc = fitz.open()
+    doc.new_page().draw_circle(fitz.Point(200, 200), 80)
+    doc.save(pdf_path)
+    doc.close()
+    processor.reader = None
+    processor.page_render_dpi = 72
+
+    content = processor.extract(pdf_path)
+
+    assert content.content_type == "images_only"
+    assert [(image.size, page) for image, page in content.images] == [((595, 842), 0)]
+
+    processor.page_render_mode = "never"
+    processor.cache = None
+    assert processor.extract(pdf_path).images == []
+
+
+def test_pages_are_not_rendered_without_a_consumer(processor, tmp_path):
+    """Without OCR or a vision model nothing would read a rendered page."""
+    import fitz
+
+    pdf_path = tmp_path / "diagram.pdf"
+    doc = fitz.open()
+    doc.new_page().draw_circle(fitz.Point(200, 200), 80)
+    doc.save(pdf_path)
+    doc.close()
+    processor.reader = None
+    processor.cache = None
+
+    with patch("aigrok.pdf_processor.pages_to_render") as mock_render:
+        # Streamed pages only feed OCR
+        pages = list(processor.iter_pages(pdf_path))
+        mock_render.assert_not_called()
+        assert pages[0].metadata["rendered"] is False
+
+        processor.vision_model = None
+        assert processor.extract(pdf_path).images == []
+        mock_render.assert_not_called()
+
+
+def test_vision_query_sends_budgeted_images(processor):
+    """Vision uploads are downscaled JPEGs rather than full-size PNGs."""
+    from aigrok.pdf_processor import DocumentContent
+
+    processor.vision_provider = "openai"
+    processor.image_budget.max_px = 500
+    content = DocumentContent(
+        text="",
+        page_count=1,
+        metadata={},
+        content_type="images_only",
+        images=[(Image.new("RGB", (2000, 1000), color="white"), 0)],
+    )
+
+    with patch("aigrok.pdf_processor.litellm.completion") as mock_completion:
+        mock_completion.return_value = MagicMock(
+            choices=[MagicMock(message=MagicMock(content="a blank page"))]
+        )
+        result = processor.query(content, "What is shown?")
+
+    url = mock_completion.call_args.kwargs["messages"][1]["content"][1]["image_url"]
+    assert url["url"].startswith("data:image/jpeg;base64,")
+    assert result.llm_response == "a blank page"
+
+
+def test_ollama_vision_query_sends_native_images(processor):
+    """The Ollama chat call receives image bytes, not base64 in the prompt."""
+    from aigrok.pdf_processor import DocumentContent
+
+    processor.vision_provider = "ollama"
+    processor.vision_llm = MagicMock()
+    processor.vision_llm.chat.return_value = MagicMock(
+        message=MagicMock(content="a chart")
+    )
+    content = DocumentContent(
+        text="",
+        page_count=1,
+        metadata={},
+        content_type="images_only",
+        images=[(Image.new("RGB", (64, 64), color="white"), 0)],
+    )
+
+    result = processor.query(content, "What is shown?")
+
+    message = processor.vision_llm.chat.call_args.kwargs["messages"][0]
+    assert message["images"][0][:2] == b"\xff\xd8"  # JPEG bytes
+    assert "<image>" not in message["content"]
+    assert result.llm_response == "a chart"
+
+
+def test_vision_model_gets_its_own_client(mock_config):
+    """The vision model's endpoints are used even when the text model is Ollama."""
+    from aigrok.balancer import BalancedOllamaClient
+
+    mock_config["vision_model"] = ModelConfig(
+        provider="ollama",
+        model_name="llama3.2-vision:11b",
+        endpoints=["http://gpu1:11434", "http://gpu2:11434"],
+    )
+    config_manager = ConfigManager()
+    config_manager.config = AigrokConfig(**mock_config)
+    mock_config["text_model"] = ModelConfig(provider="openai", model_name="gpt-4o")
+    openai_manager = ConfigManager()
+    openai_manager.config = AigrokConfig(**mock_config)
+
+    with patch("easyocr.Reader"):
+        processor = PDFProcessor(config_manager=config_manager)
+        openai_text = PDFProcessor(config_manager=openai_manager)
+
+    assert isinstance(processor.vision_llm, BalancedOllamaClient)
+    assert [s.url for s in processor.vision_llm.pool.stats] == [
+        "http://gpu1:11434",
+        "http://gpu2:11434",
+    ]
+    assert processor.llm is not processor.vision_llm
+    assert isinstance(openai_text.vision_llm, BalancedOllamaClient)
+
+
+def test_query_retries_transient_provider_errors(processor):
+    """A dropped connection is retried instead of becoming the answer."""
+    from aigrok.pdf_processor import DocumentContent
+    from aigrok.resilience import RetryPolicy
+
+    processor.retry_policy = RetryPolicy(retries=2, base_delay=0)
+    processor.llm = MagicMock()
+    processor.llm.chat.side_effect = [
+        ConnectionError("connection reset"),
+        MagicMock(message=MagicMock(content="42")),
+    ]
+    content = DocumentContent(text="Total: 42", page_count=1, metadata={})
+
+    result = processor.query(content, "What is the total?")
+
+    assert result.llm_response == "42"
+    assert processor.llm.chat.call_count == 2
+
+    processor.llm.chat.side_effect = ConnectionError("connection refused")
+    result = processor.query(content, "What is the total?")
+    assert result.llm_response.startswith("Error")
+    assert processor.llm.chat.call_count == 5
+
+
+def test_query_meters_configured_rate_limits(processor):
+    """Calls reserve a request and the context's estimated tokens."""
+    from aigrok.config import RateLimitConfig
+    from aigrok.pdf_processor import DocumentContent
+    from aigrok.ratelimit import rate_limiter
+
+    processor.config_manager.config.rate_limits = {
+        "ollama": RateLimitConfig(rpm=10, tpm=100000, output_tokens=0)
+    }
+    processor.llm = MagicMock()
+    processor.llm.chat.return_value = MagicMock(message=MagicMock(content="42"))
+    content = DocumentContent(text="x" * 4000, page_count=1, metadata={})
+
+    assert processor.query(content, "What is x?").llm_response == "42"
+
+    limiter = rate_limiter("ollama/llama3.2:3b", 10, 100000)
+    assert limiter.requests.level == pytest.approx(9, abs=0.01)
+    assert 100000 - limiter.tokens.level == pytest.approx(1000, rel=0.2)
+
+
+def test_each_attempt_waits_for_quota_outside_its_latency(processor):
+    """Retries are metered like first attempts, without timing the wait."""
+    import time
+    from aigrok.config import RateLimitConfig
+    from aigrok.pdf_processor import DocumentContent
+    from aigrok.ratelimit import rate_limiter
+    from aigrok.resilience import RetryPolicy, endpoint_guard
+
+    processor.config_manager.config.rate_limits = {
+        "ollama": RateLimitConfig(rpm=240, output_tokens=0)
+    }
+    processor.retry_policy = RetryPolicy(retries=2, base_delay=0)
+    processor.llm = MagicMock()
+    processor.llm.chat.side_effect = [
+        ConnectionError("reset"),
+        MagicMock(message=MagicMock(content="42")),
+    ]
+    content = DocumentContent(text="Total: 42", page_count=1, metadata={})
+    limiter = rate_limiter("ollama/llama3.2:3b", 240, None)
+    limiter.requests.level = 1
+
+    start = time.monotonic()
+    assert processor.query(content, "What is the total?").llm_response == "42"
+
+    # The retry had to wait ~0.25s for a request of its own
+    assert time.monotonic() - start >= 0.2
+    guard = endpoint_guard(
+        processor._endpoint_key(processor.text_endpoint, processor.text_model),
+        processor.breaker_threshold,
+        processor.breaker_reset_seconds,
+    )
+    assert max(guard.latencies._samples) < 0.1
+
+
+@pytest.mark.parametrize("rpm,calls", [(1, 1), (60, 2)])
+def test_hedge_is_skipped_when_the_bucket_is_empty(processor, rpm, calls):
+    """A hedged duplicate is only sent when quota is free for it."""
+    import time
+    from aigrok.config import RateLimitConfig
+    from aigrok.pdf_processor import DocumentContent
+    from aigrok.resilience import endpoint_guard
+
+    processor.config_manager.config.rate_limits = {
+        "ollama": RateLimitConfig(rpm=rpm, output_tokens=0)
+    }
+    processor.hedge = True
+    processor.hedge_same_endpoint = True
+    processor.hedge_min_delay = 0.01
+    guard = endpoint_guard(
+        processor._endpoint_key(processor.text_endpoint, processor.text_model),
+        processor.breaker_threshold,
+        processor.breaker_reset_seconds,
+    )
+    for _ in range(10):
+        guard.latencies.add(0.01)
+
+    def slow_chat(**kwargs):
+        time.sleep(0.2)
+        return MagicMock(message=MagicMock(content="42"))
+
+    processor.llm = MagicMock()
+    processor.llm.chat.side_effect = slow_chat
+    content = DocumentContent(text="Total: 42", page_count=1, metadata={})
+
+    assert processor.query(content, "What is the total?").llm_response == "42"
+    time.sleep(0.25)  # Let a hedged copy finish in the background
+    assert processor.llm.chat.call_count == calls
+
+
 def test_combine_text(processor):
     """Test text combination."""
     pdf_text = "PDF content"
@@ -175,3 +584,159 @@ def test_process_document_ocr_disabled(mock_ollama, mock_fitz_open, processor):
     assert result.success
     assert "PDF content" in result.text
     assert result.llm_response == "LLM response"
+
+
+def test_process_file_extracts_images_once(processor, tmp_path):
+    """process_file walks the document once and decodes shared images once."""
+    from .test_extraction import build_pdf
+
+    pdf_path = tmp_path / "shared.pdf"
+    doc = build_pdf(5)
+    doc.save(pdf_path)
+    doc.close()
+
+    processor.reader = None
+    with patch.object(
+        processor, "_extract_images", wraps=processor._extract_images
+    ) as mock_extract_images, patch.object(
+        processor, "_query_llm", return_value="LLM response"
+    ):
+        result = processor.process_file(str(pdf_path), "test prompt")
+
+    assert result.success
+    assert result.page_count == 5
+    assert result.metadata["image_count"] == 1
+    assert mock_extract_images.call_count == 1
+
+
+def test_query_without_prompt_skips_llm(processor):
+    """query() returns the extracted text without an LLM round-trip."""
+    from aigrok.pdf_processor import DocumentContent
+
+    content = DocumentContent(
+        text="Text extracted from PDF:\nPDF content",
+        page_count=1,
+        metadata={"file_name": "doc.pdf"},
+    )
+    with patch.object(processor, "_query_llm") as mock_query_llm:
+        result = processor.query(content)
+
+    assert result.success
+    assert result.text == content.text
+    assert result.llm_response is None
+    mock_query_llm.assert_not_called()
+
+
+def test_query_streams_ollama_tokens(processor):
+    """With on_token the Ollama chat is streamed and the full text returned."""
+    from aigrok.pdf_processor import DocumentContent
+
+    chunks = [
+        MagicMock(spec=["message"], message=MagicMock(content=piece))
+        for piece in ["The total", " is", "", " 42"]
+    ]
+    processor.llm = MagicMock()
+    processor.llm.chat.return_value = iter(chunks)
+    tokens = []
+    content = DocumentContent(text="Total: 42", page_count=1, metadata={})
+
+    result = processor.query(content, "What is the total?", on_token=tokens.append)
+
+    assert tokens == ["The total", " is", " 42"]
+    assert result.llm_response == "The total is 42"
+    assert processor.llm.chat.call_args.kwargs["stream"] is True
+
+
+def test_query_streams_litellm_deltas(processor):
+    """litellm deltas are streamed the same way."""
+    from aigrok.pdf_processor import DocumentContent
+
+    def delta(piece):
+        return MagicMock(choices=[MagicMock(delta=MagicMock(content=piece))])
+
+    processor.text_provider = "openai"
+    content = DocumentContent(text="Total: 42", page_count=1, metadata={})
+    tokens = []
+
+    with patch("aigrok.pdf_processor.litellm.completion") as mock_completion:
+        mock_completion.return_value = iter([delta("4"), delta(None), delta("2")])
+        result = processor.query(content, "Total?", on_token=tokens.append)
+
+    assert tokens == ["4", "2"]
+    assert result.llm_response == "42"
+    assert mock_completion.call_args.kwargs["stream"] is True
+
+
+def test_long_documents_are_sent_whole_unless_chunking_is_enabled(processor):
+    """Without max_context_tokens a long document is one LLM call."""
+    from aigrok.pdf_processor import DocumentContent
+
+    assert processor.max_context_tokens is None
+    pages = ["x" * 40000, "y" * 40000]
+    content = DocumentContent(
+        text="\n".join(pages), page_count=2, metadata={}, pages=pages
+    )
+
+    with patch.object(processor, "_call_llm", return_value="answer") as call_llm:
+        result = processor.query(content, "Summarize")
+
+    assert result.llm_response == "answer"
+    assert call_llm.call_count == 1
+    assert "chunk_count" not in result.metadata
+
+
+def test_query_map_reduces_long_documents(processor):
+    """Text over the context budget is queried in chunks and reduced."""
+    from aigrok.pdf_processor import DocumentContent
+
+    pages = [f"Page {i} " + "x" * 400 for i in range(4)]  # ~100 tokens each
+    content = DocumentContent(
+        text="\n".join(pages), page_count=4, metadata={"file_name": "doc.pdf"}, pages=pages
+    )
+    processor.max_context_tokens = 250
+    calls = []
+
+    def call_llm(prompt, context, provider, images=None, on_token=None):
+        calls.append((prompt, context))
+        if "part 1 of 2" in prompt:
+            return "first"
+        if "part 2 of 2" in prompt:
+            return "second"
+        return "combined"
+
+    with patch.object(processor, "_call_llm", side_effect=call_llm):
+        result = processor.query(content, "Summarize")
+
+    map_calls = [c for c in calls if "of 2 of the document" in c[0]]
+    assert [c[1] for c in map_calls] == ["\n".join(pages[:2]), "\n".join(pages[2:])]
+    reduce_prompt, reduce_context = calls[-1]
+    assert "Question: Summarize" in reduce_prompt
+    assert reduce_context == "Part 1:\nfirst\n\nPart 2:\nsecond"
+    assert result.llm_response == "combined"
+    assert result.metadata["chunk_count"] == 2
+    assert len(result.metadata["chunk_latencies"]) == 2
+    assert result.metadata["chunk_failures"] == 0
+
+    # A failed chunk is left out; a single remaining answer needs no reduce
+    calls.clear()
+    with patch.object(
+        processor,
+        "_call_llm",
+        side_effect=lambda prompt, *args: "Error: timed out" if "part 2" in prompt else "only",
+    ):
+        result = processor.query(content, "Summarize")
+
+    assert result.llm_response == "only"
+    assert result.metadata["chunk_failures"] == 1
+
+
+def test_query_short_document_is_not_chunked(processor):
+    """Text within the budget is sent in a single request."""
+    from aigrok.pdf_processor import DocumentContent
+
+    content = DocumentContent(text="short", page_count=1, metadata={}, pages=["short"])
+    with patch.object(processor, "_call_llm", return_value="answer") as mock_call:
+        result = processor.query(content, "Summarize")
+
+    mock_call.assert_called_once()
+    assert "chunk_count" not in result.metadata
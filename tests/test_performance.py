@@ -4,7 +4,10 @@ Performance test utilities and benchmarking functions.
 
 import time
 import statistics
-from typing import List, Callable
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Callable
 from dataclasses import dataclass
 from functools import wraps
 
@@ -140,3 +143,148 @@ def establish_baseline(
         **kwargs,
     )
     return metrics.percentile_95
+
+
+def test_extraction_scales_linearly_with_page_count():
+    """Single-pass extraction time grows linearly, not quadratically, with pages."""
+    from aigrok.extraction import extract_document, load_images
+    from .test_extraction import build_pdf
+
+    def extract(doc):
+        load_images(doc, extract_document(doc))
+
+    per_page = {}
+    for pages in (10, 80):
+        doc = build_pdf(pages, unique_images=True)
+        metrics = measure_performance(
+            extract, doc, warmup_iterations=1, test_iterations=5
+        )
+        per_page[pages] = metrics.median_time / pages
+        doc.close()
+
+    # An 8x larger document must not cost much more than 8x the time; the old
+    # per-page re-walk of the whole document was O(pages^2).
+    assert per_page[80] < per_page[10] * 3
+
+
+# Startup budgets, in seconds of cumulative import time (-X importtime)
+VERSION_IMPORT_BUDGET = 1.5
+TEXT_QUERY_BUDGET = 3.0
+HEAVY_MODULES = ("torch", "easyocr", "litellm")
+REPO_ROOT = Path(__file__).parent.parent
+
+
+def run_with_importtime(code: str) -> subprocess.CompletedProcess:
+    """
+    Run code in a fresh interpreter with ``-X importtime``.
+
+    Args:
+        code: Python source to execute
+
+    Returns:
+        Completed process; the import timings are on stderr
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        timeout=300,
+        cwd=REPO_ROOT,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    return proc
+
+
+def import_times(proc: subprocess.CompletedProcess) -> Dict[str, float]:
+    """Map each imported module to its cumulative import time in seconds."""
+    times = {}
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and line.count("|") == 2:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def test_version_startup_budget():
+    """`aigrok --version` imports no heavy dependencies and stays within budget."""
+    times = import_times(
+        run_with_importtime(
+            "import sys\n"
+            "sys.argv = ['aigrok', '--version']\n"
+            "from aigrok.cli import main\n"
+            "try:\n"
+            "    main()\n"
+            "except SystemExit:\n"
+            "    pass\n"
+        )
+    )
+
+    assert not [m for m in HEAVY_MODULES if m in times]
+    assert times["aigrok.cli"] < VERSION_IMPORT_BUDGET
+
+
+def test_text_pdf_query_startup_budget():
+    """A text-only query with OCR disabled never imports torch, EasyOCR or litellm."""
+    script = """
+import sys, time
+from unittest.mock import patch
+start = time.perf_counter()
+from aigrok.config import AigrokConfig, ConfigManager, ModelConfig
+from aigrok.pdf_processor import PDFProcessor
+config_manager = ConfigManager()
+model = ModelConfig(provider="ollama", model_name="m", endpoint="http://localhost:11434")
+config_manager.config = AigrokConfig(
+    text_model=model, vision_model=model, ocr_enabled=False, cache_enabled=False
+)
+processor = PDFProcessor(config_manager=config_manager)
+with patch.object(processor, "_call_llm", return_value="ok"):
+    result = processor.process_file("tests/files/simple.pdf", "What is this?")
+assert result.llm_response == "ok", result
+print(time.perf_counter() - start)
+"""
+    proc = run_with_importtime(script)
+
+    imported = import_times(proc)
+    assert not [m for m in HEAVY_MODULES if m in imported]
+    assert float(proc.stdout.strip().splitlines()[-1]) < TEXT_QUERY_BUDGET
+
+
+def test_vision_payload_for_50_images():
+    """Vision payloads for a 50-image document stay small and cheap to build."""
+    import base64
+    import json
+    from aigrok.messages import vision_messages
+
+    images = [(bytes([i]) * 200_000, "image/jpeg") for i in range(50)]
+
+    def inline_prompt():
+        # The previous Ollama payload: base64 appended to the prompt text
+        prompt_text = "Question: What is shown?"
+        for data, mime in images:
+            encoded = base64.b64encode(data).decode()
+            prompt_text += f"\n<image>data:{mime};base64,{encoded}</image>"
+        return [{"role": "user", "content": prompt_text}]
+
+    inline = measure_performance(inline_prompt, warmup_iterations=1, test_iterations=5)
+    native = measure_performance(
+        vision_messages, "ollama", "What is shown?", images, test_iterations=5
+    )
+    parts = measure_performance(
+        vision_messages, "openai", "What is shown?", images, test_iterations=5
+    )
+
+    ollama = vision_messages("ollama", "What is shown?", images)
+    openai = vision_messages("openai", "What is shown?", images)
+    openai_bytes = len(json.dumps(openai))
+    print(
+        f"\n50 images: inline {inline.median_time * 1000:.1f} ms, "
+        f"ollama images field {native.median_time * 1000:.3f} ms, "
+        f"openai parts {parts.median_time * 1000:.1f} ms ({openai_bytes} bytes)"
+    )
+
+    # The prompt text no longer carries the images through the tokenizer path
+    assert len(ollama[0]["content"]) < 500 < len(inline_prompt()[0]["content"])
+    assert native.median_time < inline.median_time
+    # Each image is base64-encoded exactly once: 4/3 of the raw bytes
+    assert openai_bytes < sum(len(data) for data, _ in images) * 4 / 3 + 50 * 100
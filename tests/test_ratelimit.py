@@ -0,0 +1,93 @@
+"""Tests for client-side RPM/TPM rate limiting."""
+
+import threading
+from unittest.mock import MagicMock
+import pytest
+from aigrok.ratelimit import (
+    RateLimiter,
+    TokenBucket,
+    rate_limiter,
+    response_tokens,
+)
+
+
+def test_bucket_overdraws_and_reports_wait():
+    bucket = TokenBucket(capacity=60, rate=1.0)
+    assert bucket.reserve(60, now=bucket.updated) == 0
+    assert bucket.reserve(30, now=bucket.updated) == pytest.approx(30)
+    # Refilled at one unit per second, capped at capacity
+    assert bucket.reserve(0, now=bucket.updated + 100) == 0
+    assert bucket.level == 60
+
+
+def test_requests_beyond_rpm_wait_their_turn():
+    limiter = RateLimiter(rpm=60)
+    waits = [limiter.reserve(0) for _ in range(62)]
+    assert waits[:60] == [0] * 60
+    assert waits[60] == pytest.approx(1, abs=0.05)
+    assert waits[61] == pytest.approx(2, abs=0.05)
+
+
+def test_tokens_beyond_tpm_wait_and_are_settled():
+    limiter = RateLimiter(tpm=6000)
+    assert limiter.reserve(6000) == 0
+    assert limiter.reserve(1000) == pytest.approx(10, abs=0.05)
+    # The response used far fewer tokens than reserved
+    limiter.settle(reserved=1000, used=100)
+    assert limiter.reserve(0) == pytest.approx(1, abs=0.05)
+
+
+def test_acquire_sleeps_for_quota():
+    limiter = RateLimiter(rpm=1, tpm=1000)
+    sleep = MagicMock()
+
+    limiter.acquire(500, sleep)
+    sleep.assert_not_called()
+    assert limiter.tokens.level == pytest.approx(500, abs=1)
+
+    limiter.acquire(500, sleep)
+    assert sleep.call_args[0][0] == pytest.approx(60, abs=0.1)
+
+
+def test_try_reserve_never_overdraws():
+    limiter = RateLimiter(rpm=2, tpm=1000)
+    assert limiter.try_reserve(800)
+    assert not limiter.try_reserve(800)  # Tokens short: the request is refunded
+    assert limiter.requests.level == pytest.approx(1, abs=0.01)
+    assert limiter.try_reserve(100)
+    assert not limiter.try_reserve(0)
+
+
+def test_concurrent_reservations_share_the_quota():
+    limiter = RateLimiter(rpm=600)
+    waits = []
+    lock = threading.Lock()
+
+    def reserve():
+        wait = limiter.reserve(0)
+        with lock:
+            waits.append(wait)
+
+    threads = [threading.Thread(target=reserve) for _ in range(620)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(1 for wait in waits if wait == 0) == 600
+    assert max(waits) == pytest.approx(2, abs=0.1)
+
+
+def test_response_tokens_reads_provider_usage():
+    assert response_tokens(MagicMock(usage=MagicMock(total_tokens=42))) == 42
+    assert response_tokens({"usage": {"total_tokens": 7}}) == 7
+    ollama = MagicMock(spec=["prompt_eval_count", "eval_count"])
+    ollama.prompt_eval_count, ollama.eval_count = 30, 12
+    assert response_tokens(ollama) == 42
+    assert response_tokens("no usage") is None
+
+
+def test_rate_limiters_are_shared_per_model():
+    assert rate_limiter("openai/gpt-4o") is None
+    limiter = rate_limiter("openai/gpt-4o", rpm=500, tpm=30000)
+    assert rate_limiter("openai/gpt-4o", rpm=500, tpm=30000) is limiter
+    assert rate_limiter("openai/gpt-4o-mini", rpm=500, tpm=30000) is not limiter
@@ -0,0 +1,177 @@
+"""Tests for retries, circuit breaking and hedging of provider calls."""
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+import pytest
+from aigrok.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    call_with_resilience,
+    endpoint_guard,
+    hedged,
+    is_retryable,
+)
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class ReadTimeout(Exception):
+    """Stands in for httpx.ReadTimeout, matched by name."""
+
+
+def test_is_retryable_classifies_errors():
+    assert is_retryable(ConnectionError("reset"))
+    assert is_retryable(TimeoutError())
+    assert is_retryable(ReadTimeout())
+    assert is_retryable(StatusError(503))
+    assert is_retryable(StatusError(429))
+    assert not is_retryable(StatusError(404))
+    assert not is_retryable(ValueError("bad prompt"))
+    assert not is_retryable(CircuitOpenError())
+
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(retries=5, base_delay=1.0, max_delay=4.0)
+
+    delays = [policy.delay(attempt) for attempt in range(6) for _ in range(50)]
+
+    assert all(0 <= d <= 4.0 for d in delays)
+    assert len(set(delays)) > 1
+    assert max(policy.delay(0) for _ in range(50)) <= 1.0
+
+
+def test_transient_failures_are_retried():
+    call = MagicMock(side_effect=[ConnectionError("reset"), StatusError(502), "ok"])
+    sleep = MagicMock()
+
+    result = call_with_resilience(
+        call, endpoint_guard("http://a"), RetryPolicy(retries=2), sleep=sleep
+    )
+
+    assert result == "ok"
+    assert call.call_count == 3
+    assert sleep.call_count == 2
+
+
+def test_permanent_failures_and_exhausted_retries_raise():
+    guard = endpoint_guard("http://a")
+    call = MagicMock(side_effect=StatusError(400))
+    with pytest.raises(StatusError):
+        call_with_resilience(call, guard, RetryPolicy(retries=3), sleep=MagicMock())
+    assert call.call_count == 1
+
+    call = MagicMock(side_effect=ConnectionError("down"))
+    with pytest.raises(ConnectionError):
+        call_with_resilience(call, guard, RetryPolicy(retries=2), sleep=MagicMock())
+    assert call.call_count == 3
+
+
+def test_stream_is_retried_only_until_its_first_chunk():
+    guard = endpoint_guard("http://a")
+
+    def broken_stream():
+        yield "a"
+        raise ConnectionError("reset")
+
+    call = MagicMock(side_effect=[ConnectionError("refused"), broken_stream()])
+    stream = call_with_resilience(
+        call, guard, RetryPolicy(retries=3), sleep=MagicMock(), stream=True
+    )
+    assert next(stream) == "a"
+    with pytest.raises(ConnectionError):
+        next(stream)  # Tokens were passed on: not retried
+    assert call.call_count == 2
+    assert guard.breaker.failures == 0
+    assert len(guard.latencies._samples) == 0
+
+
+def test_circuit_breaker_opens_and_half_opens():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10)
+    with patch("aigrok.resilience.time.monotonic", return_value=100.0):
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "open" and not breaker.allow()
+
+    with patch("aigrok.resilience.time.monotonic", return_value=111.0):
+        assert breaker.allow()  # One trial call
+        assert not breaker.allow()
+        breaker.record_failure()  # Trial failed: open again
+        assert breaker.state == "open"
+
+    with patch("aigrok.resilience.time.monotonic", return_value=122.0):
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == "closed" and breaker.allow()
+
+
+def test_open_circuit_fails_fast():
+    guard = endpoint_guard("http://a", failure_threshold=2)
+    call = MagicMock(side_effect=ConnectionError("down"))
+    with pytest.raises(ConnectionError):
+        call_with_resilience(call, guard, RetryPolicy(retries=5), sleep=MagicMock())
+    assert call.call_count == 2
+
+    with pytest.raises(CircuitOpenError):
+        call_with_resilience(MagicMock(), guard, RetryPolicy())
+
+
+def test_hedged_call_returns_the_faster_copy():
+    calls = []
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            calls.append(len(calls))
+            first = len(calls) == 1
+        if first:
+            time.sleep(1.0)  # The first copy is stuck behind a slow request
+            return "slow"
+        return "fast"
+
+    start = time.monotonic()
+    assert hedged(call, delay=0.05) == "fast"
+    assert time.monotonic() - start < 0.5
+    assert len(calls) == 2
+
+    assert hedged(lambda: "quick", delay=1.0) == "quick"
+
+
+def test_hedging_waits_for_the_p95_latency():
+    guard = endpoint_guard("http://a")
+    policy = RetryPolicy()
+    for _ in range(20):
+        call_with_resilience(lambda: "ok", guard, policy, hedge=True)
+
+    with patch("aigrok.resilience.hedged", return_value="hedged") as mock_hedged:
+        assert call_with_resilience(
+            lambda: "ok",
+            guard,
+            policy,
+            hedge=True,
+            hedge_min_delay=0.25,
+            hedge_same_endpoint=True,
+        ) == "hedged"
+
+    assert mock_hedged.call_args.args[1] == 0.25  # p95 is below the floor
+
+
+def test_single_endpoint_is_not_hedged_by_default():
+    guard = endpoint_guard("http://a")
+    for _ in range(20):
+        guard.latencies.add(0.01)
+    call = MagicMock(return_value="ok")
+
+    with patch("aigrok.resilience.hedged") as mock_hedged:
+        assert call_with_resilience(
+            call, guard, RetryPolicy(), hedge=True, hedge_min_delay=0.01
+        ) == "ok"
+
+    mock_hedged.assert_not_called()
+    assert call.call_count == 1
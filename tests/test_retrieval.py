@@ -0,0 +1,99 @@
+"""Tests for per-document BM25 retrieval."""
+
+from unittest.mock import patch
+import fitz
+import pytest
+from aigrok.config import AigrokConfig, ConfigManager, ModelConfig
+from aigrok.pdf_processor import DocumentContent, PDFProcessor
+from aigrok.retrieval import BM25Index, tokenize
+
+
+PAGES = [
+    "Revenue grew 12% in the third quarter.",
+    "The board approved a new dividend policy.",
+    "",
+    "Quarterly revenue by region: revenue in Europe doubled.",
+    "Appendix: glossary of terms.",
+]
+
+
+@pytest.fixture
+def processor():
+    """Create a PDFProcessor with retrieval enabled for the top two pages."""
+    config_manager = ConfigManager()
+    config_manager.config = AigrokConfig(
+        text_model=ModelConfig(
+            provider="ollama", model_name="llama3.2:3b", endpoint="http://localhost:11434"
+        ),
+        vision_model=ModelConfig(
+            provider="ollama",
+            model_name="llama3.2-vision:11b",
+            endpoint="http://localhost:11434",
+        ),
+        retrieval_enabled=True,
+        retrieval_top_k=2,
+    )
+    return PDFProcessor(config_manager=config_manager)
+
+
+def test_tokenize_drops_case_punctuation_and_stopwords():
+    assert tokenize("What is the Revenue, in Q3?") == ["revenue", "q3"]
+
+
+def test_search_ranks_matching_pages():
+    """Pages are ranked by BM25 score; pages without query terms are left out."""
+    index = BM25Index.build(PAGES)
+
+    hits = index.search("How did revenue change?", k=5)
+
+    assert [page for page, _ in hits] == [3, 0]
+    assert hits[0][1] > hits[1][1] > 0
+    assert index.search("revenue", k=1)[0][0] == 3
+    assert index.search("unrelated words", k=5) == []
+
+
+def test_index_roundtrip():
+    index = BM25Index.build(PAGES)
+    restored = BM25Index.from_dict(index.to_dict())
+
+    assert restored.search("dividend revenue", 3) == index.search("dividend revenue", 3)
+
+
+def test_query_sends_only_top_pages(processor):
+    """Only the best pages are sent, labelled and in document order."""
+    content = DocumentContent(
+        text="\n".join(PAGES), page_count=len(PAGES), metadata={}, pages=PAGES
+    )
+    with patch.object(processor, "_call_llm", return_value="answer") as mock_call:
+        result = processor.query(content, "How did revenue change?")
+
+    context = mock_call.call_args.args[1]
+    assert context == f"[Page 1]\n{PAGES[0]}\n\n[Page 4]\n{PAGES[3]}"
+    assert result.metadata["retrieved_pages"] == [1, 4]
+
+    # Without a matching page the whole document is sent
+    with patch.object(processor, "_call_llm", return_value="answer") as mock_call:
+        result = processor.query(content, "Summarize")
+
+    assert mock_call.call_args.args[1] == content.text
+    assert "retrieved_pages" not in result.metadata
+
+
+def test_index_is_persisted_with_extraction(processor, tmp_path):
+    """The index is stored in the extraction cache entry and reused from it."""
+    pdf_path = tmp_path / "doc.pdf"
+    doc = fitz.open()
+    for text in ("alpha report", "beta summary", "gamma notes"):
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(pdf_path)
+    doc.close()
+
+    first = processor.extract(pdf_path)
+    key = processor.cache.key(pdf_path, processor._extraction_settings())
+    entry = processor.cache.get(key)
+    with patch("aigrok.pdf_processor.BM25Index.build") as mock_build:
+        second = processor.extract(pdf_path)
+
+    assert entry["retrieval_index"] == first.index.to_dict()
+    mock_build.assert_not_called()
+    assert second.index.search("beta", 1) == [(1, first.index.search("beta", 1)[0][1])]
@@ -0,0 +1,215 @@
+"""Tests for the ASGI HTTP server."""
+
+import asyncio
+import json
+import multiprocessing
+import threading
+import time
+from unittest.mock import MagicMock
+import pytest
+from aigrok import batch
+from aigrok.api import APIProcessor
+from aigrok.pdf_processor import DocumentContent
+from aigrok.server import AigrokApp
+from aigrok.types import ProcessingResult
+
+requires_fork = pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork",
+    reason="Worker processes inherit the patched processor only when forked",
+)
+
+
+class FakeExtractor:
+    """Stand-in for the processor built inside extraction workers."""
+
+    def __init__(self, config_manager=None, verbose=False, workers=1):
+        pass
+
+    def extract(self, file_path):
+        if file_path == "missing.pdf":
+            raise ValueError(f"File not found: {file_path}")
+        return DocumentContent(
+            text=f"text of {file_path}", page_count=1, metadata={"file_name": file_path}
+        )
+
+    def preload_ocr(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeQuerier:
+    """Stand-in for the shared processor running the LLM stage."""
+
+    config_manager = MagicMock(config=None)
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.threads = set()
+
+    def query(self, content, prompt, on_token=None):
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+        response = f"{prompt}: {content.metadata['file_name']}"
+        if on_token:
+            for token in response.split(" "):
+                on_token(token)
+        return ProcessingResult(
+            success=True,
+            text=content.text,
+            page_count=content.page_count,
+            llm_response=response,
+            metadata=content.metadata,
+        )
+
+    def close(self):
+        self.closed = True
+
+
+async def send_request(app, method, path, body=None, headers=()):
+    """Send one HTTP request through the ASGI interface and return the messages."""
+    sent = []
+    payload = json.dumps(body).encode() if body is not None else b""
+
+    async def receive():
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "headers": list(headers)}
+    await app(scope, receive, send)
+    return sent
+
+
+async def call(app, method, path, body=None):
+    """Send one HTTP request and return its status and decoded JSON body."""
+    sent = await send_request(app, method, path, body)
+    return sent[0]["status"], json.loads(sent[1]["body"])
+
+
+@pytest.fixture
+def querier():
+    return FakeQuerier()
+
+
+@pytest.fixture
+def app(monkeypatch, querier):
+    """Create an app with fake extraction workers and a fake LLM stage."""
+    monkeypatch.setattr(batch, "PDFProcessor", FakeExtractor)
+    return AigrokApp(jobs=2, llm_concurrency=4, api_processor=APIProcessor(querier))
+
+
+def run(app, coroutine_factory):
+    """Start the app, run a coroutine against it, then shut it down."""
+
+    async def main():
+        await app.startup()
+        try:
+            return await coroutine_factory()
+        finally:
+            await app.shutdown()
+
+    return asyncio.run(main())
+
+
+def test_health_and_ready_before_startup():
+    """The app is live but not ready until startup completes."""
+    app = AigrokApp()
+
+    assert asyncio.run(call(app, "GET", "/health")) == (200, {"status": "ok"})
+    assert asyncio.run(call(app, "GET", "/ready"))[0] == 503
+    assert asyncio.run(call(app, "POST", "/process", {"file_path": "a.pdf"}))[0] == 503
+
+
+def test_unknown_route_and_method():
+    """Unknown paths are 404 and wrong methods are 405."""
+    app = AigrokApp()
+
+    assert asyncio.run(call(app, "GET", "/nope"))[0] == 404
+    assert asyncio.run(call(app, "GET", "/process"))[0] == 405
+
+
+@requires_fork
+def test_process_request(app, querier):
+    """POST /process extracts in a worker and queries the shared processor."""
+    status, body = run(
+        app,
+        lambda: call(app, "POST", "/process", {"file_path": "a.pdf", "prompt": "sum"}),
+    )
+
+    assert status == 200
+    assert body["success"]
+    assert body["llm_response"] == "sum: a.pdf"
+    assert body["text"] == "text of a.pdf"
+    # Shutdown stops the shared processor's OCR pool
+    assert querier.closed
+
+
+@requires_fork
+def test_process_request_streams_events(app):
+    """Accept: text/event-stream yields token events and a final result event."""
+    sent = run(
+        app,
+        lambda: send_request(
+            app,
+            "POST",
+            "/process",
+            {"file_path": "a.pdf", "prompt": "sum"},
+            headers=[(b"accept", b"text/event-stream")],
+        ),
+    )
+
+    assert dict(sent[0]["headers"])[b"content-type"] == b"text/event-stream"
+    events = [m["body"].decode() for m in sent[1:]]
+    assert all(m["more_body"] for m in sent[1:-1]) and not sent[-1]["more_body"]
+    assert events[:-1] == [
+        f'event: token\ndata: {{"token": "{t}"}}\n\n' for t in ("sum:", "a.pdf")
+    ]
+    event, data = events[-1].strip().split("\n")
+    assert event == "event: result"
+    assert json.loads(data[len("data: "):])["llm_response"] == "sum: a.pdf"
+
+
+@requires_fork
+def test_process_invalid_requests(app):
+    """Malformed bodies are rejected and extraction errors become failed responses."""
+
+    async def requests():
+        return [
+            await call(app, "POST", "/process", {"prompt": "no file"}),
+            await call(app, "POST", "/process", {"file_path": "missing.pdf"}),
+        ]
+
+    (invalid_status, _), (status, body) = run(app, requests)
+
+    assert invalid_status == 422
+    assert status == 200
+    assert not body["success"]
+    assert "File not found" in body["error"]
+
+
+@requires_fork
+def test_concurrent_requests_do_not_block(monkeypatch):
+    """Requests run concurrently on worker pools, not on the event loop."""
+    monkeypatch.setattr(batch, "PDFProcessor", FakeExtractor)
+    querier = FakeQuerier(delay=0.3)
+    app = AigrokApp(jobs=2, llm_concurrency=4, api_processor=APIProcessor(querier))
+
+    async def requests():
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *[
+                call(app, "POST", "/process", {"file_path": f"{i}.pdf", "prompt": "p"})
+                for i in range(4)
+            ],
+            call(app, "GET", "/health"),
+        )
+        return results, time.perf_counter() - start
+
+    results, elapsed = run(app, requests)
+
+    assert all(status == 200 for status, _ in results)
+    assert elapsed < 4 * 0.3
+    assert len(querier.threads) > 1